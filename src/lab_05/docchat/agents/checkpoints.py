@@ -0,0 +1,100 @@
+import sqlite3
+import time
+from typing import Optional
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from config.settings import settings
+from utils.logging import logger
+
+# When each run last started or resumed; SqliteSaver's tables keep no time
+ACTIVITY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS thread_activity (
+    thread_id TEXT PRIMARY KEY,
+    updated REAL NOT NULL
+)
+"""
+
+
+def open_checkpointer(path: Optional[str] = None) -> Optional[SqliteSaver]:
+    """
+    SQLite checkpointer at path (settings.CHECKPOINT_DB_PATH by default).
+
+    Returns None when the path is empty, which disables checkpointing.
+    """
+    path = settings.CHECKPOINT_DB_PATH if path is None else path
+    if not path:
+        return None
+    # SqliteSaver serializes access to the connection with its own lock
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    logger.info("Checkpointing workflow runs to {}", path)
+    checkpointer = SqliteSaver(conn)
+    expire_threads(checkpointer, settings.CHECKPOINT_TTL_HOURS * 3600)
+    return checkpointer
+
+
+def touch_thread(checkpointer: Optional[SqliteSaver], thread_id: str):
+    """Record that a run is starting or resuming on this thread."""
+    if not isinstance(checkpointer, SqliteSaver):
+        return
+    _setup(checkpointer)
+    with checkpointer.lock, checkpointer.conn:
+        checkpointer.conn.execute(
+            "INSERT OR REPLACE INTO thread_activity (thread_id, updated) VALUES (?, ?)",
+            (thread_id, time.time()),
+        )
+
+
+def expire_threads(checkpointer: Optional[SqliteSaver], ttl_seconds: float) -> int:
+    """
+    Drop the checkpoints of runs that failed and were not retried within
+    ttl_seconds of their last start; returns how many threads were dropped.
+
+    Threads checkpointed before their activity was tracked get their clock
+    started now, so they expire one TTL later.
+    """
+    if not isinstance(checkpointer, SqliteSaver) or ttl_seconds <= 0:
+        return 0
+    _setup(checkpointer)
+    now = time.time()
+    with checkpointer.lock, checkpointer.conn:
+        conn = checkpointer.conn
+        conn.execute(
+            "INSERT OR IGNORE INTO thread_activity (thread_id, updated) "
+            "SELECT DISTINCT thread_id, ? FROM checkpoints",
+            (now,),
+        )
+        expired = [
+            row[0]
+            for row in conn.execute(
+                "SELECT thread_id FROM thread_activity WHERE updated < ?",
+                (now - ttl_seconds,),
+            )
+        ]
+        for thread_id in expired:
+            _delete(conn, thread_id)
+    if expired:
+        logger.info("Dropped checkpoints of {} abandoned run(s)", len(expired))
+    return len(expired)
+
+
+def delete_thread(checkpointer: Optional[SqliteSaver], thread_id: str):
+    """Drop the checkpoints of a finished run; only unfinished runs are resumed."""
+    if not isinstance(checkpointer, SqliteSaver):
+        return
+    _setup(checkpointer)
+    with checkpointer.lock, checkpointer.conn:
+        _delete(checkpointer.conn, thread_id)
+
+
+def _setup(checkpointer: SqliteSaver):
+    with checkpointer.lock:
+        checkpointer.setup()
+        with checkpointer.conn:
+            checkpointer.conn.execute(ACTIVITY_SCHEMA)
+
+
+def _delete(conn: sqlite3.Connection, thread_id: str):
+    # SqliteSaver 2.0 has no delete API, so clear its two tables directly
+    for table in ("checkpoints", "writes", "thread_activity"):
+        conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
@@ -0,0 +1,80 @@
+from typing import List, Optional
+
+from langchain.schema import Document
+
+from config.settings import settings
+
+# Most specific first: a reranked list is ordered by the cross-encoder
+SCORE_KEYS = ("rerank_score", "fused_score", "vector_score")
+
+
+def retrieval_scores(documents: List[Document]) -> Optional[List[float]]:
+    """The documents' scores under the first key all of them carry, or None."""
+    for key in SCORE_KEYS:
+        if documents and all(key in (doc.metadata or {}) for doc in documents):
+            return [float(doc.metadata[key]) for doc in documents]
+    return None
+
+
+def gap_cutoff(scores: List[float], min_gap: float) -> int:
+    """
+    Number of leading scores before the first drop between neighbours of at
+    least min_gap of the whole score range (all of them if there is none).
+    """
+    spread = max(scores) - min(scores)
+    if spread <= 0:
+        return len(scores)
+    for i in range(1, len(scores)):
+        if scores[i - 1] - scores[i] >= min_gap * spread:
+            return i
+    return len(scores)
+
+
+class ContextBudget:
+    """
+    How many of the retrieved chunks each LLM call gets.
+
+    Contexts are always a prefix of the retrieved chunks, so the relevance
+    call's context stays a prefix of the research and verification ones. The
+    prefix ends at the first clear drop in the retrieval scores (see
+    gap_cutoff), but holds at least min_docs chunks and at most the budget of
+    the question's relevance label: few for CAN_ANSWER, more for PARTIAL.
+    Every re-research after a failed verification doubles the context, up to
+    all retrieved chunks. When disabled every call gets every chunk.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = settings.CONTEXT_ADAPTIVE if enabled is None else enabled
+        self.min_docs = settings.CONTEXT_MIN_DOCS
+        self.label_docs = {
+            "CAN_ANSWER": settings.CONTEXT_DOCS_CAN_ANSWER,
+            "PARTIAL": settings.CONTEXT_DOCS_PARTIAL,
+        }
+        self.min_gap = settings.CONTEXT_SCORE_GAP
+
+    def relevance_depth(self, documents: List[Document]) -> int:
+        """Chunks shown to the relevance check, before the label is known."""
+        if not self.enabled:
+            return len(documents)
+        return len(self._cut(documents, max(self.label_docs.values())))
+
+    def select(self, documents: List[Document], label: str) -> List[Document]:
+        """The first answering context for a question labelled `label`."""
+        if not self.enabled:
+            return documents
+        return self._cut(documents, self.label_docs.get(label, len(documents)))
+
+    def expand(
+        self, context: List[Document], documents: List[Document]
+    ) -> List[Document]:
+        """The context for another attempt after `context` fell short."""
+        if not self.enabled:
+            return documents
+        return documents[: max(2 * len(context), self.min_docs)]
+
+    def _cut(self, documents: List[Document], limit: int) -> List[Document]:
+        size = len(documents)
+        scores = retrieval_scores(documents)
+        if scores is not None:
+            size = gap_cutoff(scores, self.min_gap)
+        return documents[: max(min(size, limit), self.min_docs)]
@@ -0,0 +1,170 @@
+import re
+from typing import Dict, List, Set
+
+from langchain.schema import Document
+
+from agents.relevance_gate import STOPWORDS, terms
+from config.settings import settings
+from utils.metrics import GROUNDED_CLAIMS
+
+SUPPORTED = "supported"
+UNCONFIRMED = "unconfirmed"
+
+# Sentence ends followed by the start of a new sentence; decimals like 1.10
+# have no space after the dot, so they are never split
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+_NUMBER = re.compile(r"(?<![\w.])\d[\d,]*(?:\.\d+)?")
+_ENTITY = re.compile(r"\b[A-Z][\w]*(?:[-.][\w]+)*\b")
+
+
+def split_claims(text: str) -> List[str]:
+    """Sentences and list items of text, stripped of markdown emphasis."""
+    claims = []
+    for line in text.replace("**", "").replace("__", "").splitlines():
+        line = _LIST_MARKER.sub("", line).strip()
+        for sentence in _SENTENCE_END.split(line):
+            sentence = sentence.strip()
+            # Headings and fragments like "Results:" carry nothing to check
+            if len(terms(sentence)) >= 2 or numbers(sentence):
+                claims.append(sentence)
+    return claims
+
+
+def numbers(text: str) -> Set[str]:
+    """Numbers in text, normalized so "1,536" == "1536" and "1.10" == "1.1"."""
+    found = set()
+    for match in _NUMBER.findall(text):
+        value = match.replace(",", "")
+        if "." in value:
+            value = value.rstrip("0").rstrip(".")
+        found.add(value)
+    return found
+
+
+def entities(claim: str) -> Set[str]:
+    """
+    Lowercased names in a claim: acronyms, names with digits or inner capitals
+    ("PUE", "GPT-4", "DeepSeek") and capitalized words past the first.
+    """
+    found = set()
+    for match in _ENTITY.finditer(claim):
+        word = match.group()
+        distinctive = (
+            (word.isupper() and len(word) > 1)
+            or any(c.isdigit() for c in word)
+            or any(c.isupper() for c in word[1:])
+        )
+        if (distinctive or match.start() > 0) and word.lower() not in STOPWORDS:
+            found.add(word.lower())
+    return found
+
+
+class GroundingChecker:
+    """
+    Check each claim of an answer against the retrieved chunks, locally.
+
+    A claim is supported when one chunk contains at least min_coverage of its
+    content terms and the chunks that match it well contain every number and
+    named entity it states. Everything else is unconfirmed, which is not the
+    same as wrong: a paraphrase can defeat term matching, so unconfirmed
+    claims go to the LLM verifier.
+    """
+
+    def __init__(self, min_coverage: float = None):
+        self.min_coverage = (
+            min_coverage
+            if min_coverage is not None
+            else settings.GROUNDING_MIN_COVERAGE
+        )
+
+    def check(self, answer: str, documents: List[Document]) -> Dict:
+        """
+        Per-claim report: {"claims": [...], "supported": n, "unconfirmed": n}.
+
+        Each claim entry has its text, status, best term coverage, the 1-based
+        number of the best matching chunk and any missing numbers / entities.
+        """
+        chunks = [self._index(doc.page_content) for doc in documents]
+        claims = [self._check_claim(claim, chunks) for claim in split_claims(answer)]
+        supported = sum(claim["status"] == SUPPORTED for claim in claims)
+        GROUNDED_CLAIMS.inc(supported, result=SUPPORTED)
+        GROUNDED_CLAIMS.inc(len(claims) - supported, result=UNCONFIRMED)
+        return {
+            "claims": claims,
+            "supported": supported,
+            "unconfirmed": len(claims) - supported,
+        }
+
+    @staticmethod
+    def _index(text: str) -> Dict:
+        vocabulary = set(terms(text))
+        return {
+            "text": text.lower(),
+            "vocabulary": vocabulary,
+            # A shared five-letter prefix stands in for stemming, as in term_coverage
+            "prefixes": {word[:5] for word in vocabulary if len(word) >= 5},
+            "numbers": numbers(text),
+        }
+
+    def _check_claim(self, claim: str, chunks: List[Dict]) -> Dict:
+        claim_terms = set(terms(claim))
+        coverages = [
+            sum(
+                term in chunk["vocabulary"]
+                or (len(term) >= 5 and term[:5] in chunk["prefixes"])
+                for term in claim_terms
+            )
+            / max(len(claim_terms), 1)
+            for chunk in chunks
+        ]
+        best = max(range(len(chunks)), key=coverages.__getitem__, default=None)
+        if best is None:
+            evidence = []
+        else:
+            # Facts of one claim may come from several matching chunks
+            evidence = [
+                chunk
+                for chunk, coverage in zip(chunks, coverages)
+                if coverage >= self.min_coverage
+            ] or [chunks[best]]
+
+        claim_numbers = numbers(claim)
+        found_numbers = set().union(*(chunk["numbers"] for chunk in evidence))
+        missing_numbers = sorted(claim_numbers - found_numbers)
+        missing_entities = sorted(
+            entity
+            for entity in entities(claim)
+            if not any(entity in chunk["text"] for chunk in evidence)
+        )
+        coverage = coverages[best] if best is not None else 0.0
+        status = (
+            SUPPORTED
+            if coverage >= self.min_coverage
+            and not missing_numbers
+            and not missing_entities
+            else UNCONFIRMED
+        )
+        return {
+            "claim": claim,
+            "status": status,
+            "coverage": round(coverage, 3),
+            "chunk": best + 1 if best is not None else None,
+            "missing_numbers": missing_numbers,
+            "missing_entities": missing_entities,
+        }
+
+
+def summarize(report: Dict) -> str:
+    """One line about a grounding report, for the verification report."""
+    total = report["supported"] + report["unconfirmed"]
+    summary = f"{report['supported']} of {total} claims matched the documents locally"
+    mismatched = [
+        claim
+        for claim in report["claims"]
+        if claim["missing_numbers"] or claim["missing_entities"]
+    ]
+    for claim in mismatched:
+        missing = claim["missing_numbers"] + claim["missing_entities"]
+        summary += f"; not found for '{claim['claim']}': {', '.join(missing)}"
+    return summary + "."
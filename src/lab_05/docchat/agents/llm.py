@@ -0,0 +1,758 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from config.settings import settings
+from utils.hedging import (
+    Cancelled,
+    HedgeBudget,
+    LatencyWindow,
+    blocking,
+    hedge,
+    pause,
+)
+from utils.logging import logger
+from utils.metrics import LLM_COALESCED, LLM_HEDGES, LLM_SECONDS, record_cache
+from utils.response_cache import ResponseCache
+from utils.single_flight import Broadcast, SingleFlight
+
+BACKENDS = ("azure", "openai", "fake")
+COALESCE_MODES = ("off", "deterministic", "all")
+
+FAKE_VERIFICATION_REPORT = (
+    "Supported: YES\n"
+    "Unsupported Claims: []\n"
+    "Contradictions: []\n"
+    "Relevant: YES\n"
+    "Additional Details: Answer matches the context."
+)
+
+# The Azure variables are read when the first client is built
+load_dotenv()
+
+_clients: Dict[tuple, object] = {}
+_clients_lock = threading.Lock()
+_in_flight = SingleFlight()
+_response_cache: Optional[ResponseCache] = None
+# Latencies and hedge budgets outlive the clients, per agent
+_hedge_policies: Dict[str, "HedgePolicy"] = {}
+
+
+def route(agent: str) -> Tuple[str, Optional[str]]:
+    """
+    Backend and model for an agent.
+
+    settings.<AGENT>_LLM ("backend" or "backend:model", e.g.
+    "openai:qwen2.5-1.5b-instruct") overrides LLM_BACKEND / LLM_MODEL; the
+    model defaults to the Azure deployment name for "azure".
+    """
+    spec = getattr(settings, f"{agent.upper()}_LLM", "") or settings.LLM_BACKEND
+    backend, _, model = spec.partition(":")
+    backend = backend.strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown LLM backend '{backend}' for {agent}. "
+            f"Use one of: {', '.join(BACKENDS)}."
+        )
+    model = model.strip() or settings.LLM_MODEL
+    if not model and backend == "azure":
+        model = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+    return backend, model or None
+
+
+def get_client(agent: str):
+    """
+    Chat client and model name for an agent, shared by agents on the same route.
+
+    Every client has the ChatCompletionsClient.complete() interface the agents
+    were written against (messages, model, temperature, max_tokens, stream,
+    response_format, raw_response_hook) and returns responses of the same shape.
+    For the agents listed in LLM_HEDGE_AGENTS it is wrapped in a HedgingClient;
+    unless LLM_COALESCE is "off" then in a CoalescingClient, and for the agents
+    listed in LLM_CACHE_AGENTS in a CachingClient on top.
+    """
+    backend, model = route(agent)
+    mode = settings.LLM_COALESCE.lower()
+    if mode not in COALESCE_MODES:
+        raise ValueError(
+            f"Unknown LLM_COALESCE '{settings.LLM_COALESCE}'. "
+            f"Use one of: {', '.join(COALESCE_MODES)}."
+        )
+    with _clients_lock:
+        client = _clients.get((backend, model))
+        if client is None:
+            client = _clients[(backend, model)] = _build_client(backend, model)
+            logger.info(
+                "Using the {} LLM backend (model {}) for {}", backend, model, agent
+            )
+        cache = _get_response_cache() if agent in cached_agents() else None
+        if agent in hedged_agents():
+            # One per agent and route, so identical calls still coalesce
+            key = (backend, model, agent)
+            if key not in _clients:
+                _clients[key] = HedgingClient(client, agent, _hedge_policy(agent))
+            client = _clients[key]
+    if mode != "off":
+        client = CoalescingClient(client, agent, deterministic_only=mode != "all")
+    if cache is not None:
+        # Servers sharing a model name must not share replies
+        client = CachingClient(
+            client, agent, cache, scope=f"{backend}|{_endpoint(backend, model)}"
+        )
+    return client, model
+
+
+def cached_agents() -> Tuple[str, ...]:
+    """Agents whose responses are cached (LLM_CACHE_AGENTS, comma-separated)."""
+    if not settings.LLM_CACHE_PATH:
+        return ()
+    agents = (a.strip().lower() for a in settings.LLM_CACHE_AGENTS.split(","))
+    return tuple(a for a in agents if a)
+
+
+def hedged_agents() -> Tuple[str, ...]:
+    """Agents whose slow calls are hedged (LLM_HEDGE_AGENTS, comma-separated)."""
+    agents = (a.strip().lower() for a in settings.LLM_HEDGE_AGENTS.split(","))
+    return tuple(a for a in agents if a)
+
+
+def _hedge_policy(agent: str) -> "HedgePolicy":
+    # Called with _clients_lock held
+    policy = _hedge_policies.get(agent)
+    if policy is None:
+        policy = _hedge_policies[agent] = HedgePolicy(
+            percentile=settings.LLM_HEDGE_PERCENTILE,
+            min_delay=settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+            min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+            budget=settings.LLM_HEDGE_BUDGET,
+        )
+    return policy
+
+
+def hedge_rates(agent: Optional[str] = None) -> Tuple[float, float]:
+    """
+    Share of calls that sent a hedge, and share of hedges that finished first.
+    """
+    agents = (agent,) if agent else tuple(_hedge_policies)
+    calls = sum(LLM_SECONDS.count(agent=a) for a in agents)
+    won = sum(LLM_HEDGES.value(agent=a, result="won") for a in agents)
+    sent = won + sum(LLM_HEDGES.value(agent=a, result="lost") for a in agents)
+    return (sent / calls if calls else 0.0, won / sent if sent else 0.0)
+
+
+def _get_response_cache() -> ResponseCache:
+    # Called with _clients_lock held
+    global _response_cache
+    if _response_cache is None or _response_cache.path != settings.LLM_CACHE_PATH:
+        _response_cache = ResponseCache(
+            settings.LLM_CACHE_PATH,
+            ttl_seconds=settings.LLM_CACHE_TTL_HOURS * 3600,
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+        )
+        logger.info("Caching LLM responses in {}", settings.LLM_CACHE_PATH)
+    return _response_cache
+
+
+def reset_clients():
+    """Forget the cached clients, e.g. after changing the routing settings."""
+    global _response_cache
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        _response_cache = None
+        _hedge_policies.clear()
+    for client in clients:
+        close = getattr(client, "close", None)
+        if close is not None:
+            close()
+
+
+def _endpoint(backend: str, model: Optional[str]) -> str:
+    """URL the backend's requests for model go to ("" for the fake backend)."""
+    if backend == "azure":
+        # Azure serves each model from its own deployment URL
+        return f"{os.getenv('AZURE_OPENAI_ENDPOINT')}openai/deployments/{model}"
+    if backend == "openai":
+        return settings.LLM_BASE_URL
+    return ""
+
+
+def _build_client(backend: str, model: Optional[str]):
+    if backend == "azure":
+        from azure.ai.inference import ChatCompletionsClient
+        from azure.core.credentials import AzureKeyCredential
+
+        endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+        api_key = os.getenv("AZURE_OPENAI_API_KEY")
+        if not (endpoint and api_key and model):
+            raise ValueError(
+                "Azure AI client not initialized. Please check your environment variables."
+            )
+        from azure.core.pipeline.transport import RequestsTransport
+
+        return ChatCompletionsClient(
+            endpoint=_endpoint(backend, model),
+            credential=AzureKeyCredential(api_key),
+            transport=RequestsTransport(session=_cancellable_session()),
+        )
+    if backend == "openai":
+        return OpenAICompatibleClient(settings.LLM_BASE_URL, settings.LLM_API_KEY)
+    return FakeChatClient()
+
+
+def fingerprint(request: dict) -> str:
+    """Stable hash of a complete() request: messages, model and parameters."""
+
+    def plain(value):
+        # azure.ai.inference messages and response formats are mappings
+        if isinstance(value, Mapping):
+            return dict(value)
+        return repr(value)
+
+    payload = json.dumps(request, sort_keys=True, default=plain)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CoalescingClient:
+    """
+    Single-flight wrapper: identical complete() calls that overlap in time
+    share one upstream request.
+
+    Identical means the same client, messages, model and parameters. The
+    first call goes upstream and later ones wait for its response (or its
+    error); streamed responses are replayed to every caller from the first
+    token. With deterministic_only, calls with a non-zero temperature always
+    go upstream. Only concurrent calls are merged, nothing is cached.
+    """
+
+    def __init__(self, client, agent: str, deterministic_only: bool = False):
+        self.client = client
+        self.agent = agent
+        self.deterministic_only = deterministic_only
+
+    def complete(self, *, raw_response_hook: Optional[Callable] = None, **kwargs):
+        def call():
+            return self.client.complete(raw_response_hook=raw_response_hook, **kwargs)
+
+        if self.deterministic_only and kwargs.get("temperature") != 0:
+            return call()
+
+        key = (id(self.client), fingerprint(kwargs))
+        if kwargs.get("stream"):
+            # The flight lasts until the stream ends, not just until it starts
+            broadcast, shared = _in_flight.do(
+                key,
+                lambda: Broadcast(call(), on_done=lambda: _in_flight.release(key)),
+                hold=True,
+            )
+            response = broadcast.reader()
+        else:
+            response, shared = _in_flight.do(key, call)
+        if shared:
+            LLM_COALESCED.inc(agent=self.agent)
+            logger.debug("Joined an identical {} LLM call in flight", self.agent)
+        return response
+
+    def close(self):
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            close()
+
+
+class HedgePolicy:
+    """
+    When to hedge one agent's calls: after the `percentile` of its recent
+    latencies (never sooner than min_delay, and only once min_samples are
+    known), within a budget of `budget` hedges per call. Streamed calls are
+    timed to their first update, separately from plain ones.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        min_delay: float = 1.0,
+        min_samples: int = 20,
+        budget: float = 0.05,
+    ):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.budget = HedgeBudget(budget)
+        self.latencies = {False: LatencyWindow(), True: LatencyWindow()}
+
+    def delay(self, stream: bool) -> Optional[float]:
+        """Seconds after which to hedge, or None while too few calls are known."""
+        window = self.latencies[stream]
+        if len(window) < self.min_samples:
+            return None
+        return max(self.min_delay, window.percentile(self.percentile))
+
+
+class HedgingClient:
+    """
+    Sends a duplicate of a call that is slower than its agent usually is, and
+    returns whichever reply comes first (see utils.hedging.hedge).
+
+    Streams are hedged on their first update. The original runs on the
+    caller's thread; whichever attempt loses is cancelled mid-request by
+    shutting its connection down, or closed if it is a stream that already
+    started. Only the first attempt reports to raw_response_hook, so hedges
+    do not show up as retries; docchat_llm_hedges_total counts them by result
+    (won, lost, or over_budget when the budget did not allow one).
+    """
+
+    def __init__(self, client, agent: str, policy: HedgePolicy):
+        self.client = client
+        self.agent = agent
+        self.policy = policy
+
+    def complete(self, *, raw_response_hook: Optional[Callable] = None, **kwargs):
+        stream = bool(kwargs.get("stream"))
+        self.policy.budget.deposit()
+        delay = self.policy.delay(stream)
+
+        def attempt(hedged: bool):
+            start = time.perf_counter()
+            hook = None if hedged else raw_response_hook
+            try:
+                response = self.client.complete(raw_response_hook=hook, **kwargs)
+                if stream:
+                    # A stream has started once its first update arrives
+                    updates = iter(response)
+                    response = (response, updates, next(updates, None))
+            except Cancelled:
+                # The hedge won; the original took at least this long
+                if not hedged:
+                    self.policy.latencies[stream].add(time.perf_counter() - start)
+                raise
+            if not hedged:
+                self.policy.latencies[stream].add(time.perf_counter() - start)
+            return response
+
+        if delay is None:
+            response = attempt(False)
+        else:
+            response, hedge_won = hedge(
+                attempt, delay, self._may_hedge, discard=_close_stream
+            )
+            if hedge_won is not None:
+                LLM_HEDGES.inc(agent=self.agent, result="won" if hedge_won else "lost")
+                logger.debug(
+                    "Hedged a {} LLM call after {:.2f}s, {} won",
+                    self.agent,
+                    delay,
+                    "hedge" if hedge_won else "original",
+                )
+        if stream:
+            return _resume(*response)
+        return response
+
+    def _may_hedge(self) -> bool:
+        if self.policy.budget.withdraw():
+            return True
+        LLM_HEDGES.inc(agent=self.agent, result="over_budget")
+        return False
+
+
+def _resume(response, updates, first):
+    # The stream with its first update put back; closing it closes the response
+    try:
+        if first is not None:
+            yield first
+            yield from updates
+    finally:
+        _close_stream((response,))
+
+
+def _close_stream(response):
+    # Hedged streams travel as (response, updates, first update) tuples
+    if isinstance(response, tuple):
+        close = getattr(response[0], "close", None)
+        if close is not None:
+            close()
+
+
+class CachingClient:
+    """
+    Persistent response cache in front of a chat client, for agents whose
+    replies are a function of their prompt (temperature 0).
+
+    The key is the scope (backend and endpoint URL) plus everything sent:
+    messages, model and parameters. A hit is replayed without calling the
+    client, with its usage left out so token metrics only count upstream
+    calls; streamed responses are stored once they have been read to the end.
+    Cache errors are logged and the call goes upstream.
+    """
+
+    def __init__(self, client, agent: str, cache: ResponseCache, scope: str = ""):
+        self.client = client
+        self.agent = agent
+        self.cache = cache
+        self.scope = scope
+
+    def complete(self, *, raw_response_hook: Optional[Callable] = None, **kwargs):
+        key = fingerprint({"scope": self.scope, **kwargs})
+        stream = bool(kwargs.get("stream"))
+        try:
+            stored = self.cache.get(key)
+        except sqlite3.Error as e:
+            logger.warning("LLM response cache unavailable: {}", e)
+            stored = None
+        record_cache("llm", hit=stored is not None)
+        if stored is not None:
+            logger.debug("Replaying a cached {} LLM response", self.agent)
+            return _replay(stored, stream)
+
+        response = self.client.complete(raw_response_hook=raw_response_hook, **kwargs)
+        if stream:
+            return self._store_stream(key, response)
+        self._store(key, _as_dict(response))
+        return response
+
+    def _store(self, key: str, value):
+        try:
+            self.cache.put(key, value)
+        except sqlite3.Error as e:
+            logger.warning("Could not cache an LLM response: {}", e)
+
+    def _store_stream(self, key: str, updates):
+        seen = []
+        for update in updates:
+            seen.append(_as_dict(update))
+            yield update
+        # Only complete streams are stored: this line is not reached when the
+        # reader stops early or the stream fails
+        self._store(key, seen)
+
+    def close(self):
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            close()
+
+
+def _as_dict(response) -> dict:
+    # openai SDK objects are pydantic models, azure.ai.inference ones have
+    # as_dict(); both dump to the same JSON shape
+    if hasattr(response, "model_dump"):
+        return response.model_dump(mode="json", exclude_none=True)
+    return json.loads(json.dumps(response.as_dict(), default=str))
+
+
+def _replay(stored, stream: bool):
+    from azure.ai.inference.models import (
+        ChatCompletions,
+        StreamingChatCompletionsUpdate,
+    )
+
+    if not stream:
+        stored.pop("usage", None)
+        return ChatCompletions(stored)
+    updates = []
+    for update in stored:
+        update.pop("usage", None)
+        if update.get("choices"):
+            updates.append(StreamingChatCompletionsUpdate(update))
+    return iter(updates)
+
+
+def _message_dicts(messages) -> List[dict]:
+    # azure.ai.inference messages are mappings with "role" and "content"
+    return [{"role": m["role"], "content": m["content"]} for m in messages]
+
+
+class OpenAICompatibleClient:
+    """
+    ChatCompletionsClient look-alike for any OpenAI-compatible server (vLLM,
+    llama.cpp, Ollama, LM Studio, OpenAI itself), built on the openai SDK.
+
+    raw_response_hook is called once per HTTP attempt, as with the Azure SDK,
+    so retries keep showing up in the traces.
+    """
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None):
+        import httpx
+        from openai import OpenAI
+
+        self._hook = threading.local()
+        transport = httpx.HTTPTransport()
+        _make_cancellable(transport)
+        self._http = httpx.Client(
+            transport=transport,
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            event_hooks={"response": [self._on_response]},
+        )
+        # Local servers usually ignore the key, but the SDK insists on one
+        self._client = OpenAI(
+            base_url=base_url, api_key=api_key or "unused", http_client=self._http
+        )
+
+    def _on_response(self, response):
+        hook = getattr(self._hook, "hook", None)
+        if hook is not None:
+            hook(response)
+
+    def complete(
+        self,
+        *,
+        messages,
+        model: Optional[str] = None,
+        stream: bool = False,
+        response_format=None,
+        raw_response_hook: Optional[Callable] = None,
+        **kwargs,
+    ):
+        request = {"model": model, "messages": _message_dicts(messages), **kwargs}
+        if response_format is not None:
+            request["response_format"] = {"type": "json_object"}
+        if stream:
+            request["stream"] = True
+            request["stream_options"] = {"include_usage": True}
+        self._hook.hook = raw_response_hook
+        try:
+            return self._client.chat.completions.create(**request)
+        finally:
+            self._hook.hook = None
+
+    def close(self):
+        self._client.close()
+
+
+# Which HTTP stacks could not be made cancellable, each warned about once
+_uncancellable = set()
+
+
+def _warn_uncancellable(stack: str):
+    if stack not in _uncancellable:
+        _uncancellable.add(stack)
+        logger.warning(
+            "Cannot cancel {} requests mid-flight; losing hedges will run to "
+            "completion (unsupported {} version?)",
+            stack,
+            stack,
+        )
+
+
+def _make_cancellable(transport) -> bool:
+    """
+    Route an httpx transport's socket I/O through blocking(), so a hedge can
+    cancel its losing attempt mid-request. httpx has no public hook for the
+    network backend, so this checks that the attribute is there and warns
+    once when it is not.
+    """
+    pool = getattr(transport, "_pool", None)
+    if not hasattr(pool, "_network_backend"):
+        _warn_uncancellable("httpx")
+        return False
+    pool._network_backend = _CancellableBackend(pool._network_backend)
+    return True
+
+
+class _CancellableBackend:
+    """httpcore network backend whose streams do their I/O under blocking()."""
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def connect_tcp(self, *args, **kwargs):
+        return _CancellableStream(self._backend.connect_tcp(*args, **kwargs))
+
+    def connect_unix_socket(self, *args, **kwargs):
+        return _CancellableStream(self._backend.connect_unix_socket(*args, **kwargs))
+
+    def sleep(self, seconds: float):
+        self._backend.sleep(seconds)
+
+
+class _CancellableStream:
+    def __init__(self, stream):
+        self._stream = stream
+        self._socket = stream.get_extra_info("socket")
+        if self._socket is None:
+            _warn_uncancellable("httpx")
+
+    def read(self, max_bytes: int, timeout: Optional[float] = None) -> bytes:
+        with blocking(self._socket):
+            return self._stream.read(max_bytes, timeout)
+
+    def write(self, buffer: bytes, timeout: Optional[float] = None):
+        with blocking(self._socket):
+            self._stream.write(buffer, timeout)
+
+    def close(self):
+        self._stream.close()
+
+    def start_tls(self, *args, **kwargs):
+        return _CancellableStream(self._stream.start_tls(*args, **kwargs))
+
+    def get_extra_info(self, info: str):
+        return self._stream.get_extra_info(info)
+
+
+def _cancellable_session():
+    """
+    requests session for the Azure SDK whose connections send and wait for
+    responses under blocking(), so a hedge can cancel its losing attempt. The
+    connection classes go in through the pool manager's scheme table, which
+    is checked like _make_cancellable's hook.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    from urllib3.util.retry import Retry
+
+    class Cancellable:
+        def request(self, *args, **kwargs):
+            with blocking(self.sock):
+                super().request(*args, **kwargs)
+
+        def getresponse(self, *args, **kwargs):
+            with blocking(self.sock):
+                return super().getresponse(*args, **kwargs)
+
+    class HTTPPool(HTTPConnectionPool):
+        ConnectionCls = type("Connection", (Cancellable, HTTPConnection), {})
+
+    class HTTPSPool(HTTPSConnectionPool):
+        ConnectionCls = type("Connection", (Cancellable, HTTPSConnection), {})
+
+    class Adapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            # Not a constructor argument of PoolManager, hence the check
+            if not isinstance(
+                getattr(self.poolmanager, "pool_classes_by_scheme", None), dict
+            ):
+                _warn_uncancellable("urllib3")
+                return
+            self.poolmanager.pool_classes_by_scheme = {
+                "http": HTTPPool,
+                "https": HTTPSPool,
+            }
+
+    # The Azure pipeline retries by itself, as with its default session
+    adapter = Adapter(
+        max_retries=Retry(total=False, redirect=False, raise_on_status=False)
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class FakeChatClient:
+    """
+    In-process chat client answering every agent with a canned reply, for
+    offline runs and tests. Replies are the mock Azure server's, so a workflow
+    behaves the same on either.
+    """
+
+    def __init__(self, reply: Callable[[List[dict]], str] = None, latency: float = 0.0):
+        self.reply = reply or fake_reply
+        self.latency = latency
+
+    def complete(
+        self,
+        *,
+        messages,
+        model: Optional[str] = None,
+        stream: bool = False,
+        raw_response_hook: Optional[Callable] = None,
+        **kwargs,
+    ):
+        from azure.ai.inference.models import (
+            ChatCompletions,
+            StreamingChatCompletionsUpdate,
+        )
+
+        messages = _message_dicts(messages)
+        reply = self.reply(messages)
+        prompt_tokens = sum(len(m["content"] or "") for m in messages) // 4
+        completion_tokens = len(reply.split())
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        if self.latency:
+            pause(self.latency)
+        if raw_response_hook is not None:
+            raw_response_hook(None)
+        base = {
+            "id": "chatcmpl-fake",
+            "created": int(time.time()),
+            "model": model or "fake",
+        }
+
+        if not stream:
+            return ChatCompletions(
+                {
+                    **base,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": reply},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": usage,
+                }
+            )
+        updates = [
+            StreamingChatCompletionsUpdate(
+                {
+                    **base,
+                    "choices": [
+                        {"index": 0, "delta": {"content": word}, "finish_reason": None}
+                    ],
+                }
+            )
+            for word in re.findall(r"\S+\s*", reply)
+        ]
+        updates.append(
+            StreamingChatCompletionsUpdate({**base, "choices": [], "usage": usage})
+        )
+        return iter(updates)
+
+
+def fake_reply(messages: List[dict]) -> str:
+    """
+    Pick a deterministic reply by agent, recognised from the instructions that
+    follow the context (the agents share one system prompt) or, for prompts
+    without them, from the system prompt.
+    """
+    system = " ".join(m.get("content", "") for m in messages if m["role"] == "system")
+    user = " ".join(m.get("content", "") for m in messages if m["role"] == "user")
+    if "**Instructions:**" in user:
+        user, instructions = user.rsplit("**Instructions:**", 1)
+    else:
+        instructions = system
+    instructions = instructions.lower()
+    if "relevance checker" in instructions:
+        return "CAN_ANSWER"
+    if "verify" in instructions:
+        return FAKE_VERIFICATION_REPORT
+    # Research: echo the start of the context so answers differ per question
+    context = user.split("**Context:**", 1)[-1]
+    if "json" in instructions:
+        # Single-call mode: answer from the first chunk, cite it and rate it
+        first = re.split(r"\n\s*\[2\] ", context, maxsplit=1)[0]
+        words = re.findall(r"\S+", first.replace("[1]", "", 1))[:40]
+        return json.dumps(
+            {
+                "answer": "Based on the documents: " + " ".join(words),
+                "citations": [1],
+                "supported": "YES",
+                "confidence": 0.9,
+            }
+        )
+    words = re.findall(r"\S+", re.sub(r"\[\d+\] ", "", context))[:40]
+    return "Based on the documents: " + " ".join(words)
@@ -0,0 +1,137 @@
+import textwrap
+from typing import List, Optional
+
+from azure.ai.inference.models import SystemMessage, UserMessage
+from langchain.schema import Document
+
+from utils.metrics import LLM_TOKENS
+
+# One system message for every agent: providers cache prompt prefixes, and a
+# shared system message followed by the shared context lets the relevance,
+# research and verification calls for one question reuse the same prefix
+SYSTEM_PROMPT = (
+    "You are an AI assistant that works only from the document context given "
+    "in each request: you judge its relevance to questions, answer questions "
+    "from it and verify answers against it. Follow the task instructions that "
+    "come after the context exactly."
+)
+
+AGENTS = ("relevance", "research", "verification")
+
+
+def canonical(text: str) -> str:
+    """Dedented text without trailing spaces or leading / trailing blank lines."""
+    lines = textwrap.dedent(text).replace("\r\n", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def format_context(documents: List[Document], limit: Optional[int] = None) -> str:
+    """
+    The chunks as numbered "[i] text" blocks, in retrieval order.
+
+    Every agent formats its context with this function, so the first `limit`
+    chunks given to the relevance check are a byte-identical prefix of the
+    full context the research and verification calls send.
+    """
+    selected = documents if limit is None else documents[:limit]
+    return "\n\n".join(
+        f"[{i}] {canonical(doc.page_content)}" for i, doc in enumerate(selected, 1)
+    )
+
+
+def build_prompt(context: str, task: str, closing: str = "", **fields: str) -> str:
+    """
+    User prompt with the context first, then the task, the variable fields and
+    the closing line about the reply format.
+
+    `task` and `closing` are fixed per agent; `fields` are rendered in order as
+    "**Name:** value" lines (underscores in names become spaces), so nothing
+    that changes from call to call comes before the shared context.
+    """
+    parts = [f"**Context:**\n{context}", canonical(task)]
+    for name, value in fields.items():
+        parts.append(f"**{name.replace('_', ' ').title()}:** {value.strip()}")
+    if closing:
+        parts.append(canonical(closing))
+    return "\n\n".join(parts)
+
+
+def messages(prompt: str) -> list:
+    """The shared system message and the user prompt, for client.complete."""
+    return [SystemMessage(content=SYSTEM_PROMPT), UserMessage(content=prompt)]
+
+
+def cached_token_rate(agent: Optional[str] = None) -> float:
+    """Share of prompt tokens the provider reported as served from its cache."""
+    agents = (agent,) if agent else AGENTS
+    prompt = sum(LLM_TOKENS.value(agent=a, kind="prompt") for a in agents)
+    cached = sum(LLM_TOKENS.value(agent=a, kind="cached") for a in agents)
+    return cached / prompt if prompt else 0.0
+
+
+RELEVANCE_TASK = """
+    **Instructions:**
+    - As a relevance checker, classify how well the context above addresses the question below.
+    - Respond with only one of the following labels: CAN_ANSWER, PARTIAL, NO_MATCH.
+    - Do not include any additional text or explanation.
+
+    **Labels:**
+    1) "CAN_ANSWER": The passages contain enough explicit information to fully answer the question.
+    2) "PARTIAL": The passages mention or discuss the question's topic but do not provide all the details needed for a complete answer.
+    3) "NO_MATCH": The passages do not discuss or mention the question's topic at all.
+
+    **Important:** If the passages mention or reference the topic or timeframe of the question in any way, even if incomplete, respond with "PARTIAL" instead of "NO_MATCH".
+    """
+
+RELEVANCE_FORMAT = """
+    **Respond ONLY with one of the following labels: CAN_ANSWER, PARTIAL, NO_MATCH**
+    """
+
+RESEARCH_TASK = """
+    **Instructions:**
+    - Answer the question below using only the context above.
+    - Be clear, concise, and factual.
+    - Return as much information as you can get from the context.
+    """
+
+RESEARCH_FORMAT = """
+    **Provide your answer below:**
+    """
+
+ASSESSED_TASK = """
+    **Instructions:**
+    - Answer the question below using only the context above.
+    - Be clear, concise, and factual.
+    - The context is split into numbered chunks; cite the numbers of the chunks
+      your answer relies on.
+    - Then rate how well those chunks support every statement of your answer.
+    """
+
+ASSESSED_FORMAT = """
+    **Respond ONLY with a JSON object of this form:**
+    {"answer": "<your answer>", "citations": [<chunk numbers>],
+      "supported": "YES" | "PARTIAL" | "NO", "confidence": <0.0 to 1.0>}
+    """
+
+VERIFICATION_TASK = """
+    **Instructions:**
+    - Verify the answer below against the context above.
+    - Check for:
+    1. Direct/indirect factual support (YES/NO)
+    2. Unsupported claims (list any if present)
+    3. Contradictions (list any if present)
+    4. Relevance to the question (YES/NO)
+    - Provide additional details or explanations where relevant.
+    - Respond in the exact format specified below without adding any unrelated information.
+
+    **Format:**
+    Supported: YES/NO
+    Unsupported Claims: [item1, item2, ...]
+    Contradictions: [item1, item2, ...]
+    Relevant: YES/NO
+    Additional Details: [Any extra information or explanations]
+    """
+
+VERIFICATION_FORMAT = """
+    **Respond ONLY with the above format.**
+    """
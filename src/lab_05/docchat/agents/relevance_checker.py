@@ -1,110 +1,92 @@
-import logging
-import os
-
-from azure.ai.inference import ChatCompletionsClient
-from azure.ai.inference.models import SystemMessage, UserMessage
-from azure.core.credentials import AzureKeyCredential
-
-logger = logging.getLogger(__name__)
-
-# Azure AI setup - these should be configured in your environment variables or settings
-azure_base_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-azure_api_key = os.getenv("AZURE_OPENAI_API_KEY")
-azure_deployment_name = os.getenv(
-    "AZURE_OPENAI_DEPLOYMENT_NAME"
-)  # use Gpt4 or gpt4-turbo here, instead of ibm/granite-3-8b-instruct
-
-# Build full endpoint URL for Azure AI Inference
-azure_endpoint = f"{azure_base_endpoint}openai/deployments/{azure_deployment_name}"
-
-# Only initialize client if all required variables are present
-client = None
-if azure_base_endpoint and azure_api_key and azure_deployment_name:
-    client = ChatCompletionsClient(
-        endpoint=azure_endpoint, credential=AzureKeyCredential(azure_api_key)
-    )
+from agents.llm import get_client
+from agents.prompts import (
+    RELEVANCE_FORMAT,
+    RELEVANCE_TASK,
+    build_prompt,
+    format_context,
+    messages,
+)
+from agents.relevance_gate import RelevanceGate
+from utils.logging import logger
+from utils.metrics import RELEVANCE_DECISIONS, RETRIEVED_DOCUMENTS
+from utils.tracing import trace_llm_call
 
 
 class RelevanceChecker:
-    def __init__(self):
-        # Initialize the Azure AI client
-        if client is None:
-            raise ValueError(
-                "Azure AI client not initialized. Please check your environment variables."
-            )
-        self.client = client
-        self.deployment_name = azure_deployment_name
-
-    def check(self, question: str, retriever, k=3) -> str:
+    def __init__(self, gate: RelevanceGate = None):
+        # Chat client routed by settings.RELEVANCE_LLM (or LLM_BACKEND); a small,
+        # fast model is enough for a three-way label
+        self.client, self.deployment_name = get_client("relevance")
+        # Local first tier; only questions it cannot settle reach the LLM
+        self.gate = gate or RelevanceGate()
+
+    def check(self, question: str, retriever, k=3, documents=None) -> str:
         """
-        1. Retrieve the top-k document chunks from the global retriever.
-        2. Combine them into a single text string.
-        3. Pass that text + question to the LLM for classification.
+        1. Retrieve the top-k document chunks from the global retriever
+           (or use `documents` if they were already retrieved for the question).
+        2. Let the relevance gate label the question from the retrieval scores
+           if it is a clear case.
+        3. Otherwise combine the chunks into a single text string and pass
+           that text + question to the LLM for classification.
 
         Returns: "CAN_ANSWER", "PARTIAL", or "NO_MATCH".
         """
 
         logger.debug(
-            f"RelevanceChecker.check called with question='{question}' and k={k}"
+            "RelevanceChecker.check called with question='{}' and k={}", question, k
         )
 
         # Retrieve doc chunks from the ensemble retriever
-        top_docs = retriever.invoke(question)
+        top_docs = documents if documents is not None else retriever.invoke(question)
+        RETRIEVED_DOCUMENTS.observe(len(top_docs), stage="relevance")
         if not top_docs:
             logger.debug(
                 "No documents returned from retriever.invoke(). Classifying as NO_MATCH."
             )
+            RELEVANCE_DECISIONS.inc(tier="local", label="NO_MATCH")
             return "NO_MATCH"
 
-        # Combine the top k chunk texts into one string
-        document_content = "\n\n".join(doc.page_content for doc in top_docs[:k])
+        local_label = self.gate.decide(question, top_docs)
+        if local_label is not None:
+            logger.info("Checker response (relevance gate): {}", local_label)
+            RELEVANCE_DECISIONS.inc(tier="local", label=local_label)
+            return local_label
 
-        # Create a prompt for the LLM to classify relevance
-        prompt = f"""
-        **Instructions:**
-        - Classify how well the document content addresses the user's question.
-        - Respond with only one of the following labels: CAN_ANSWER, PARTIAL, NO_MATCH.
-        - Do not include any additional text or explanation.
+        # Combine the top k chunk texts into one string; they are laid out as
+        # the start of the research context, so that call can reuse the prefix
+        document_content = format_context(top_docs, limit=k)
 
-        **Labels:**
-        1) "CAN_ANSWER": The passages contain enough explicit information to fully answer the question.
-        2) "PARTIAL": The passages mention or discuss the question's topic but do not provide all the details needed for a complete answer.
-        3) "NO_MATCH": The passages do not discuss or mention the question's topic at all.
-
-        **Important:** If the passages mention or reference the topic or timeframe of the question in any way, even if incomplete, respond with "PARTIAL" instead of "NO_MATCH".
-
-        **Question:** {question}
-        **Passages:** {document_content}
-
-        **Respond ONLY with one of the following labels: CAN_ANSWER, PARTIAL, NO_MATCH**
-        """
+        # Create a prompt for the LLM to classify relevance
+        prompt = build_prompt(
+            document_content, RELEVANCE_TASK, RELEVANCE_FORMAT, question=question
+        )
 
         # Call the Azure AI model
         try:
-            response = self.client.complete(
-                messages=[
-                    SystemMessage(
-                        content="You are an AI relevance checker between a user's question and provided document content."
-                    ),
-                    UserMessage(content=prompt),
-                ],
-                model=self.deployment_name,
-                temperature=0,
-                max_tokens=10,
-            )
+            with trace_llm_call("relevance", documents=min(k, len(top_docs))) as call:
+                response = self.client.complete(
+                    messages=messages(prompt),
+                    model=self.deployment_name,
+                    temperature=0,
+                    max_tokens=10,
+                    **call.hooks,
+                )
+                call.record_usage(getattr(response, "usage", None))
         except Exception as e:
-            logger.error(f"Error during model inference: {e}")
+            logger.error("Error during model inference: {}", e)
+            RELEVANCE_DECISIONS.inc(tier="llm", label="NO_MATCH")
             return "NO_MATCH"
 
         # Extract the content from the Azure AI response
         try:
             llm_response = response.choices[0].message.content.strip().upper()
-            logger.debug(f"LLM response: {llm_response}")
+            logger.debug("LLM response: {}", llm_response)
         except (AttributeError, IndexError) as e:
-            logger.error(f"Unexpected response structure: {e}")
+            logger.error("Unexpected response structure: {}", e)
+            RELEVANCE_DECISIONS.inc(tier="llm", label="NO_MATCH")
             return "NO_MATCH"
 
-        print(f"Checker response: {llm_response}")
+        logger.info("Checker response: {}", llm_response)
 
         # Validate the response
         valid_labels = {"CAN_ANSWER", "PARTIAL", "NO_MATCH"}
@@ -112,7 +94,8 @@ class RelevanceChecker:
             logger.debug("LLM did not respond with a valid label. Forcing 'NO_MATCH'.")
             classification = "NO_MATCH"
         else:
-            logger.debug(f"Classification recognized as '{llm_response}'.")
+            logger.debug("Classification recognized as '{}'.", llm_response)
             classification = llm_response
 
+        RELEVANCE_DECISIONS.inc(tier="llm", label=classification)
         return classification
@@ -0,0 +1,160 @@
+import math
+import re
+from typing import Dict, List, Optional, Set
+
+from langchain.schema import Document
+
+from config.settings import settings
+from utils.lazy import Lazy
+from utils.logging import logger
+from utils.metrics import RELEVANCE_DECISIONS
+
+MODES = ("off", "scores", "classifier")
+LABELS = ("CAN_ANSWER", "PARTIAL", "NO_MATCH")
+
+STOPWORDS = frozenset(
+    """
+    a about an and any are as at be been but by can could describe did do does
+    explain for from give had has have how i if in into is it its list me my of
+    on or our please should so some tell than that the their them then there
+    these they this those to us was we were what when where which who whom why
+    will with would you your
+    """.split()
+)
+
+_WORD = re.compile(r"\w+")
+
+
+def terms(text: str) -> List[str]:
+    """Lowercased content words of text (stopwords and single letters dropped)."""
+    return [
+        word
+        for word in _WORD.findall(text.lower())
+        if word not in STOPWORDS and (len(word) > 1 or word.isdigit())
+    ]
+
+
+def term_coverage(text: str, passages: List[str]) -> Optional[float]:
+    """
+    Share of the content terms of text that occur in the passages, or None if
+    text has no content terms.
+    """
+    text_terms = set(terms(text))
+    if not text_terms:
+        return None
+    vocabulary: Set[str] = set()
+    for passage in passages:
+        vocabulary.update(terms(passage))
+    # A shared five-letter prefix stands in for stemming ("model" / "models")
+    prefixes = {word[:5] for word in vocabulary if len(word) >= 5}
+    matched = sum(
+        term in vocabulary or (len(term) >= 5 and term[:5] in prefixes)
+        for term in text_terms
+    )
+    return matched / len(text_terms)
+
+
+def _sigmoid(logit: float) -> float:
+    return 1 / (1 + math.exp(-max(min(logit, 50.0), -50.0)))
+
+
+def escalation_rate() -> float:
+    """Share of the relevance labels so far that needed the LLM."""
+    local, llm = (
+        sum(RELEVANCE_DECISIONS.value(tier=tier, label=label) for label in LABELS)
+        for tier in ("local", "llm")
+    )
+    return llm / (local + llm) if local + llm else 0.0
+
+
+class RelevanceGate:
+    """
+    Label clear-cut questions from retrieval signals, without an LLM call.
+
+    Looks at the top_n retrieved chunks: the share of the question's terms
+    they contain ("coverage"), the best fused BM25/vector score ("agreement")
+    and cosine similarity ("similarity") when the retriever recorded them, and
+    the cross-encoder probability ("classifier") when the chunks were reranked
+    or the mode is "classifier". decide() returns CAN_ANSWER or NO_MATCH for
+    confident cases and None for everything the LLM should look at.
+    """
+
+    def __init__(self, mode: Optional[str] = None, top_n: Optional[int] = None):
+        self.mode = (mode or settings.RELEVANCE_GATE).lower()
+        if self.mode not in MODES:
+            raise ValueError(
+                f"Unknown relevance gate mode '{self.mode}', expected one of {MODES}"
+            )
+        self.top_n = top_n or settings.RELEVANCE_GATE_DOCS
+        self.classifier = Lazy(self._build_classifier, "relevance classifier")
+
+    @staticmethod
+    def _build_classifier():
+        # Imported here so the ONNX stack only loads in "classifier" mode
+        from retriever.reranker import build_reranker
+
+        return build_reranker()
+
+    def decide(self, question: str, documents: List[Document]) -> Optional[str]:
+        if self.mode == "off" or not documents:
+            return None
+        signals = self.signals(question, documents)
+        label = self.label(signals)
+        logger.debug("Relevance gate signals {} -> {}", signals, label or "LLM")
+        return label
+
+    def signals(self, question: str, documents: List[Document]) -> Dict[str, float]:
+        top = documents[: self.top_n]
+        signals = {}
+
+        coverage = term_coverage(question, [doc.page_content for doc in top])
+        if coverage is not None:
+            signals["coverage"] = coverage
+
+        for name, key in (("agreement", "fused_score"), ("similarity", "vector_score")):
+            values = [doc.metadata[key] for doc in top if key in (doc.metadata or {})]
+            if values:
+                signals[name] = float(max(values))
+
+        logits = [
+            doc.metadata["rerank_score"]
+            for doc in top
+            if "rerank_score" in (doc.metadata or {})
+        ]
+        if not logits and self.mode == "classifier":
+            try:
+                logits = self.classifier.get().score(question, top)
+            except Exception as e:
+                logger.warning(
+                    "Relevance classifier unavailable, using scores only: {}", e
+                )
+                self.mode = "scores"
+        if logits:
+            signals["classifier"] = _sigmoid(max(logits))
+        return signals
+
+    def label(self, signals: Dict[str, float]) -> Optional[str]:
+        """CAN_ANSWER or NO_MATCH when the signals are conclusive, else None."""
+        # The cross-encoder is trained for exactly this judgement, so it decides
+        if "classifier" in signals:
+            if signals["classifier"] >= settings.RELEVANCE_CLASSIFIER_ACCEPT:
+                return "CAN_ANSWER"
+            if signals["classifier"] <= settings.RELEVANCE_CLASSIFIER_REJECT:
+                return "NO_MATCH"
+            return None
+
+        coverage = signals.get("coverage")
+        if coverage is None:
+            return None
+        # Scores the retriever did not record do not hold a decision back
+        if (
+            coverage >= settings.RELEVANCE_ACCEPT_COVERAGE
+            and signals.get("agreement", 1.0) >= settings.RELEVANCE_MIN_AGREEMENT
+        ):
+            return "CAN_ANSWER"
+        if (
+            coverage <= settings.RELEVANCE_REJECT_COVERAGE
+            and signals.get("similarity", 0.0) < settings.RELEVANCE_REJECT_VECTOR_SCORE
+        ):
+            return "NO_MATCH"
+        return None
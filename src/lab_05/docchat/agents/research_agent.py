@@ -1,44 +1,53 @@
-import os
-from typing import Dict, List
+import json
+import re
+from typing import Callable, Dict, List, Optional
 
-from azure.ai.inference import ChatCompletionsClient
-from azure.ai.inference.models import SystemMessage, UserMessage
-from azure.core.credentials import AzureKeyCredential
+from azure.ai.inference.models import ChatCompletionsResponseFormatJSON
 from langchain.schema import Document
 
-# Azure AI setup - these should be configured in your environment variables or settings
-azure_base_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-azure_api_key = os.getenv("AZURE_OPENAI_API_KEY")
-# use GPT-4o (or GPT-4-turbo) — These models are ideal for generating grounded,
-# high-quality responses based on retrieved content in a Retrieval-Augmented Generation (RAG) pipeline.
-# instead "meta-llama/llama-3-2-90b-vision-instruct",
-azure_deployment_name = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
-
-# Build full endpoint URL for Azure AI Inference
-azure_endpoint = f"{azure_base_endpoint}openai/deployments/{azure_deployment_name}"
-
-# Only initialize client if all required variables are present
-client = None
-if azure_base_endpoint and azure_api_key and azure_deployment_name:
-    client = ChatCompletionsClient(
-        endpoint=azure_endpoint, credential=AzureKeyCredential(azure_api_key)
+from agents.llm import get_client
+from agents.prompts import (
+    ASSESSED_FORMAT,
+    ASSESSED_TASK,
+    RESEARCH_FORMAT,
+    RESEARCH_TASK,
+    build_prompt,
+    format_context,
+    messages,
+)
+from agents.relevance_gate import term_coverage
+from config.settings import settings
+from utils.logging import logger, payload
+from utils.tracing import trace_llm_call
+
+NO_ANSWER = "I cannot answer this question based on the provided documents."
+SUPPORT_LEVELS = ("YES", "PARTIAL", "NO")
+
+
+def citations_hold(
+    answer: str, documents: List[Document], citations: List[int]
+) -> bool:
+    """
+    Cheap local check of an answer's citations: they must name existing chunks
+    (numbered from 1) and contain most of the answer's content terms.
+    """
+    if not citations or any(not 1 <= c <= len(documents) for c in citations):
+        return False
+    coverage = term_coverage(answer, [documents[c - 1].page_content for c in citations])
+    return (
+        coverage is not None and coverage >= settings.SELF_VERIFY_MIN_CITATION_COVERAGE
     )
 
 
 class ResearchAgent:
     def __init__(self):
         """
-        Initialize the research agent with the Azure AI client.
+        Initialize the research agent with the chat client routed by
+        settings.RESEARCH_LLM (or LLM_BACKEND).
         """
-        # Initialize the Azure AI client
-        if client is None:
-            raise ValueError(
-                "Azure AI client not initialized. Please check your environment variables."
-            )
-        print("Initializing ResearchAgent with Azure AI...")
-        self.client = client
-        self.deployment_name = azure_deployment_name
-        print("Azure AI client initialized successfully.")
+        logger.info("Initializing ResearchAgent...")
+        self.client, self.deployment_name = get_client("research")
+        logger.info("Chat client initialized successfully.")
 
     def sanitize_response(self, response_text: str) -> str:
         """
@@ -50,72 +59,183 @@ class ResearchAgent:
         """
         Generate a structured prompt for the LLM to generate a precise and factual answer.
         """
-        prompt = f"""
-        **Instructions:**
-        - Answer the following question using only the provided context.
-        - Be clear, concise, and factual.
-        - Return as much information as you can get from the context.
+        return build_prompt(context, RESEARCH_TASK, RESEARCH_FORMAT, question=question)
 
-        **Question:** {question}
-        **Context:**
-        {context}
+    def generate_assessed_prompt(self, question: str, context: str) -> str:
+        """
+        Prompt for an answer with its cited chunks and a rating of its support,
+        returned together as a JSON object.
+        """
+        return build_prompt(context, ASSESSED_TASK, ASSESSED_FORMAT, question=question)
 
-        **Provide your answer below:**
+    def generate_with_assessment(
+        self, question: str, documents: List[Document]
+    ) -> Dict:
         """
-        return prompt
+        Answer, cite and assess support in one structured call.
 
-    def generate(self, question: str, documents: List[Document]) -> Dict:
+        Returns draft_answer, citations (1-based chunk numbers), supported
+        ("YES", "PARTIAL" or "NO") and confidence. A reply that is not valid
+        JSON keeps its text as the answer and is rated unsupported, so the
+        caller verifies it separately.
+        """
+        logger.debug(
+            "ResearchAgent.generate_with_assessment called with question='{}' "
+            "and {} documents.",
+            question,
+            len(documents),
+        )
+        context = format_context(documents)
+        prompt = self.generate_assessed_prompt(question, context)
+        logger.opt(lazy=True).trace("Prompt:\n{}", lambda: payload(prompt))
+
+        try:
+            with trace_llm_call(
+                "research", mode="single_call", documents=len(documents)
+            ) as call:
+                response = self.client.complete(
+                    messages=messages(prompt),
+                    model=self.deployment_name,
+                    temperature=0.3,
+                    max_tokens=400,
+                    response_format=ChatCompletionsResponseFormatJSON(),
+                    **call.hooks,
+                )
+                call.record_usage(getattr(response, "usage", None))
+        except Exception as e:
+            logger.error("Error during model inference: {}", e)
+            raise RuntimeError("Failed to generate answer due to a model error.") from e
+
+        try:
+            llm_response = response.choices[0].message.content.strip()
+        except (AttributeError, IndexError) as e:
+            logger.warning("Unexpected response structure: {}", e)
+            llm_response = ""
+        logger.opt(lazy=True).debug(
+            "Raw LLM response:\n{}", lambda: payload(llm_response)
+        )
+
+        result = self.parse_assessed_response(llm_response)
+        result["context_used"] = context
+        return result
+
+    def parse_assessed_response(self, response_text: str) -> Dict:
+        """Parse the JSON reply of generate_with_assessment, tolerating fences."""
+        # Some models wrap JSON in a ```json fence even in JSON mode
+        text = re.sub(r"^```(?:json)?\s*|\s*```$", "", response_text.strip())
+        try:
+            data = json.loads(text)
+            if not isinstance(data, dict):
+                raise ValueError("not a JSON object")
+            answer = self.sanitize_response(str(data.get("answer") or ""))
+            citations = [int(c) for c in data.get("citations") or []]
+            supported = str(data.get("supported", "NO")).upper()
+            confidence = min(max(float(data.get("confidence", 0.0)), 0.0), 1.0)
+        except (ValueError, TypeError) as e:
+            logger.warning("LLM did not return the expected JSON: {}", e)
+            return {
+                "draft_answer": self.sanitize_response(response_text) or NO_ANSWER,
+                "citations": [],
+                "supported": "NO",
+                "confidence": 0.0,
+            }
+        return {
+            "draft_answer": answer or NO_ANSWER,
+            "citations": citations,
+            "supported": supported if supported in SUPPORT_LEVELS else "NO",
+            "confidence": confidence,
+        }
+
+    def generate(
+        self,
+        question: str,
+        documents: List[Document],
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> Dict:
         """
         Generate an initial answer using the provided documents.
+
+        If on_token is given, the completion is streamed and on_token is called
+        with each piece of text as it arrives; the return value is the same.
         """
-        print(
-            f"ResearchAgent.generate called with question='{question}' and {len(documents)} documents."
+        logger.debug(
+            "ResearchAgent.generate called with question='{}' and {} documents.",
+            question,
+            len(documents),
         )
 
-        # Combine the top document contents into one string
-        context = "\n\n".join([doc.page_content for doc in documents])
-        print(f"Combined context length: {len(context)} characters.")
+        # Combine the top document contents into one string, laid out the same
+        # way as for the other agents so the provider can reuse the prefix
+        context = format_context(documents)
+        logger.debug("Combined context length: {} characters.", len(context))
 
         # Create a prompt for the LLM
         prompt = self.generate_prompt(question, context)
-        print("Prompt created for the LLM.")
+        logger.opt(lazy=True).trace("Prompt:\n{}", lambda: payload(prompt))
 
         # Call the Azure AI model to generate the answer
         try:
-            print("Sending prompt to the model...")
-            response = self.client.complete(
-                messages=[
-                    SystemMessage(
-                        content="You are an AI assistant designed to provide precise and factual answers based on the given context."
-                    ),
-                    UserMessage(content=prompt),
-                ],
-                model=self.deployment_name,
-                temperature=0.3,
-                max_tokens=300,
-            )
-            print("LLM response received.")
+            logger.debug("Sending prompt to the model...")
+            with trace_llm_call(
+                "research", streaming=on_token is not None, documents=len(documents)
+            ) as call:
+                response = self.client.complete(
+                    messages=messages(prompt),
+                    model=self.deployment_name,
+                    temperature=0.3,
+                    max_tokens=300,
+                    stream=on_token is not None,
+                    **call.hooks,
+                )
+                if on_token is not None:
+                    llm_response = self._consume_stream(response, on_token, call)
+                else:
+                    call.record_usage(getattr(response, "usage", None))
+            logger.debug("LLM response received.")
         except Exception as e:
-            print(f"Error during model inference: {e}")
+            logger.error("Error during model inference: {}", e)
             raise RuntimeError("Failed to generate answer due to a model error.") from e
 
         # Extract and process the Azure AI response
-        try:
-            llm_response = response.choices[0].message.content.strip()
-            print(f"Raw LLM response:\n{llm_response}")
-        except (AttributeError, IndexError) as e:
-            print(f"Unexpected response structure: {e}")
-            llm_response = (
-                "I cannot answer this question based on the provided documents."
-            )
+        if on_token is None:
+            try:
+                llm_response = response.choices[0].message.content.strip()
+                logger.opt(lazy=True).debug(
+                    "Raw LLM response:\n{}", lambda: payload(llm_response)
+                )
+            except (AttributeError, IndexError) as e:
+                logger.warning("Unexpected response structure: {}", e)
+                llm_response = NO_ANSWER
 
         # Sanitize the response
         draft_answer = (
-            self.sanitize_response(llm_response)
-            if llm_response
-            else "I cannot answer this question based on the provided documents."
+            self.sanitize_response(llm_response) if llm_response else NO_ANSWER
         )
 
-        print(f"Generated answer: {draft_answer}")
+        logger.opt(lazy=True).debug(
+            "Generated answer: {}", lambda: payload(draft_answer)
+        )
 
         return {"draft_answer": draft_answer, "context_used": context}
+
+    def _consume_stream(
+        self, response, on_token: Callable[[str], None], call=None
+    ) -> str:
+        """Forward streamed deltas to on_token and return the full completion."""
+        pieces = []
+        try:
+            for update in response:
+                usage = getattr(update, "usage", None)
+                if usage is not None and call is not None:
+                    call.record_usage(usage)
+                if not update.choices:
+                    continue
+                delta = update.choices[0].delta.content
+                if delta:
+                    pieces.append(delta)
+                    on_token(delta)
+        finally:
+            close = getattr(response, "close", None)
+            if close is not None:
+                close()
+        return "".join(pieces).strip()
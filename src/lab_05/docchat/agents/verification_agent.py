@@ -1,47 +1,36 @@
-import os
 from typing import Dict, List
 
-from azure.ai.inference import ChatCompletionsClient
-from azure.ai.inference.models import SystemMessage, UserMessage
-from azure.core.credentials import AzureKeyCredential
-from dotenv import load_dotenv
 from langchain.schema import Document
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Azure AI setup - these should be configured in your environment variables or settings
-azure_base_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-azure_api_key = os.getenv("AZURE_OPENAI_API_KEY")
-# GPT-4o or GPT-4-turbo These models are ideal for evaluating the consistency and groundedness of
-# generated answers against retrieved documents. They support structured prompting and can be used in evaluation pipelines.
-azure_deployment_name = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
-
-# Build full endpoint URL for Azure AI Inference
-azure_endpoint = f"{azure_base_endpoint}openai/deployments/{azure_deployment_name}"
-
-# Only initialize client if all required variables are present
-client = None
-if azure_base_endpoint and azure_api_key and azure_deployment_name:
-    client = ChatCompletionsClient(
-        endpoint=azure_endpoint, credential=AzureKeyCredential(azure_api_key)
-    )
+from agents.grounding import UNCONFIRMED, GroundingChecker, summarize
+from agents.llm import get_client
+from agents.prompts import (
+    VERIFICATION_FORMAT,
+    VERIFICATION_TASK,
+    build_prompt,
+    format_context,
+    messages,
+)
+from config.settings import settings
+from utils.logging import logger, payload
+from utils.tracing import trace_llm_call
 
 
 class VerificationAgent:
     def __init__(self):
         """
-        Initialize the verification agent with the Azure AI client.
+        Initialize the verification agent with the chat client routed by
+        settings.VERIFICATION_LLM (or LLM_BACKEND).
         """
-        # Initialize the Azure AI client
-        if client is None:
+        logger.info("Initializing VerificationAgent...")
+        self.client, self.deployment_name = get_client("verification")
+        logger.info("Chat client initialized successfully.")
+        if settings.GROUNDING_MODE not in ("off", "local"):
             raise ValueError(
-                "Azure AI client not initialized. Please check your environment variables."
+                f"Unknown GROUNDING_MODE '{settings.GROUNDING_MODE}'. "
+                "Use 'off' or 'local'."
             )
-        print("Initializing VerificationAgent with Azure AI...")
-        self.client = client
-        self.deployment_name = azure_deployment_name
-        print("Azure AI client initialized successfully.")
+        self.grounding = GroundingChecker()
 
     def sanitize_response(self, response_text: str) -> str:
         """
@@ -53,31 +42,9 @@ class VerificationAgent:
         """
         Generate a structured prompt for the LLM to verify the answer against the context.
         """
-        prompt = f"""
-        **Instructions:**
-        - Verify the following answer against the provided context.
-        - Check for:
-        1. Direct/indirect factual support (YES/NO)
-        2. Unsupported claims (list any if present)
-        3. Contradictions (list any if present)
-        4. Relevance to the question (YES/NO)
-        - Provide additional details or explanations where relevant.
-        - Respond in the exact format specified below without adding any unrelated information.
-
-        **Format:**
-        Supported: YES/NO
-        Unsupported Claims: [item1, item2, ...]
-        Contradictions: [item1, item2, ...]
-        Relevant: YES/NO
-        Additional Details: [Any extra information or explanations]
-
-        **Answer:** {answer}
-        **Context:**
-        {context}
-
-        **Respond ONLY with the above format.**
-        """
-        return prompt
+        return build_prompt(
+            context, VERIFICATION_TASK, VERIFICATION_FORMAT, answer=answer
+        )
 
     def parse_verification_response(self, response_text: str) -> Dict:
         """
@@ -153,10 +120,11 @@ class VerificationAgent:
 
             return verification
         except Exception as e:
-            print(f"Error parsing verification response: {e}")
+            logger.warning("Error parsing verification response: {}", e)
             return None
 
-    def format_verification_report(self, verification: Dict) -> str:
+    @staticmethod
+    def format_verification_report(verification: Dict) -> str:
         """
         Format the verification report dictionary into a readable paragraph.
         """
@@ -189,44 +157,68 @@ class VerificationAgent:
     def check(self, answer: str, documents: List[Document]) -> Dict:
         """
         Verify the answer against the provided documents.
+
+        With GROUNDING_MODE "local" the answer's claims are first checked
+        against the documents locally: if all are confirmed no LLM call is
+        made, otherwise only the unconfirmed claims are sent for verification.
+        The per-claim report is returned under "claims".
         """
-        print(
-            f"VerificationAgent.check called with answer='{answer}' and {len(documents)} documents."
+        logger.opt(lazy=True).debug(
+            "VerificationAgent.check called with answer='{}' and {} documents.",
+            lambda: payload(answer),
+            lambda: len(documents),
         )
 
-        # Combine all document contents into one string without truncation
-        context = "\n\n".join([doc.page_content for doc in documents])
-        print(f"Combined context length: {len(context)} characters.")
+        # Combine all document contents into one string without truncation,
+        # laid out like the research prompt so the provider can reuse the prefix
+        context = format_context(documents)
+        logger.debug("Combined context length: {} characters.", len(context))
+
+        grounding = None
+        if settings.GROUNDING_MODE == "local":
+            grounding = self.grounding.check(answer, documents)
+            logger.opt(lazy=True).debug(
+                "Local grounding: {}", lambda: summarize(grounding)
+            )
+            unconfirmed = [
+                claim["claim"]
+                for claim in grounding["claims"]
+                if claim["status"] == UNCONFIRMED
+            ]
+            if grounding["claims"] and not unconfirmed:
+                return self._grounded_result(grounding, context)
+            if unconfirmed:
+                answer = " ".join(unconfirmed)
 
         # Create a prompt for the LLM to verify the answer
         prompt = self.generate_prompt(answer, context)
-        print("Prompt created for the LLM.")
+        logger.opt(lazy=True).trace("Prompt:\n{}", lambda: payload(prompt))
 
         # Call the Azure AI model to generate the verification report
         try:
-            print("Sending prompt to the model...")
-            response = self.client.complete(
-                messages=[
-                    SystemMessage(
-                        content="You are an AI assistant designed to verify the accuracy and relevance of answers based on the provided context."
-                    ),
-                    UserMessage(content=prompt),
-                ],
-                model=self.deployment_name,
-                temperature=0.0,
-                max_tokens=200,
-            )
-            print("LLM response received.")
+            logger.debug("Sending prompt to the model...")
+            with trace_llm_call("verification", documents=len(documents)) as call:
+                response = self.client.complete(
+                    messages=messages(prompt),
+                    model=self.deployment_name,
+                    temperature=0.0,
+                    max_tokens=200,
+                    **call.hooks,
+                )
+                call.record_usage(getattr(response, "usage", None))
+            logger.debug("LLM response received.")
         except Exception as e:
-            print(f"Error during model inference: {e}")
+            logger.error("Error during model inference: {}", e)
             raise RuntimeError("Failed to verify answer due to a model error.") from e
 
         # Extract and process the Azure AI response
         try:
             llm_response = response.choices[0].message.content.strip()
-            print(f"Raw LLM response:\n{llm_response}")
+            logger.opt(lazy=True).debug(
+                "Raw LLM response:\n{}", lambda: payload(llm_response)
+            )
         except (AttributeError, IndexError) as e:
-            print(f"Unexpected response structure: {e}")
+            logger.warning("Unexpected response structure: {}", e)
             verification_report = {
                 "Supported": "NO",
                 "Unsupported Claims": [],
@@ -237,8 +229,7 @@ class VerificationAgent:
             verification_report_formatted = self.format_verification_report(
                 verification_report
             )
-            print(f"Verification report:\n{verification_report_formatted}")
-            print(f"Context used: {context}")
+            logger.debug("Verification report:\n{}", verification_report_formatted)
             return {
                 "verification_report": verification_report_formatted,
                 "context_used": context,
@@ -249,7 +240,7 @@ class VerificationAgent:
             self.sanitize_response(llm_response) if llm_response else ""
         )
         if not sanitized_response:
-            print("LLM returned an empty response.")
+            logger.warning("LLM returned an empty response.")
             verification_report = {
                 "Supported": "NO",
                 "Unsupported Claims": [],
@@ -261,7 +252,7 @@ class VerificationAgent:
             # Parse the response into the expected format
             verification_report = self.parse_verification_response(sanitized_response)
             if verification_report is None:
-                print(
+                logger.warning(
                     "LLM did not respond with the expected format. Using default verification report."
                 )
                 verification_report = {
@@ -272,14 +263,41 @@ class VerificationAgent:
                     "Additional Details": "Failed to parse the model's response.",
                 }
 
+        if grounding is not None:
+            details = verification_report["Additional Details"]
+            verification_report["Additional Details"] = (
+                f"{summarize(grounding)} The rest was checked by the model. {details}"
+            ).strip()
+
         # Format the verification report into a paragraph
         verification_report_formatted = self.format_verification_report(
             verification_report
         )
-        print(f"Verification report:\n{verification_report_formatted}")
-        print(f"Context used: {context}")
+        logger.debug("Verification report:\n{}", verification_report_formatted)
+        logger.opt(lazy=True).trace("Context used: {}", lambda: payload(context))
+
+        result = {
+            "verification_report": verification_report_formatted,
+            "context_used": context,
+        }
+        if grounding is not None:
+            result["claims"] = grounding["claims"]
+        return result
 
+    def _grounded_result(self, grounding: Dict, context: str) -> Dict:
+        """Result for an answer whose claims were all confirmed locally."""
+        verification_report_formatted = self.format_verification_report(
+            {
+                "Supported": "YES",
+                "Unsupported Claims": [],
+                "Contradictions": [],
+                "Relevant": "YES",
+                "Additional Details": summarize(grounding),
+            }
+        )
+        logger.debug("Verification report:\n{}", verification_report_formatted)
         return {
             "verification_report": verification_report_formatted,
             "context_used": context,
+            "claims": grounding["claims"],
         }
@@ -1,70 +1,169 @@
-import logging
-from typing import Dict, List, TypedDict
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple, TypedDict
 
-from langchain.retrievers import EnsembleRetriever
 from langchain.schema import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, StateGraph
+from langgraph.types import StreamWriter
 
+from agents.checkpoints import (
+    delete_thread,
+    expire_threads,
+    open_checkpointer,
+    touch_thread,
+)
+from agents.context_budget import ContextBudget
 from agents.relevance_checker import RelevanceChecker
-from agents.research_agent import ResearchAgent
+from agents.research_agent import ResearchAgent, citations_hold
 from agents.verification_agent import VerificationAgent
-
-logger = logging.getLogger(__name__)
+from config.settings import settings
+from retriever.batch_retrieval import batch_retrieve
+from retriever.retriever_registry import RetrieverRegistry
+from utils.logging import (
+    get_request_id,
+    logger,
+    new_request_id,
+    request_context,
+    request_scope,
+)
+from utils.metrics import RETRIEVED_DOCUMENTS, SELF_CHECKS
+from utils.scheduler import FairScheduler
+from utils.tracing import pipeline_span, trace_node
 
 
 class AgentState(TypedDict):
     question: str
-    documents: List[Document]
+    documents: Optional[List[Document]]  # retrieved by the relevance step if None
     draft_answer: str
     verification_report: str
     is_relevant: bool
-    retriever: EnsembleRetriever
+    corpus_id: str  # resolved to a retriever through AgentWorkflow.retrievers
+    answer_mode: str  # one of ANSWER_MODES
+    context: Optional[List[Document]]  # the prefix of documents the answers use
+
+
+ANSWER_MODES = ("two_step", "single_call")
+
+
+def session_weights() -> Dict[str, float]:
+    """PIPELINE_SESSION_WEIGHTS ("session=weight" pairs, comma-separated)."""
+    weights = {}
+    for pair in settings.PIPELINE_SESSION_WEIGHTS.split(","):
+        if not pair.strip():
+            continue
+        session, _, weight = pair.strip().rpartition("=")
+        try:
+            value = float(weight)
+        except ValueError:
+            value = 0.0
+        if not session.strip() or value <= 0:
+            raise ValueError(
+                f"Invalid PIPELINE_SESSION_WEIGHTS entry '{pair.strip()}', "
+                "expected session=weight with a positive weight"
+            )
+        weights[session.strip()] = value
+    return weights
+
+
+def pipeline_scheduler() -> FairScheduler:
+    """Scheduler sharing the process's question slots fairly between sessions."""
+    return FairScheduler(
+        "pipeline",
+        max_concurrency=settings.PIPELINE_MAX_CONCURRENCY,
+        session_concurrency=settings.PIPELINE_SESSION_CONCURRENCY,
+        max_queued=settings.PIPELINE_MAX_QUEUED,
+        session_max_queued=settings.PIPELINE_SESSION_MAX_QUEUED,
+        queue_timeout=settings.PIPELINE_QUEUE_TIMEOUT_SECONDS,
+        weights=session_weights(),
+    )
 
 
 class AgentWorkflow:
-    def __init__(self):
+    def __init__(self, checkpointer=None, retriever_resolver=None):
+        """
+        checkpointer defaults to the SQLite checkpointer at CHECKPOINT_DB_PATH;
+        retriever_resolver (e.g. CorpusIndex.get_retriever) resolves corpus IDs
+        of runs resumed in a process that did not start them.
+        """
         self.researcher = ResearchAgent()
         self.verifier = VerificationAgent()
         self.relevance_checker = RelevanceChecker()
-        self.compiled_workflow = (
-            self.build_workflow()
+        self.context_budget = ContextBudget()
+        self.retrievers = RetrieverRegistry(retriever_resolver)
+        self.checkpointer = checkpointer or open_checkpointer()
+        self.last_checkpoint_gc = time.monotonic()  # open_checkpointer just ran it
+        self.scheduler = pipeline_scheduler()
+        self.compiled_workflow = self.build_workflow(
+            self.checkpointer
         )  # Compile once during initialization
 
-    def build_workflow(self):
-        """Create and compile the multi-agent workflow."""
+    def build_workflow(self, checkpointer=None):
+        """
+        Create and compile the multi-agent workflow.
+
+        With a checkpointer, the state is saved after every node, keyed by the
+        request ID, so a failed run retried under the same request ID resumes
+        from its last completed node instead of repeating LLM calls.
+        """
         workflow = StateGraph(AgentState)
 
-        # Add nodes
-        workflow.add_node("check_relevance", self._check_relevance_step)
-        workflow.add_node("research", self._research_step)
-        workflow.add_node("verify", self._verification_step)
+        # Add nodes (each traced with its own span and duration metric)
+        workflow.add_node(
+            "check_relevance",
+            trace_node("check_relevance", self._check_relevance_step),
+        )
+        workflow.add_node("research", trace_node("research", self._research_step))
+        workflow.add_node("answer", trace_node("answer", self._answer_step))
+        workflow.add_node("verify", trace_node("verify", self._verification_step))
 
         # Define edges
         workflow.set_entry_point("check_relevance")
         workflow.add_conditional_edges(
             "check_relevance",
             self._decide_after_relevance_check,
-            {"relevant": "research", "irrelevant": END},
+            {"relevant": "research", "single_call": "answer", "irrelevant": END},
         )
         workflow.add_edge("research", "verify")
+        workflow.add_conditional_edges(
+            "answer", self._decide_after_answer, {"verify": "verify", "end": END}
+        )
         workflow.add_conditional_edges(
             "verify", self._decide_next_step, {"re_research": "research", "end": END}
         )
-        return workflow.compile()
+        return workflow.compile(checkpointer=checkpointer)
 
     def _check_relevance_step(self, state: AgentState) -> Dict:
-        retriever = state["retriever"]
+        # LangGraph leaves None out of the checkpointed state
+        documents = state.get("documents")
+        if documents is None:
+            retriever = self.retrievers.get(state["corpus_id"])
+            documents = retriever.invoke(state["question"])
+            logger.info(
+                "Retrieved {} relevant documents (from .invoke)", len(documents)
+            )
+        RETRIEVED_DOCUMENTS.observe(len(documents), stage="pipeline")
         classification = self.relevance_checker.check(
-            question=state["question"], retriever=retriever, k=20
+            question=state["question"],
+            retriever=None,
+            k=min(20, self.context_budget.relevance_depth(documents)),
+            documents=documents,
         )
 
-        if classification == "CAN_ANSWER":
-            # We have enough info to proceed
-            return {"is_relevant": True}
-
-        elif classification == "PARTIAL":
-            # There's partial coverage, but we can still proceed
-            return {"is_relevant": True}
+        if classification in ("CAN_ANSWER", "PARTIAL"):
+            # Enough (or partial) coverage to proceed; the label sizes the context
+            context = self.context_budget.select(documents, classification)
+            logger.info(
+                "Answering from {} of {} documents ({})",
+                len(context),
+                len(documents),
+                classification,
+            )
+            RETRIEVED_DOCUMENTS.observe(len(context), stage="context")
+            return {"is_relevant": True, "documents": documents, "context": context}
 
         else:  # classification == "NO_MATCH"
             return {
@@ -73,58 +172,437 @@ class AgentWorkflow:
             }
 
     def _decide_after_relevance_check(self, state: AgentState) -> str:
-        decision = "relevant" if state["is_relevant"] else "irrelevant"
-        print(f"[DEBUG] _decide_after_relevance_check -> {decision}")
+        if not state["is_relevant"]:
+            decision = "irrelevant"
+        elif state.get("answer_mode") == "single_call":
+            decision = "single_call"
+        else:
+            decision = "relevant"
+        logger.debug("_decide_after_relevance_check -> {}", decision)
         return decision
 
-    def full_pipeline(self, question: str, retriever: EnsembleRetriever):
-        try:
-            print(f"[DEBUG] Starting full_pipeline with question='{question}'")
-            documents = retriever.invoke(question)
-            logger.info(f"Retrieved {len(documents)} relevant documents (from .invoke)")
-
-            initial_state = AgentState(
-                question=question,
-                documents=documents,
-                draft_answer="",
-                verification_report="",
-                is_relevant=False,
-                retriever=retriever,
+    def _initial_state(
+        self,
+        question: str,
+        corpus_id: str,
+        documents: Optional[List[Document]] = None,
+        answer_mode: Optional[str] = None,
+    ) -> AgentState:
+        answer_mode = answer_mode or settings.ANSWER_MODE
+        if answer_mode not in ANSWER_MODES:
+            raise ValueError(
+                f"Unknown answer mode '{answer_mode}', expected one of {ANSWER_MODES}"
             )
+        # Without documents (retrieved in bulk by a batch) the state only names
+        # the corpus, and the relevance step retrieves through self.retrievers
+        return AgentState(
+            question=question,
+            documents=documents,
+            draft_answer="",
+            verification_report="",
+            is_relevant=False,
+            corpus_id=corpus_id,
+            answer_mode=answer_mode,
+            context=documents,
+        )
+
+    def _start_or_resume(
+        self,
+        question: str,
+        retriever: BaseRetriever,
+        corpus_id: Optional[str],
+        config: Dict,
+        answer_mode: Optional[str] = None,
+    ) -> Tuple[Optional[AgentState], Dict]:
+        """
+        Graph input for a run and the state it starts from.
+
+        If the request's thread has an unfinished checkpoint for the same
+        question, the input is None, which makes LangGraph resume after the
+        last completed node.
+        """
+        corpus_id = self.retrievers.register(retriever, corpus_id)
+        self._start_run(config)
+        if self.checkpointer is not None:
+            snapshot = self.compiled_workflow.get_state(config)
+            if snapshot.next and snapshot.values.get("question") == question:
+                logger.info("Resuming run at node(s) {}", ", ".join(snapshot.next))
+                return None, dict(snapshot.values)
+        initial_state = self._initial_state(
+            question, corpus_id, answer_mode=answer_mode
+        )
+        return initial_state, dict(initial_state)
+
+    def _run_config(self, trace_context, **configurable) -> Dict:
+        # The request ID doubles as the checkpoint thread
+        return {
+            "configurable": {
+                "thread_id": get_request_id(),
+                "trace_context": trace_context,
+                **configurable,
+            }
+        }
+
+    def _start_run(self, config: Dict):
+        touch_thread(self.checkpointer, config["configurable"]["thread_id"])
+        now = time.monotonic()
+        if now - self.last_checkpoint_gc >= settings.CHECKPOINT_GC_INTERVAL_SECONDS:
+            self.last_checkpoint_gc = now
+            expire_threads(self.checkpointer, settings.CHECKPOINT_TTL_HOURS * 3600)
+
+    def _finish_run(self, config: Dict):
+        delete_thread(self.checkpointer, config["configurable"]["thread_id"])
+
+    def full_pipeline(
+        self,
+        question: str,
+        retriever: BaseRetriever,
+        request_id: Optional[str] = None,
+        corpus_id: Optional[str] = None,
+        answer_mode: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ):
+        """
+        Answer a question over the retriever's corpus.
 
-            final_state = self.compiled_workflow.invoke(initial_state)
+        Pass the request ID of a failed attempt to resume it, corpus_id when
+        the retriever comes from a CorpusIndex, and answer_mode to override
+        ANSWER_MODE for this question. The run waits for its turn among the
+        questions of other sessions (session_id) and raises Busy when the
+        scheduler turns it away.
+        """
+        with request_context(request_id), self.scheduler.admit(session_id):
+            return self._run_pipeline(question, retriever, corpus_id, answer_mode)
+
+    def _run_pipeline(
+        self,
+        question: str,
+        retriever: BaseRetriever,
+        corpus_id: Optional[str],
+        answer_mode: Optional[str],
+    ):
+        try:
+            logger.debug("Starting full_pipeline with question='{}'", question)
+            span, trace_context = pipeline_span("pipeline.full")
+            try:
+                config = self._run_config(trace_context)
+                graph_input, _ = self._start_or_resume(
+                    question, retriever, corpus_id, config, answer_mode
+                )
+                final_state = self.compiled_workflow.invoke(graph_input, config=config)
+                self._finish_run(config)
+                span.set_attribute(
+                    "docchat.documents", len(final_state.get("documents") or [])
+                )
+            finally:
+                span.end()
 
             return {
                 "draft_answer": final_state["draft_answer"],
                 "verification_report": final_state["verification_report"],
             }
         except Exception as e:
-            logger.error(f"Workflow execution failed: {e}")
+            logger.error("Workflow execution failed: {}", e)
+            raise
+
+    def stream_pipeline(
+        self,
+        question: str,
+        retriever: BaseRetriever,
+        request_id: Optional[str] = None,
+        corpus_id: Optional[str] = None,
+        answer_mode: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ) -> Iterator[Dict]:
+        """
+        Run the workflow and yield events as they happen.
+
+        The run is scheduled like full_pipeline's: the first event waits for
+        its turn and raising Busy there means it was turned away; the slot is
+        held until the generator finishes or is closed.
+
+        In "single_call" answer mode the draft arrives as one token, since
+        the structured reply is only usable once complete.
+
+        Events are dicts with a "type" key:
+        - "node": a graph node finished; "node" and its state "update"
+        - "draft_start": the researcher started a (new) draft; drop earlier tokens
+        - "token": a piece of the draft answer in "text"
+        - "final": "draft_answer" and "verification_report" of the finished run
+        """
+        # Each step runs in the request's scope, whichever thread resumes us
+        scope = request_scope(request_id)
+        with self.scheduler.admit(session_id):
+            events = self._stream_events(question, retriever, corpus_id, answer_mode)
+            while True:
+                try:
+                    event = scope.run(next, events)
+                except StopIteration:
+                    return
+                yield event
+
+    def _stream_events(
+        self,
+        question: str,
+        retriever: BaseRetriever,
+        corpus_id: Optional[str],
+        answer_mode: Optional[str],
+    ):
+        try:
+            logger.debug("Starting stream_pipeline with question='{}'", question)
+            span, trace_context = pipeline_span("pipeline.stream")
+            try:
+                config = self._run_config(trace_context, stream_tokens=True)
+                graph_input, final_state = self._start_or_resume(
+                    question, retriever, corpus_id, config, answer_mode
+                )
+
+                for mode, chunk in self.compiled_workflow.stream(
+                    graph_input,
+                    config=config,
+                    stream_mode=["updates", "custom"],
+                ):
+                    if mode == "custom":
+                        yield chunk
+                        continue
+                    for node, update in chunk.items():
+                        final_state.update(update or {})
+                        yield {"type": "node", "node": node, "update": update}
+                self._finish_run(config)
+                span.set_attribute(
+                    "docchat.documents", len(final_state.get("documents") or [])
+                )
+            finally:
+                span.end()
+
+            yield {
+                "type": "final",
+                "draft_answer": final_state["draft_answer"],
+                "verification_report": final_state["verification_report"],
+            }
+        except Exception as e:
+            logger.error("Workflow execution failed: {}", e)
             raise
 
-    def _research_step(self, state: AgentState) -> Dict:
-        print(f"[DEBUG] Entered _research_step with question='{state['question']}'")
-        result = self.researcher.generate(state["question"], state["documents"])
-        print("[DEBUG] Researcher returned draft answer.")
-        return {"draft_answer": result["draft_answer"]}
+    def batch_pipeline(
+        self,
+        questions: List[str],
+        retriever: BaseRetriever,
+        max_concurrency: Optional[int] = None,
+        output_path: Optional[str] = None,
+        corpus_id: Optional[str] = None,
+        answer_mode: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ) -> Iterator[Dict]:
+        """
+        Answer many questions over one corpus, yielding one result per question
+        in input order.
+
+        All questions are retrieved together (one embedding call, one vector
+        search), then at most max_concurrency questions (BATCH_MAX_CONCURRENCY
+        by default) run through the graph at a time, which bounds the LLM calls
+        in flight. Each question also waits for its turn in the scheduler as a
+        question of session_id (a session of the batch's own without one), up
+        to max_concurrency at a time, so a batch shares the process's slots
+        with other sessions instead of taking them all; it is never turned
+        away, since max_concurrency already bounds what it queues. A failed question
+        yields a result with "error" set instead of stopping the batch. With
+        output_path, every result is also appended to that file as one JSON
+        line as soon as it is yielded.
+        """
+        questions = list(questions)
+        concurrency = max_concurrency or settings.BATCH_MAX_CONCURRENCY
+        # All questions queue as one session, or a batch would skip fair queuing
+        session_id = session_id or f"batch-{uuid.uuid4().hex}"
+        corpus_id = self.retrievers.register(retriever, corpus_id)
+        span, trace_context = pipeline_span(
+            "pipeline.batch", questions=len(questions), concurrency=concurrency
+        )
+        try:
+            try:
+                documents = batch_retrieve(retriever, questions)
+                logger.info("Retrieved documents for {} questions", len(questions))
+            except Exception as e:
+                # Fall back to retrieving per question, so errors stay per question
+                logger.warning("Batched retrieval failed, retrying per question: {}", e)
+                documents = [None] * len(questions)
+
+            pool = ThreadPoolExecutor(
+                max_workers=max(1, concurrency), thread_name_prefix="batch"
+            )
+            output = open(output_path, "a", encoding="utf-8") if output_path else None
+            try:
+                futures = [
+                    pool.submit(
+                        self._answer_one,
+                        i,
+                        question,
+                        corpus_id,
+                        docs,
+                        trace_context,
+                        answer_mode,
+                        session_id,
+                        concurrency,
+                    )
+                    for i, (question, docs) in enumerate(zip(questions, documents))
+                ]
+                failed = 0
+                for future in futures:
+                    result = future.result()
+                    failed += result["error"] is not None
+                    if output:
+                        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                        output.flush()
+                    yield result
+                logger.info(
+                    "Batch finished: {} answered, {} failed",
+                    len(questions) - failed,
+                    failed,
+                )
+            finally:
+                # Stops queued questions if the caller abandons the generator
+                pool.shutdown(wait=False, cancel_futures=True)
+                if output:
+                    output.close()
+        finally:
+            span.end()
+
+    def _answer_one(
+        self,
+        index: int,
+        question: str,
+        corpus_id: str,
+        documents: Optional[List[Document]],
+        trace_context,
+        answer_mode: Optional[str] = None,
+        session_id: Optional[str] = None,
+        concurrency: Optional[int] = None,
+    ) -> Dict:
+        result = {"index": index, "question": question, "request_id": new_request_id()}
+        start = time.perf_counter()
+        with (
+            request_context(result["request_id"]),
+            self.scheduler.admit(session_id, shed=False, limit=concurrency),
+        ):
+            try:
+                initial_state = self._initial_state(
+                    question, corpus_id, documents, answer_mode
+                )
+                config = self._run_config(trace_context)
+                self._start_run(config)
+                final_state = self.compiled_workflow.invoke(
+                    initial_state, config=config
+                )
+                self._finish_run(config)
+                result.update(
+                    draft_answer=final_state["draft_answer"],
+                    verification_report=final_state["verification_report"],
+                    error=None,
+                )
+            except Exception as e:
+                logger.error("Question {} failed: {}", index, e)
+                result.update(
+                    draft_answer=None,
+                    verification_report=None,
+                    error=f"{type(e).__name__}: {e}",
+                )
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        return result
+
+    def _research_step(
+        self, state: AgentState, config: RunnableConfig, writer: StreamWriter
+    ) -> Dict:
+        logger.debug("Entered _research_step with question='{}'", state["question"])
+        on_token = None
+        if config.get("configurable", {}).get("stream_tokens"):
+            writer({"type": "draft_start"})
+
+            def on_token(text: str):
+                writer({"type": "token", "text": text})
+
+        context = _context(state)
+        if state["draft_answer"]:
+            # Re-research after a failed verification: widen the context
+            context = self.context_budget.expand(context, state["documents"])
+            logger.info("Re-researching with {} documents", len(context))
+        result = self.researcher.generate(state["question"], context, on_token=on_token)
+        logger.debug("Researcher returned draft answer.")
+        return {"draft_answer": result["draft_answer"], "context": context}
+
+    def _answer_step(
+        self, state: AgentState, config: RunnableConfig, writer: StreamWriter
+    ) -> Dict:
+        """
+        Single-call mode: answer with citations and a self-assessment. A
+        confident answer whose citations hold up locally gets its report from
+        the self-assessment; otherwise the report stays empty and the
+        verifier runs.
+        """
+        logger.debug("Entered _answer_step with question='{}'", state["question"])
+        context = _context(state)
+        result = self.researcher.generate_with_assessment(state["question"], context)
+        answer = result["draft_answer"]
+        if config.get("configurable", {}).get("stream_tokens"):
+            writer({"type": "draft_start"})
+            writer({"type": "token", "text": answer})
+
+        confident = (
+            result["supported"] == "YES"
+            and result["confidence"] >= settings.SELF_VERIFY_MIN_CONFIDENCE
+        )
+        if not (confident and citations_hold(answer, context, result["citations"])):
+            logger.info(
+                "Self-assessment not conclusive (supported={}, confidence={:.2f}), "
+                "verifying separately",
+                result["supported"],
+                result["confidence"],
+            )
+            SELF_CHECKS.inc(outcome="escalated")
+            return {"draft_answer": answer, "verification_report": ""}
+
+        SELF_CHECKS.inc(outcome="accepted")
+        cited = ", ".join(str(c) for c in result["citations"])
+        report = VerificationAgent.format_verification_report(
+            {
+                "Supported": "YES",
+                "Unsupported Claims": [],
+                "Contradictions": [],
+                "Relevant": "YES",
+                "Additional Details": (
+                    f"Self-assessed in the answering call (confidence "
+                    f"{result['confidence']:.2f}, cited chunks {cited})."
+                ),
+            }
+        )
+        return {"draft_answer": answer, "verification_report": report}
+
+    def _decide_after_answer(self, state: AgentState) -> str:
+        decision = "end" if state["verification_report"] else "verify"
+        logger.debug("_decide_after_answer -> {}", decision)
+        return decision
 
     def _verification_step(self, state: AgentState) -> Dict:
-        print("[DEBUG] Entered _verification_step. Verifying the draft answer...")
-        result = self.verifier.check(state["draft_answer"], state["documents"])
-        print("[DEBUG] VerificationAgent returned a verification report.")
+        logger.debug("Entered _verification_step. Verifying the draft answer...")
+        result = self.verifier.check(state["draft_answer"], _context(state))
+        logger.debug("VerificationAgent returned a verification report.")
         return {"verification_report": result["verification_report"]}
 
     def _decide_next_step(self, state: AgentState) -> str:
         verification_report = state["verification_report"]
-        print(
-            f"[DEBUG] _decide_next_step with verification_report='{verification_report}'"
+        logger.debug(
+            "_decide_next_step with verification_report='{}'", verification_report
         )
         if (
             "Supported: NO" in verification_report
             or "Relevant: NO" in verification_report
         ):
-            logger.info("[DEBUG] Verification indicates re-research needed.")
+            logger.info("Verification indicates re-research needed.")
             return "re_research"
         else:
-            logger.info("[DEBUG] Verification successful, ending workflow.")
+            logger.info("Verification successful, ending workflow.")
             return "end"
+
+
+def _context(state: AgentState) -> List[Document]:
+    # Checkpoints written before the context was tracked only have documents
+    return state.get("context") or state["documents"]
@@ -1,7 +1,6 @@
-import hashlib
 import os
 import sys
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 import gradio as gr
 
@@ -13,11 +12,14 @@ try:
 except ImportError:
     pass  # Use system sqlite3 if pysqlite3 not available
 
-from agents.workflow import AgentWorkflow
 from config import constants
-from document_processor.file_handler import DocumentProcessor
-from retriever.builder import RetrieverBuilder
-from utils.logging import logger
+from config.settings import settings
+from retriever.corpus_index import CorpusIndex, corpus_id_for, file_hash
+from retriever.ingest_queue import DONE, IngestQueue
+from utils.lazy import Lazy, run_in_background
+from utils.logging import logger, new_request_id, request_context
+from utils.metrics import start_metrics_server
+from utils.scheduler import Busy
 
 # 1) Define some example data (i.e., question + paths to documents relevant to
 #    that question).
@@ -34,9 +36,27 @@ EXAMPLES = {
 
 
 def main():
-    processor = DocumentProcessor()
-    retriever_builder = RetrieverBuilder()
-    workflow = AgentWorkflow()
+    if settings.METRICS_PORT:
+        start_metrics_server(settings.METRICS_PORT)
+        logger.info(
+            f"Metrics available at http://127.0.0.1:{settings.METRICS_PORT}/metrics"
+        )
+
+    # Documents are ingested by background workers; questions only wait for
+    # the corpus they ask about
+    corpus_index = CorpusIndex(
+        settings.SERVER_DATA_DIR,
+        processor_factory=_document_processor,
+        builder_factory=_retriever_builder,
+        max_cached=settings.SERVER_MAX_CACHED_CORPORA,
+    )
+    ingest_queue = IngestQueue(corpus_index)
+    ingest_queue.start()
+    # The agents connect to Azure and compile the graph on the first question
+    workflow = Lazy(lambda: _agent_workflow(corpus_index), "agent workflow")
+    if settings.STARTUP_PREWARM:
+        workflow.prewarm()
+        run_in_background(corpus_index.warm_up, "pre-warm of document models")
 
     # Define custom CSS for styling
     css = """
@@ -108,7 +128,9 @@ def main():
         )
 
         # 2) Maintain the session state for retrieving doc changes
-        session_state = gr.State({"file_hashes": frozenset(), "retriever": None})
+        session_state = gr.State(
+            {"corpus_id": None, "retriever": None, "failed_run": None}
+        )
 
         # 3) Layout
         with gr.Row():
@@ -165,34 +187,79 @@ def main():
         )
 
         # 5) Standard flow for question submission
-        def process_question(question_text: str, uploaded_files: List, state: Dict):
-            """Handle questions with document caching."""
+        def process_question(
+            question_text: str,
+            uploaded_files: List,
+            state: Dict,
+            request: gr.Request,
+        ):
+            """Handle questions with document caching, streaming the draft answer."""
+            # Uploads and questions are scheduled fairly between browser sessions
+            session_id = getattr(request, "session_hash", None) or ""
+            run = None
             try:
                 if not question_text.strip():
                     raise ValueError("❌ Question cannot be empty")
                 if not uploaded_files:
                     raise ValueError("❌ No documents uploaded")
 
-                current_hashes = _get_file_hashes(uploaded_files)
-
-                if state["retriever"] is None or current_hashes != state["file_hashes"]:
-                    logger.info("Processing new/changed documents...")
-                    chunks = processor.process(uploaded_files)
-                    retriever = retriever_builder.build_hybrid_retriever(chunks)
-
-                    state.update(
-                        {"file_hashes": current_hashes, "retriever": retriever}
-                    )
-
-                result = workflow.full_pipeline(
-                    question=question_text, retriever=state["retriever"]
-                )
-
-                return result["draft_answer"], result["verification_report"], state
-
+                uploads = _read_uploads(uploaded_files)
+                corpus_id = corpus_id_for(file_hash(content) for _, content in uploads)
+                # Asking a failed question again resumes its run from the
+                # checkpoint instead of starting over
+                run = {"question": question_text, "corpus_id": corpus_id}
+                failed = state.get("failed_run")
+                if failed and all(failed[key] == run[key] for key in run):
+                    run["request_id"] = failed["request_id"]
+                else:
+                    run["request_id"] = new_request_id()
+                request_id = run["request_id"]
+
+                if state["retriever"] is None or corpus_id != state["corpus_id"]:
+                    with request_context(request_id):
+                        logger.info("Processing new/changed documents...")
+                        job = ingest_queue.submit(uploads, session=session_id)
+                    for job in ingest_queue.subscribe(job["id"]):
+                        yield f"⏳ {job['message']}...", "", state
+                    if job["status"] != DONE:
+                        raise ValueError(
+                            f"❌ Document processing {job['status']}: {job['error']}"
+                        )
+                    retriever = corpus_index.get_retriever(corpus_id)
+
+                    state.update({"corpus_id": corpus_id, "retriever": retriever})
+
+                draft = ""
+                for event in workflow.get().stream_pipeline(
+                    question=question_text,
+                    retriever=state["retriever"],
+                    corpus_id=state["corpus_id"],
+                    request_id=request_id,
+                    session_id=session_id,
+                ):
+                    if event["type"] == "draft_start":
+                        draft = ""
+                    elif event["type"] == "token":
+                        draft += event["text"]
+                        yield draft, "", state
+                    elif event["type"] == "node" and event["node"] == "research":
+                        yield draft, "⏳ Verifying...", state
+                    elif event["type"] == "final":
+                        state["failed_run"] = None
+                        yield (
+                            event["draft_answer"],
+                            event["verification_report"],
+                            state,
+                        )
+
+            except Busy as e:
+                logger.warning("Turned away: {}", e)
+                state["failed_run"] = run
+                yield f"⏳ DocChat is busy, please try again shortly ({e})", "", state
             except Exception as e:
-                logger.error(f"Processing error: {str(e)}")
-                return f"❌ Error: {str(e)}", "", state
+                logger.error("Processing error: {}", e)
+                state["failed_run"] = run
+                yield f"❌ Error: {str(e)}", "", state
 
         submit_btn.click(
             fn=process_question,
@@ -203,13 +270,31 @@ def main():
     demo.launch(server_name="127.0.0.1", server_port=5000, share=False)
 
 
-def _get_file_hashes(uploaded_files: List) -> frozenset:
-    """Generate SHA-256 hashes for uploaded files."""
-    hashes = set()
+def _document_processor():
+    from document_processor.file_handler import DocumentProcessor
+
+    return DocumentProcessor()
+
+
+def _retriever_builder():
+    from retriever.builder import RetrieverBuilder
+
+    return RetrieverBuilder()
+
+
+def _agent_workflow(corpus_index: CorpusIndex):
+    from agents.workflow import AgentWorkflow
+
+    return AgentWorkflow(retriever_resolver=corpus_index.get_retriever)
+
+
+def _read_uploads(uploaded_files: List) -> List[Tuple[str, bytes]]:
+    """Read uploaded files as (filename, content) pairs."""
+    uploads = []
     for file in uploaded_files:
         with open(file.name, "rb") as f:
-            hashes.add(hashlib.sha256(f.read()).hexdigest())
-    return frozenset(hashes)
+            uploads.append((os.path.basename(file.name), f.read()))
+    return uploads
 
 
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Recall and latency of the vector backends, to pick VECTOR_BACKEND and HNSW_* settings.
+
+Exact NumPy search is the ground truth; hnswlib is swept over ef_search. The
+vectors are synthetic clustered embeddings, so no embedding service is needed.
+
+Usage:
+    python -m benchmarks.ann_backends --sizes 1000 10000 50000 --dim 384
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retriever.vector_store import ExactIndex, HnswIndex
+
+
+def clustered_vectors(count: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Vectors drawn around random centroids, like embeddings of related chunks."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(clusters, dim))
+    assignment = rng.integers(0, clusters, size=count)
+    return (centroids[assignment] + 0.35 * rng.normal(size=(count, dim))).astype(
+        np.float32
+    )
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+
+def timed_search(index, queries: np.ndarray, k: int):
+    # One query at a time, as in the interactive retriever
+    start = time.perf_counter()
+    results = [index.search(query[None, :], k)[0][0] for query in queries]
+    elapsed = time.perf_counter() - start
+    return np.array(results), elapsed / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 50000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=100)
+    parser.add_argument("--ef-search", nargs="+", type=int, default=[10, 32, 64, 128])
+    args = parser.parse_args()
+
+    header = (
+        f"{'docs':>7} {'backend':<16} {'build s':>8} {'ms/query':>9} {'recall@k':>9}"
+    )
+    print(f"📊 Vector backends (dim={args.dim}, k={args.k}, M={args.m})")
+    print(header)
+    print("-" * len(header))
+
+    for size in args.sizes:
+        data = clustered_vectors(size, args.dim, clusters=max(size // 100, 4), seed=1)
+        queries = clustered_vectors(args.queries, args.dim, clusters=4, seed=2)
+
+        start = time.perf_counter()
+        exact = ExactIndex(data)
+        build = time.perf_counter() - start
+        truth, latency = timed_search(exact, queries, args.k)
+        print(f"{size:>7} {'exact':<16} {build:>8.2f} {latency:>9.3f} {1.0:>9.3f}")
+
+        start = time.perf_counter()
+        hnsw = HnswIndex(data, m=args.m, ef_construction=args.ef_construction)
+        build = time.perf_counter() - start
+        for ef in args.ef_search:
+            hnsw.set_ef_search(ef)
+            found, latency = timed_search(hnsw, queries, args.k)
+            label = f"hnswlib ef={ef}"
+            print(
+                f"{size:>7} {label:<16} {build:>8.2f} {latency:>9.3f} "
+                f"{recall_at_k(truth, found):>9.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Latency and accuracy of the two-step and single-call answer modes.
+
+Answers the labeled questions of benchmarks.retrieval_eval through
+AgentWorkflow.full_pipeline once per answer mode and reports latency, LLM calls
+per question, how often single-call answers still went to the verifier, and
+accuracy: the share of answers containing one of the question's evidence
+phrases, and the share the final report marks as supported. With --mock the
+agents talk to the mock Azure server over a synthetic corpus instead, which
+measures the call structure offline (accuracy is then meaningless).
+
+Usage:
+    python -m benchmarks.answer_modes
+    python -m benchmarks.answer_modes --chunker recursive:1000 --json modes.json
+    python -m benchmarks.answer_modes --mock --chat-latency lognormal:0.8:0.4
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.retrieval_eval import (
+    DEFAULT_FILE,
+    EVAL_SET,
+    label_questions,
+    load_markdown,
+    normalize,
+    split_markdown,
+)
+
+MODES = ("two_step", "single_call")
+AGENTS = ("relevance", "research", "verification")
+
+
+def evidence_hit(answer: str, evidence: Sequence[str]) -> bool:
+    text = normalize(answer)
+    return any(normalize(phrase) in text for phrase in evidence)
+
+
+def run_mode(
+    workflow, retriever, questions: List[Tuple[str, Sequence[str]]], mode: str
+) -> Dict:
+    """Answer every question in one mode and summarise cost and accuracy."""
+    from utils.metrics import LLM_SECONDS, SELF_CHECKS, registry
+
+    registry.reset()
+    latencies, hits, supported, errors = [], [], [], 0
+    for question, evidence in questions:
+        start = time.perf_counter()
+        try:
+            result = workflow.full_pipeline(question, retriever, answer_mode=mode)
+        except Exception as e:
+            errors += 1
+            print(f"   ❌ {mode}: {question}: {e}")
+            continue
+        latencies.append(time.perf_counter() - start)
+        hits.append(evidence_hit(result["draft_answer"], evidence))
+        supported.append("**Supported:** YES" in result["verification_report"])
+
+    answered = len(latencies)
+    llm_calls = sum(LLM_SECONDS.count(agent=agent) for agent in AGENTS)
+    return {
+        "mode": mode,
+        "questions": len(questions),
+        "errors": errors,
+        "p50_s": float(np.percentile(latencies, 50)) if latencies else 0.0,
+        "p95_s": float(np.percentile(latencies, 95)) if latencies else 0.0,
+        "llm_calls_per_question": llm_calls / answered if answered else 0.0,
+        "verifier_fallbacks": int(SELF_CHECKS.value(outcome="escalated")),
+        "evidence_hit_rate": float(np.mean(hits)) if hits else 0.0,
+        "supported_rate": float(np.mean(supported)) if supported else 0.0,
+    }
+
+
+def real_corpus(args) -> Tuple[object, List[Tuple[str, Sequence[str]]]]:
+    from retriever.builder import RetrieverBuilder
+
+    chunks = split_markdown(load_markdown(args.file), args.chunker)
+    labeled = {question for question, _ in label_questions(chunks)}
+    questions = [(q, evidence) for q, evidence in EVAL_SET if q in labeled]
+    print(f"📄 {len(chunks)} chunks, {len(questions)} labeled questions")
+    return RetrieverBuilder().build_hybrid_retriever(chunks), questions
+
+
+def mock_corpus(args, work_dir: str):
+    from langchain.schema import Document
+
+    from benchmarks.embedding_throughput import synthetic_chunks
+    from benchmarks.mock_azure import MockAzureServer
+    from benchmarks.pipeline_load import QUESTIONS, make_builder, point_app_at
+
+    server = MockAzureServer(
+        chat_latency=args.chat_latency, embedding_latency="fixed:0.01"
+    ).start()
+    point_app_at(server, work_dir)
+    chunks = [
+        Document(page_content=text, metadata={"source": f"synthetic_{i}.txt"})
+        for i, text in enumerate(synthetic_chunks(args.chunks))
+    ]
+    print(f"📄 {len(chunks)} synthetic chunks, mock server at {server.url}")
+    retriever = make_builder().build_hybrid_retriever(chunks)
+    return server, retriever, [(question, ()) for question in QUESTIONS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--file", default=DEFAULT_FILE, help="PDF or markdown")
+    parser.add_argument("--chunker", default="markdown")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--limit", type=int, help="Answer at most this many questions")
+    parser.add_argument("--mock", action="store_true", help="Use the mock server")
+    parser.add_argument("--chat-latency", default="lognormal:0.8:0.4")
+    parser.add_argument("--chunks", type=int, default=200, help="Mock corpus size")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="docchat-modes-")
+    server = None
+    try:
+        if args.mock:
+            server, retriever, questions = mock_corpus(args, work_dir)
+        else:
+            from config.settings import settings
+
+            settings.CHECKPOINT_DB_PATH = ""
+            retriever, questions = real_corpus(args)
+        questions = questions[: args.limit] if args.limit else questions
+
+        from agents.workflow import AgentWorkflow
+
+        workflow = AgentWorkflow()
+        results = [
+            run_mode(workflow, retriever, questions, mode) for mode in args.modes
+        ]
+    finally:
+        if server is not None:
+            server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(
+        f"\n{'mode':<12} {'qs':>4} {'err':>4} {'p50 s':>7} {'p95 s':>7} "
+        f"{'calls/q':>8} {'fallback':>9} {'evidence':>9} {'supported':>10}"
+    )
+    for r in results:
+        print(
+            f"{r['mode']:<12} {r['questions']:>4} {r['errors']:>4} "
+            f"{r['p50_s']:>7.2f} {r['p95_s']:>7.2f} "
+            f"{r['llm_calls_per_question']:>8.2f} {r['verifier_fallbacks']:>9} "
+            f"{r['evidence_hit_rate']:>9.2f} {r['supported_rate']:>10.2f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Embedding throughput benchmark (chunks per second) across embedding backends.
+
+Usage:
+    python -m benchmarks.embedding_throughput --backends onnx azure --chunks 500
+    python -m benchmarks.embedding_throughput --backends onnx --file examples/DeepSeek_Technical_Report.pdf
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+from typing import List
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import settings
+from retriever.embeddings import build_embeddings
+
+WORDS = (
+    "model reasoning benchmark accuracy training reinforcement data center energy "
+    "efficiency carbon emissions report performance evaluation coding math tokens "
+    "latency throughput parameters distillation reward policy dataset region"
+).split()
+
+
+def synthetic_chunks(count: int, seed: int = 42) -> List[str]:
+    """Generate chunks with a realistic spread of lengths (20-400 words)."""
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 400)))
+        for _ in range(count)
+    ]
+
+
+def file_chunks(path: str) -> List[str]:
+    """Chunk a real document with the application's DocumentProcessor."""
+    from document_processor.file_handler import DocumentProcessor
+
+    chunks = DocumentProcessor().process([SimpleNamespace(name=path)])
+    return [chunk.page_content for chunk in chunks]
+
+
+def run_backend(backend: str, chunks: List[str], repeat: int) -> dict:
+    settings.EMBEDDING_BACKEND = backend
+    embeddings = build_embeddings()
+
+    # Warm up (session initialisation, connection pool, quantization)
+    embeddings.embed_documents(chunks[:8])
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        embeddings.embed_documents(chunks)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    return {
+        "backend": backend,
+        "chunks": len(chunks),
+        "best_seconds": best,
+        "chunks_per_second": len(chunks) / best,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["onnx", "azure"])
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--file", help="Document to chunk instead of synthetic text")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--int8", action="store_true", help="Quantize the ONNX model")
+    parser.add_argument("--threads", type=int, default=settings.ONNX_NUM_THREADS)
+    args = parser.parse_args()
+
+    settings.ONNX_QUANTIZE_INT8 = args.int8
+    settings.ONNX_NUM_THREADS = args.threads
+    chunks = file_chunks(args.file) if args.file else synthetic_chunks(args.chunks)
+
+    print(f"📊 Embedding throughput over {len(chunks)} chunks")
+    print(f"{'backend':<10} {'chunks':>8} {'seconds':>10} {'chunks/s':>10}")
+    for backend in args.backends:
+        try:
+            result = run_backend(backend, chunks, args.repeat)
+        except Exception as e:
+            print(f"{backend:<10} ❌ {e}")
+            continue
+        print(
+            f"{result['backend']:<10} {result['chunks']:>8} "
+            f"{result['best_seconds']:>10.2f} {result['chunks_per_second']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Azure OpenAI chat-completions and embeddings HTTP APIs.
+
+Responses are deterministic (the same request always gets the same answer),
+latency is drawn from a configurable distribution and a share of requests can
+be rejected with 429 + retry-after-ms, so benchmarks run offline and repeatably.
+Chat usage reports prompt_tokens_details.cached_tokens the way Azure's prompt
+caching does, so benchmarks can measure prefix reuse too.
+
+Usage:
+    python -m benchmarks.mock_azure --port 8765 --chat-latency lognormal:0.8:0.4
+    # then point AZURE_OPENAI_ENDPOINT at http://127.0.0.1:8765/
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import numpy as np
+
+# Same replies as the in-process "fake" LLM backend
+from agents.llm import fake_reply as canned_reply
+
+
+class LatencyModel:
+    """
+    Latency distribution parsed from a spec string.
+
+    "0" or "none", "fixed:SECONDS", "uniform:LOW:HIGH" or
+    "lognormal:MEDIAN:SIGMA" (all in seconds).
+    """
+
+    def __init__(self, spec: str = "0", seed: Optional[int] = None):
+        self.spec = spec
+        parts = spec.split(":")
+        self.kind = parts[0].lower()
+        self.params = [float(p) for p in parts[1:]]
+        expected = {"0": 0, "none": 0, "fixed": 1, "uniform": 2, "lognormal": 2}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == "fixed":
+                return self.params[0]
+            if self.kind == "uniform":
+                return self._rng.uniform(*self.params)
+            if self.kind == "lognormal":
+                median, sigma = self.params
+                return self._rng.lognormvariate(np.log(median), sigma)
+            return 0.0
+
+
+def hashed_embedding(item, dim: int) -> List[float]:
+    """
+    Feature-hashed bag-of-tokens vector, L2-normalized.
+
+    Works for raw strings and for token-id lists (what langchain sends when it
+    tokenizes client-side), and texts sharing words get similar vectors, so
+    retrieval over the mock still ranks sensibly.
+    """
+    tokens = item if isinstance(item, list) else re.findall(r"\w+", item.lower())
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokens:
+        digest = hashlib.blake2b(str(token).encode(), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        vector[value % dim] += 1.0 if (value >> 63) else -1.0
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[0] = 1.0
+        norm = 1.0
+    return (vector / norm).tolist()
+
+
+class PrefixCache:
+    """
+    Stand-in for a provider's prompt prefix cache.
+
+    Like Azure OpenAI prompt caching, a prompt is served from the cache in
+    blocks of block_tokens for as long as its prefix matches an earlier prompt,
+    and only if at least min_tokens match. Tokens are approximated as four
+    characters, as in the rest of the mock's usage numbers.
+    """
+
+    def __init__(self, min_tokens: int = 1024, block_tokens: int = 128):
+        self.min_tokens = min_tokens
+        self.block_tokens = block_tokens
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def lookup(self, text: str) -> int:
+        """Cached tokens of this prompt; remembers its prefixes for later calls."""
+        block_chars = self.block_tokens * 4
+        digest = hashlib.sha256()
+        matched, hit = 0, True
+        with self._lock:
+            for start in range(0, len(text) - block_chars + 1, block_chars):
+                digest.update(text[start : start + block_chars].encode())
+                key = digest.hexdigest()
+                if hit and key in self._seen:
+                    matched += self.block_tokens
+                else:
+                    hit = False
+                    self._seen.add(key)
+        return matched if matched >= self.min_tokens else 0
+
+
+class MockAzureServer:
+    """Threaded HTTP server; use as a context manager or call start()/stop()."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        chat_latency: str = "0",
+        embedding_latency: str = "0",
+        error_rate: float = 0.0,
+        retry_after_ms: int = 200,
+        embedding_dim: int = 256,
+        seed: int = 0,
+    ):
+        self.chat_latency = LatencyModel(chat_latency, seed)
+        self.embedding_latency = LatencyModel(embedding_latency, seed + 1)
+        self.error_rate = error_rate
+        self.retry_after_ms = retry_after_ms
+        self.embedding_dim = embedding_dim
+        self._rng = random.Random(seed + 2)
+        self._lock = threading.Lock()
+        self.prefix_cache = PrefixCache()
+        self.stats = {"chat": 0, "embeddings": 0, "throttled": 0}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "MockAzureServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _throttle(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: dict, headers=None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                path = self.path.split("?")[0]
+
+                if path.endswith("/chat/completions"):
+                    kind = "chat"
+                elif path.endswith("/embeddings"):
+                    kind = "embeddings"
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+
+                if server._throttle():
+                    server._count("throttled")
+                    retry_ms = str(server.retry_after_ms)
+                    self._send_json(
+                        429,
+                        {"error": {"code": "429", "message": "Rate limit exceeded"}},
+                        {"retry-after-ms": retry_ms, "retry-after": "1"},
+                    )
+                    return
+
+                server._count(kind)
+                if kind == "chat":
+                    self._chat(body)
+                else:
+                    self._embeddings(body)
+
+            def _chat(self, body: dict):
+                latency = server.chat_latency.sample()
+                reply = canned_reply(body.get("messages", []))
+                prompt = "".join(
+                    f"<{m.get('role')}>{m.get('content') or ''}"
+                    for m in body.get("messages", [])
+                )
+                prompt_chars = sum(
+                    len(m.get("content") or "") for m in body.get("messages", [])
+                )
+                usage = {
+                    "prompt_tokens": prompt_chars // 4,
+                    "completion_tokens": len(reply.split()),
+                    "total_tokens": prompt_chars // 4 + len(reply.split()),
+                    "prompt_tokens_details": {
+                        "cached_tokens": min(
+                            server.prefix_cache.lookup(prompt), prompt_chars // 4
+                        )
+                    },
+                }
+                created = int(time.time())
+                model = body.get("model") or "mock"
+
+                if not body.get("stream"):
+                    time.sleep(latency)
+                    self._send_json(
+                        200,
+                        {
+                            "id": "chatcmpl-mock",
+                            "object": "chat.completion",
+                            "created": created,
+                            "model": model,
+                            "choices": [
+                                {
+                                    "index": 0,
+                                    "message": {"role": "assistant", "content": reply},
+                                    "finish_reason": "stop",
+                                }
+                            ],
+                            "usage": usage,
+                        },
+                    )
+                    return
+
+                # Streaming: half the latency before the first token, the rest
+                # spread over the words of the reply
+                words = re.findall(r"\S+\s*", reply)
+                time.sleep(latency / 2)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for word in words:
+                    time.sleep(latency / 2 / max(len(words), 1))
+                    chunk = {
+                        "id": "chatcmpl-mock",
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [
+                            {
+                                "index": 0,
+                                "delta": {"content": word},
+                                "finish_reason": None,
+                            }
+                        ],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                final = {
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                    "usage": usage,
+                }
+                self.wfile.write(f"data: {json.dumps(final)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+            def _embeddings(self, body: dict):
+                time.sleep(server.embedding_latency.sample())
+                inputs = body.get("input", [])
+                if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+                    inputs = [inputs]
+                data = []
+                for i, item in enumerate(inputs):
+                    vector = hashed_embedding(item, server.embedding_dim)
+                    if body.get("encoding_format") == "base64":
+                        raw = np.asarray(vector, dtype=np.float32).tobytes()
+                        vector = base64.b64encode(raw).decode()
+                    data.append(
+                        {"object": "embedding", "index": i, "embedding": vector}
+                    )
+                tokens = sum(
+                    len(item) if isinstance(item, list) else len(item) // 4
+                    for item in inputs
+                )
+                self._send_json(
+                    200,
+                    {
+                        "object": "list",
+                        "data": data,
+                        "model": body.get("model") or "mock-embedding",
+                        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                    },
+                )
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--chat-latency", default="lognormal:0.8:0.4")
+    parser.add_argument("--embedding-latency", default="uniform:0.05:0.15")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--embedding-dim", type=int, default=256)
+    args = parser.parse_args()
+
+    server = MockAzureServer(
+        host=args.host,
+        port=args.port,
+        chat_latency=args.chat_latency,
+        embedding_latency=args.embedding_latency,
+        error_rate=args.error_rate,
+        embedding_dim=args.embedding_dim,
+    )
+    print(f"🧪 Mock Azure OpenAI listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
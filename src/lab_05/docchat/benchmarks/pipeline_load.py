@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Offline load benchmark of ingestion, indexing and the agent pipeline.
+
+Starts the mock Azure OpenAI server (benchmarks/mock_azure.py), points the
+application at it and drives DocumentProcessor, RetrieverBuilder and
+AgentWorkflow.full_pipeline at a given concurrency. Reports p50/p95/p99
+latency, throughput and memory for each stage. The "batch" stage sends all
+questions through AgentWorkflow.batch_pipeline instead, for comparison.
+
+Usage:
+    python -m benchmarks.pipeline_load --stages builder pipeline --requests 50 --concurrency 8
+    python -m benchmarks.pipeline_load --stages processor builder pipeline \\
+        --file examples/DeepSeek_Technical_Report.pdf --error-rate 0.05
+    python -m benchmarks.pipeline_load --json results.json   # for CI regression tracking
+    python -m benchmarks.pipeline_load --stages pipeline --llm-backend openai
+    python -m benchmarks.pipeline_load --stages pipeline --same-question  # coalescing
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, List
+
+import numpy as np
+import psutil
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.embedding_throughput import synthetic_chunks
+from benchmarks.mock_azure import MockAzureServer
+
+QUESTIONS = [
+    "How does reinforcement learning improve reasoning performance?",
+    "What benchmark accuracy does the model reach on coding tasks?",
+    "How was the training data collected and filtered?",
+    "What are the energy efficiency results per data center region?",
+    "How does distillation affect smaller models?",
+]
+
+
+class MemorySampler:
+    """Track peak RSS of this process from a background thread."""
+
+    def __init__(self, interval: float = 0.05):
+        self.process = psutil.Process()
+        self.interval = interval
+        self.start_rss = self.peak_rss = self.process.memory_info().rss
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.end_rss = self.process.memory_info().rss
+        self.peak_rss = max(self.peak_rss, self.end_rss)
+
+
+def run_stage(name: str, task: Callable[[int], None], requests: int, concurrency: int):
+    """Run task(i) for i in range(requests) on `concurrency` threads."""
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def timed(i: int):
+        start = time.perf_counter()
+        try:
+            task(i)
+        except Exception as e:
+            with lock:
+                errors.append(repr(e))
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    with MemorySampler() as memory:
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(timed, range(requests)))
+        wall = time.perf_counter() - wall_start
+
+    p50, p95, p99 = (
+        np.percentile(latencies, [50, 95, 99]) if latencies else (np.nan,) * 3
+    )
+    return {
+        "stage": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "p50_s": float(p50),
+        "p95_s": float(p95),
+        "p99_s": float(p99),
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "peak_rss_mb": memory.peak_rss / 2**20,
+        "rss_growth_mb": (memory.end_rss - memory.start_rss) / 2**20,
+    }
+
+
+def point_app_at(server: MockAzureServer, work_dir: str):
+    """Configure env vars and settings before the application modules load."""
+    os.environ.update(
+        {
+            "AZURE_OPENAI_ENDPOINT": server.url,
+            "AZURE_OPENAI_API_KEY": "mock-key",
+            "AZURE_OPENAI_DEPLOYMENT_NAME": "mock-chat",
+            "AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT_NAME": "mock-embedding",
+            "AZURE_OPENAI_API_VERSION": "2024-12-01-preview",
+        }
+    )
+    from config.settings import settings
+
+    settings.CACHE_DIR = os.path.join(work_dir, "document_cache")
+    settings.CHROMA_DB_PATH = os.path.join(work_dir, "chroma_db")
+    settings.CHECKPOINT_DB_PATH = os.path.join(work_dir, "checkpoints.sqlite")
+    settings.EMBEDDING_BACKEND = "azure"
+
+
+def make_builder():
+    from retriever.builder import RetrieverBuilder
+
+    builder = RetrieverBuilder()
+    # The mock accepts raw strings; skip langchain's client-side tokenization,
+    # which needs the tiktoken vocabulary download on an offline box
+    inner = getattr(builder.embeddings, "embeddings", None)
+    if hasattr(inner, "check_embedding_ctx_length"):
+        inner.check_embedding_ctx_length = False
+    return builder
+
+
+def load_chunks(args, work_dir: str) -> List:
+    from langchain.schema import Document
+
+    if args.file:
+        from document_processor.file_handler import DocumentProcessor
+
+        return DocumentProcessor().process([SimpleNamespace(name=args.file)])
+    return [
+        Document(page_content=text, metadata={"source": f"synthetic_{i}.txt"})
+        for i, text in enumerate(synthetic_chunks(args.chunks))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        default=["builder", "pipeline"],
+        choices=["processor", "builder", "pipeline", "batch"],
+    )
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--file", help="Document for the processor stage / corpus")
+    parser.add_argument("--chunks", type=int, default=200, help="Synthetic corpus size")
+    parser.add_argument("--chat-latency", default="lognormal:0.8:0.4")
+    parser.add_argument("--embedding-latency", default="uniform:0.05:0.15")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of 429s")
+    parser.add_argument(
+        "--embedding-tpm", type=int, help="Client-side embedding token budget"
+    )
+    parser.add_argument(
+        "--relevance-gate",
+        choices=["off", "scores", "classifier"],
+        help="Relevance gate mode (default: RELEVANCE_GATE)",
+    )
+    parser.add_argument(
+        "--llm-backend",
+        choices=["azure", "openai", "fake"],
+        default="azure",
+        help="Reach the mock chat API as Azure or OpenAI-compatible, or skip HTTP",
+    )
+    parser.add_argument(
+        "--same-question",
+        action="store_true",
+        help="Every request asks the first question, like a popular example",
+    )
+    parser.add_argument(
+        "--llm-cache",
+        metavar="PATH",
+        help="Cache every agent's replies in this SQLite file; runs reusing it "
+        "replay them, so their answers do not depend on the chat service",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Hedge slow research and verification calls (see LLM_HEDGE_*)",
+    )
+    parser.add_argument(
+        "--adaptive-context",
+        action="store_true",
+        help="Size the answering context from scores and labels (see CONTEXT_*)",
+    )
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+    questions = QUESTIONS[:1] if args.same_question else QUESTIONS
+
+    if "processor" in args.stages and not args.file:
+        parser.error("the processor stage needs --file")
+
+    work_dir = tempfile.mkdtemp(prefix="docchat-bench-")
+    server = MockAzureServer(
+        chat_latency=args.chat_latency,
+        embedding_latency=args.embedding_latency,
+        error_rate=args.error_rate,
+    ).start()
+    point_app_at(server, work_dir)
+    if args.embedding_tpm:
+        from config.settings import settings
+
+        settings.EMBEDDING_TPM_LIMIT = args.embedding_tpm
+    if args.relevance_gate:
+        from config.settings import settings
+
+        settings.RELEVANCE_GATE = args.relevance_gate
+    if args.llm_backend != "azure":
+        from config.settings import settings
+
+        settings.LLM_BACKEND = args.llm_backend
+        settings.LLM_BASE_URL = f"{server.url}v1"
+    if args.hedge:
+        from config.settings import settings
+
+        settings.LLM_HEDGE_AGENTS = "research,verification"
+        # Short runs: start hedging after a few calls, at the mock's timescale
+        settings.LLM_HEDGE_MIN_SAMPLES = 5
+        settings.LLM_HEDGE_MIN_DELAY_SECONDS = 0.0
+    if args.adaptive_context:
+        from config.settings import settings
+
+        settings.CONTEXT_ADAPTIVE = True
+    if args.llm_cache:
+        from agents.prompts import AGENTS
+        from config.settings import settings
+
+        settings.LLM_CACHE_PATH = args.llm_cache
+        settings.LLM_CACHE_AGENTS = ",".join(AGENTS)
+
+    results = []
+    try:
+        chunks = load_chunks(args, work_dir)
+        print(f"📄 Corpus: {len(chunks)} chunks, mock server at {server.url}")
+
+        if "processor" in args.stages:
+            from document_processor.file_handler import DocumentProcessor
+
+            def process(i: int):
+                processor = DocumentProcessor()
+                # A private cache directory per request keeps every run cold
+                processor.cache_dir = Path(work_dir, "processor", str(i))
+                processor.cache_dir.mkdir(parents=True)
+                processor.process([SimpleNamespace(name=args.file)])
+
+            results.append(
+                run_stage("processor", process, args.requests, args.concurrency)
+            )
+
+        if "builder" in args.stages:
+            from langchain.schema import Document
+
+            builder = make_builder()
+
+            def build(i: int):
+                # A distinct corpus per request, so no collection is reused
+                docs = [
+                    Document(
+                        page_content=f"{doc.page_content} corpus{i}",
+                        metadata=doc.metadata,
+                    )
+                    for doc in chunks
+                ]
+                builder.build_hybrid_retriever(docs)
+
+            results.append(run_stage("builder", build, args.requests, args.concurrency))
+
+        if "pipeline" in args.stages:
+            from agents.workflow import AgentWorkflow
+
+            retriever = make_builder().build_hybrid_retriever(chunks)
+            workflow = AgentWorkflow()
+
+            def ask(i: int):
+                workflow.full_pipeline(questions[i % len(questions)], retriever)
+
+            results.append(run_stage("pipeline", ask, args.requests, args.concurrency))
+
+        if "batch" in args.stages:
+            from agents.workflow import AgentWorkflow
+
+            retriever = make_builder().build_hybrid_retriever(chunks)
+            workflow = AgentWorkflow()
+            batch = [questions[i % len(questions)] for i in range(args.requests)]
+
+            def run_batch(i: int):
+                results = workflow.batch_pipeline(
+                    batch, retriever, max_concurrency=args.concurrency
+                )
+                errors = [r["error"] for r in results if r["error"]]
+                if errors:
+                    raise RuntimeError(f"{len(errors)} failed, first: {errors[0]}")
+
+            # One timed run of the whole batch; throughput is questions per second
+            result = run_stage("batch", run_batch, 1, 1)
+            result.update(
+                requests=args.requests,
+                concurrency=args.concurrency,
+                throughput_rps=args.requests / result["p50_s"],
+            )
+            results.append(result)
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(
+        f"\n{'stage':<10} {'reqs':>5} {'conc':>5} {'err':>4} {'p50 s':>8} "
+        f"{'p95 s':>8} {'p99 s':>8} {'req/s':>8} {'peak MB':>8} {'+MB':>7}"
+    )
+    for r in results:
+        print(
+            f"{r['stage']:<10} {r['requests']:>5} {r['concurrency']:>5} "
+            f"{r['errors']:>4} {r['p50_s']:>8.3f} {r['p95_s']:>8.3f} "
+            f"{r['p99_s']:>8.3f} {r['throughput_rps']:>8.2f} "
+            f"{r['peak_rss_mb']:>8.1f} {r['rss_growth_mb']:>7.1f}"
+        )
+        if r["first_error"]:
+            print(f"   ❌ first error: {r['first_error']}")
+    print(f"\nMock server: {server.stats}")
+    if {"pipeline", "batch"} & set(args.stages):
+        from agents.prompts import AGENTS, cached_token_rate
+        from utils.metrics import LLM_COALESCED
+
+        def coalesced() -> int:
+            return int(sum(LLM_COALESCED.value(agent=a) for a in AGENTS))
+
+        from agents.relevance_gate import escalation_rate
+
+        print(f"Relevance checks escalated to the LLM: {escalation_rate():.0%}")
+        print(f"Prompt tokens served from the prefix cache: {cached_token_rate():.0%}")
+        print(f"LLM calls coalesced with an identical one in flight: {coalesced()}")
+        if args.adaptive_context:
+            from utils.metrics import RETRIEVED_DOCUMENTS
+
+            used = RETRIEVED_DOCUMENTS.total(stage="context")
+            retrieved = RETRIEVED_DOCUMENTS.total(stage="pipeline")
+            print(
+                f"Retrieved chunks sent to the answering calls: {used / retrieved:.0%}"
+            )
+        if args.hedge:
+            from agents.llm import hedge_rates
+
+            hedged, won = hedge_rates()
+            print(
+                f"LLM calls hedged: {hedged:.0%}, hedges that finished first: {won:.0%}"
+            )
+        if args.llm_cache:
+            from utils.metrics import CACHE_REQUESTS
+
+            hits = int(CACHE_REQUESTS.value(cache="llm", result="hit"))
+            misses = int(CACHE_REQUESTS.value(cache="llm", result="miss"))
+            print(
+                f"LLM responses replayed from {args.llm_cache}: {hits}/{hits + misses}"
+            )
+
+    if args.json:
+        report = {"results": results, "mock_server": server.stats}
+        if {"pipeline", "batch"} & set(args.stages):
+            report["relevance_escalation_rate"] = escalation_rate()
+            report["cached_token_rate"] = cached_token_rate()
+            report["coalesced_llm_calls"] = coalesced()
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Retrieval quality versus cost over the bundled DeepSeek-V3 technical report.
+
+Each labeled question lists evidence phrases from the report; after chunking,
+the chunks containing one of them are that question's relevant chunks, so the
+labels hold for every chunker. The sweep covers VECTOR_SEARCH_K, the hybrid
+weights, the chunker and the reranker, and reports recall@k, MRR, retrieval
+latency and the context tokens handed to the agents.
+
+Usage:
+    python -m benchmarks.retrieval_eval
+    python -m benchmarks.retrieval_eval --k 3 5 10 --weights 0.4,0.6 0.2,0.8 \\
+        --chunkers markdown recursive:1000 recursive:500 --reranker off on
+    python -m benchmarks.retrieval_eval --file report.md --json retrieval.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+from langchain.schema import Document
+from langchain_text_splitters import (
+    MarkdownHeaderTextSplitter,
+    RecursiveCharacterTextSplitter,
+)
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import settings
+
+DEFAULT_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "examples",
+    "DeepSeek_Technical_Report.pdf",
+)
+
+# Same header levels as DocumentProcessor
+MARKDOWN_HEADERS = [("#", "Header 1"), ("##", "Header 2")]
+
+# (question, evidence phrases): a chunk is relevant if it contains any phrase.
+# Phrases are short and specific so they survive PDF-to-markdown conversion and
+# do not match the table of contents.
+EVAL_SET = [
+    (
+        "How many tokens was DeepSeek-V3 pre-trained on?",
+        ["14.8 trillion", "pre-train DeepSeek-V3 on 14.8T tokens"],
+    ),
+    (
+        "How many GPU hours did the full training of DeepSeek-V3 take?",
+        ["2.788M GPU hours", "2.788M H800 GPU hours"],
+    ),
+    ("What was the total training cost in US dollars?", ["$5.576M"]),
+    ("What hardware cluster was DeepSeek-V3 trained on?", ["2048 NVIDIA H800 GPUs"]),
+    (
+        "How does the auxiliary-loss-free load balancing strategy work?",
+        ["we introduce a bias term", "bias term is only used for routing"],
+    ),
+    (
+        "How many routed experts does each MoE layer have?",
+        ["256 routed experts"],
+    ),
+    (
+        "How is the context window extended to 128K tokens?",
+        ["we apply YaRN", "from 4K to 32K and then to 128K"],
+    ),
+    (
+        "Which FP8 format is used in the mixed precision framework?",
+        ["we adopt the E4M3 format on all tensors"],
+    ),
+    (
+        "What fine-grained quantization strategy is used for FP8 training?",
+        ["tile-wise grouping with"],
+    ),
+    (
+        "Which reinforcement learning algorithm is used in post-training?",
+        ["we adopt Group Relative Policy"],
+    ),
+    (
+        "What kinds of reward models are used during reinforcement learning?",
+        ["model-based RM in our RL process"],
+    ),
+    (
+        "What is the acceptance rate of the second predicted token?",
+        ["acceptance rate of the second token prediction"],
+    ),
+    (
+        "How is activation memory reduced during training?",
+        ["Recomputation of RMSNorm", "Exponential Moving Average in CPU"],
+    ),
+    (
+        "How many SMs handle cross-node all-to-all communication?",
+        [
+            "only 20 SMs are sufficient",
+            "partition 20 SMs into 10 communication channels",
+        ],
+    ),
+    (
+        "What is the minimum deployment unit of the prefilling stage?",
+        ["minimum deployment unit of the prefilling stage"],
+    ),
+    (
+        "How are redundant experts used during inference?",
+        ["deployment strategy of redundant experts"],
+    ),
+    (
+        "To how many nodes can a token be routed?",
+        ["sent to at most 4 nodes"],
+    ),
+    ("Does DeepSeek-V3 drop tokens during training?", ["does not drop any tokens"]),
+    (
+        "What is the vocabulary size of the tokenizer?",
+        ["vocabulary of 128K tokens"],
+    ),
+    (
+        "How is the Fill-in-Middle strategy applied in pre-training?",
+        ["Fill-in-Middle (FIM) strategy", "applied at a rate of 0.1"],
+    ),
+    (
+        "How is the learning rate scheduled during pre-training?",
+        ["we first linearly increase it from 0 to 2"],
+    ),
+    (
+        "What are the components of an MTP module?",
+        ["MTP module consists of a shared embedding layer"],
+    ),
+    (
+        "How does distillation from DeepSeek-R1 help DeepSeek-V3?",
+        [
+            "ablate the contribution of distillation from DeepSeek-R1",
+            "generate the data by leveraging an internal DeepSeek-R1 model",
+        ],
+    ),
+]
+
+
+def normalize(text: str) -> str:
+    """Lowercase alphanumerics only, so ligatures and punctuation do not matter."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text).split())
+
+
+def load_markdown(path: str) -> str:
+    """Markdown of a document; PDFs are converted with Docling once and cached."""
+    if path.endswith((".md", ".txt")):
+        return Path(path).read_text(encoding="utf-8")
+
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    cache_path = Path(settings.CACHE_DIR) / f"{digest}.md"
+    if cache_path.exists():
+        return cache_path.read_text(encoding="utf-8")
+
+    from docling.document_converter import DocumentConverter
+
+    markdown = DocumentConverter().convert(path).document.export_to_markdown()
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_path.write_text(markdown, encoding="utf-8")
+    return markdown
+
+
+def split_markdown(markdown: str, chunker: str) -> List[Document]:
+    """
+    Chunk markdown the way the application would.
+
+    "markdown" is DocumentProcessor's header split; "recursive:N" further
+    splits each section into chunks of at most N characters (10% overlap).
+    """
+    sections = MarkdownHeaderTextSplitter(MARKDOWN_HEADERS).split_text(markdown)
+    if chunker == "markdown":
+        return sections
+    kind, _, size = chunker.partition(":")
+    if kind != "recursive" or not size.isdigit():
+        raise ValueError(
+            f"Unknown chunker '{chunker}'. Use 'markdown' or 'recursive:N'."
+        )
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=int(size), chunk_overlap=int(size) // 10
+    )
+    return splitter.split_documents(sections)
+
+
+def label_questions(
+    chunks: List[Document], eval_set: Sequence = EVAL_SET
+) -> List[Tuple[str, Set[int]]]:
+    """Resolve evidence phrases to the indices of the chunks that contain them."""
+    texts = [normalize(chunk.page_content) for chunk in chunks]
+    labeled = []
+    for question, evidence in eval_set:
+        phrases = [normalize(phrase) for phrase in evidence]
+        relevant = {
+            i for i, text in enumerate(texts) if any(p in text for p in phrases)
+        }
+        if relevant:
+            labeled.append((question, relevant))
+        else:
+            print(f"⚠️ No chunk contains the evidence for: {question}")
+    return labeled
+
+
+def recall(relevant: Set[int], retrieved: List[int]) -> float:
+    return len(relevant.intersection(retrieved)) / len(relevant)
+
+
+def reciprocal_rank(relevant: Set[int], retrieved: List[int]) -> float:
+    for rank, index in enumerate(retrieved, start=1):
+        if index in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def configure_retriever(retriever, k: int, weights: Sequence[float]):
+    """
+    Set k and the fusion weights on a built hybrid retriever in place.
+
+    Rebuilding for every configuration would re-embed the corpus; the BM25
+    and vector retrievers read k at query time, so changing it is enough.
+    """
+    ensemble = getattr(retriever, "base_retriever", retriever)
+    ensemble.weights = list(weights)
+    for part in ensemble.retrievers:
+        if hasattr(part, "search_kwargs"):  # Chroma's VectorStoreRetriever
+            part.search_kwargs = {**part.search_kwargs, "k": k}
+        else:  # BM25Retriever, IndexRetriever
+            part.k = k
+
+
+def evaluate(
+    retriever,
+    labeled: List[Tuple[str, Set[int]]],
+    chunks: List[Document],
+    count_tokens: Callable[[str], int],
+) -> Dict[str, float]:
+    """Average recall, MRR, latency and context size over the labeled questions."""
+    index_of = {chunk.page_content: i for i, chunk in enumerate(chunks)}
+    recalls, ranks, latencies, tokens, sizes = [], [], [], [], []
+    for question, relevant in labeled:
+        start = time.perf_counter()
+        docs = retriever.invoke(question)
+        latencies.append(time.perf_counter() - start)
+
+        retrieved = [index_of.get(doc.page_content, -1) for doc in docs]
+        recalls.append(recall(relevant, retrieved))
+        ranks.append(reciprocal_rank(relevant, retrieved))
+        tokens.append(count_tokens("\n\n".join(doc.page_content for doc in docs)))
+        sizes.append(len(docs))
+
+    return {
+        "recall": float(np.mean(recalls)),
+        "mrr": float(np.mean(ranks)),
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "context_tokens": float(np.mean(tokens)),
+        "docs": float(np.mean(sizes)),
+    }
+
+
+def pick_cheapest(results: List[dict], tolerance: float = 0.02) -> dict:
+    """Fewest context tokens among configurations within tolerance of best recall."""
+    best = max(r["recall"] for r in results)
+    keep = [r for r in results if r["recall"] >= best - tolerance]
+    return min(keep, key=lambda r: (r["context_tokens"], r["p50_ms"]))
+
+
+def parse_weights(value: str) -> List[float]:
+    weights = [float(w) for w in value.split(",")]
+    if len(weights) != 2:
+        raise argparse.ArgumentTypeError("weights are 'BM25,VECTOR', e.g. 0.4,0.6")
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--file", default=DEFAULT_FILE, help="PDF or markdown")
+    parser.add_argument("--k", nargs="+", type=int, default=[3, 5, 10])
+    parser.add_argument(
+        "--weights",
+        nargs="+",
+        type=parse_weights,
+        default=[[0.4, 0.6], [0.6, 0.4], [0.2, 0.8]],
+        help="BM25,VECTOR pairs",
+    )
+    parser.add_argument("--chunkers", nargs="+", default=["markdown", "recursive:1000"])
+    parser.add_argument("--reranker", nargs="+", choices=["off", "on"], default=["off"])
+    parser.add_argument("--top-n", type=int, default=settings.RERANKER_TOP_N)
+    parser.add_argument(
+        "--tolerance", type=float, default=0.02, help="Recall given up for cost"
+    )
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    from retriever.builder import RetrieverBuilder
+    from retriever.embedding_scheduler import default_token_counter
+    from retriever.reranker import RerankingRetriever
+
+    settings.RERANKER_ENABLED = "on" in args.reranker
+    settings.VECTOR_SEARCH_K = max(args.k)
+    builder = RetrieverBuilder()
+    # Wrap the fused retriever per configuration rather than at build time
+    reranker, builder.reranker = builder.reranker, None
+    count_tokens = default_token_counter()
+    markdown = load_markdown(args.file)
+
+    results = []
+    for chunker in args.chunkers:
+        chunks = split_markdown(markdown, chunker)
+        labeled = label_questions(chunks)
+        print(
+            f"📄 {chunker}: {len(chunks)} chunks, {len(labeled)}/{len(EVAL_SET)} "
+            "questions labeled"
+        )
+        hybrid = builder.build_hybrid_retriever(chunks)
+        hybrid.invoke(EVAL_SET[0][0])  # warm up lazy initialisation
+
+        for rerank in args.reranker:
+            retriever = hybrid
+            if rerank == "on":
+                retriever = RerankingRetriever(
+                    base_retriever=hybrid, reranker=reranker, top_n=args.top_n
+                )
+            for k in args.k:
+                for weights in args.weights:
+                    configure_retriever(retriever, k, weights)
+                    metrics = evaluate(retriever, labeled, chunks, count_tokens)
+                    results.append(
+                        {
+                            "chunker": chunker,
+                            "k": k,
+                            "weights": weights,
+                            "reranker": rerank,
+                            **metrics,
+                        }
+                    )
+
+    print(
+        f"\n{'chunker':<16} {'k':>3} {'weights':>9} {'rerank':>6} {'docs':>5} "
+        f"{'recall':>7} {'MRR':>6} {'p50 ms':>7} {'p95 ms':>7} {'ctx tok':>8}"
+    )
+    for r in results:
+        weights = ",".join(f"{w:g}" for w in r["weights"])
+        print(
+            f"{r['chunker']:<16} {r['k']:>3} {weights:>9} {r['reranker']:>6} "
+            f"{r['docs']:>5.1f} {r['recall']:>7.3f} {r['mrr']:>6.3f} "
+            f"{r['p50_ms']:>7.1f} {r['p95_ms']:>7.1f} {r['context_tokens']:>8.0f}"
+        )
+
+    cheapest = pick_cheapest(results, args.tolerance)
+    print(
+        f"\n💡 Cheapest within {args.tolerance:g} of the best recall: "
+        f"chunker={cheapest['chunker']} k={cheapest['k']} "
+        f"weights={cheapest['weights']} reranker={cheapest['reranker']} "
+        f"(recall {cheapest['recall']:.3f}, {cheapest['context_tokens']:.0f} tokens)"
+    )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"results": results, "cheapest": cheapest}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: import time and memory of the application entry points.
+
+Imports each module in a fresh interpreter under `python -X importtime` and
+reports the import wall time, peak RSS, the slowest imports and which heavy
+packages (Docling, torch, chromadb, langchain, ...) were loaded eagerly.
+Those should only load on first use.
+
+Usage:
+    python -m benchmarks.startup                          # app and server.api
+    python -m benchmarks.startup --modules app --runs 5 --top 15
+    python -m benchmarks.startup --forbid-heavy           # exit 1 on eager heavy imports
+    python -m benchmarks.startup --json startup.json      # for CI regression tracking
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Packages that must not be imported just to start the app
+HEAVY_PACKAGES = (
+    "docling",
+    "torch",
+    "easyocr",
+    "transformers",
+    "onnxruntime",
+    "chromadb",
+    "langchain",
+    "langchain_community",
+    "langgraph",
+)
+
+# Runs in the child interpreter: import the module and report time and memory
+CHILD_SCRIPT = """
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": seconds, "max_rss_mb": rss_kb / 1024,
+                  "modules": sorted(sys.modules)}))
+"""
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Parse `-X importtime` lines into name, depth, self_us and cumulative_us."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        stripped = name.lstrip()
+        entries.append(
+            {
+                "name": stripped.strip(),
+                "depth": (len(name) - len(stripped) - 1) // 2,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+            }
+        )
+    return entries
+
+
+def heavy_packages(modules: List[str]) -> List[str]:
+    """The HEAVY_PACKAGES among the imported module names."""
+    top_level = {module.split(".")[0] for module in modules}
+    return [package for package in HEAVY_PACKAGES if package in top_level]
+
+
+def measure(module: str, runs: int = 3, top: int = 10) -> Dict:
+    """Import module in `runs` fresh interpreters and summarize the results."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT_DIR))
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT, module],
+            cwd=ROOT_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        process_seconds = time.perf_counter() - start
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()[-1:]
+            return {"module": module, "error": error[0] if error else "failed"}
+        sample = json.loads(completed.stdout.strip().splitlines()[-1])
+        sample["process_seconds"] = process_seconds
+        sample["imports"] = parse_importtime(completed.stderr)
+        samples.append(sample)
+
+    last = samples[-1]
+    slowest = sorted(last["imports"], key=lambda e: e["self_us"], reverse=True)
+    return {
+        "module": module,
+        "import_seconds": statistics.median(s["seconds"] for s in samples),
+        "process_seconds": statistics.median(s["process_seconds"] for s in samples),
+        "max_rss_mb": max(s["max_rss_mb"] for s in samples),
+        "modules_loaded": len(last["modules"]),
+        "heavy_packages": heavy_packages(last["modules"]),
+        "slowest_imports": [
+            {"name": e["name"], "self_ms": e["self_us"] / 1000} for e in slowest[:top]
+        ],
+    }
+
+
+def print_result(result: Dict):
+    if "error" in result:
+        print(f"❌ {result['module']}: {result['error']}")
+        return
+    print(
+        f"🚀 {result['module']}: import {result['import_seconds']:.2f}s, "
+        f"process {result['process_seconds']:.2f}s, "
+        f"peak RSS {result['max_rss_mb']:.0f} MB, "
+        f"{result['modules_loaded']} modules"
+    )
+    heavy = ", ".join(result["heavy_packages"]) or "none"
+    print(f"   Heavy packages loaded at startup: {heavy}")
+    for entry in result["slowest_imports"]:
+        print(f"   {entry['self_ms']:8.1f} ms  {entry['name']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=["app", "server.api"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports shown")
+    parser.add_argument(
+        "--forbid-heavy",
+        action="store_true",
+        help="Exit with status 1 if a heavy package is imported at startup",
+    )
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = [measure(module, args.runs, args.top) for module in args.modules]
+    for result in results:
+        print_result(result)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"💾 Results written to {args.json}")
+
+    if args.forbid_heavy and any(r.get("heavy_packages") for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -24,14 +24,193 @@ class Settings(BaseSettings):
 
     # Database settings
     CHROMA_DB_PATH: str = "./chroma_db"
-    CHROMA_COLLECTION_NAME: str = "documents"
+    CHROMA_COLLECTION_NAME: str = "documents"  # prefix of per-corpus collections
+    CHROMA_COLLECTION_TTL_HOURS: float = 24
+    CHROMA_GC_INTERVAL_SECONDS: int = 600
+
+    # Chat models: LLM_BACKEND is "azure" (the AZURE_OPENAI_* variables), "openai"
+    # (any OpenAI-compatible server at LLM_BASE_URL, e.g. vLLM, llama.cpp or
+    # Ollama) or "fake" (canned replies in process, for offline runs). LLM_MODEL
+    # is the model / deployment name (default: AZURE_OPENAI_DEPLOYMENT_NAME).
+    # <AGENT>_LLM routes one agent elsewhere: "backend" or "backend:model"
+    LLM_BACKEND: str = "azure"
+    LLM_MODEL: Optional[str] = None
+    LLM_BASE_URL: str = "http://127.0.0.1:8000/v1"
+    LLM_API_KEY: Optional[str] = None
+    RELEVANCE_LLM: str = ""  # e.g. "openai:qwen2.5-1.5b-instruct"
+    RESEARCH_LLM: str = ""
+    VERIFICATION_LLM: str = ""
+    # Identical LLM calls in flight at the same time share one upstream request:
+    # "deterministic" (temperature-0 calls only), "all" (sampled calls too, so
+    # concurrent askers get the same sample) or "off"
+    LLM_COALESCE: str = "deterministic"
+    # Persistent LLM response cache (SQLite), opt-in per agent: LLM_CACHE_AGENTS
+    # lists the agents whose replies are reused for an identical request, e.g.
+    # "relevance,verification" (both run at temperature 0); empty path disables
+    LLM_CACHE_AGENTS: str = ""
+    LLM_CACHE_PATH: str = "llm_cache.sqlite"
+    LLM_CACHE_TTL_HOURS: float = 168  # 0 keeps entries until evicted
+    LLM_CACHE_MAX_ENTRIES: int = 10000  # least recently used ones go first
+    # Hedged LLM calls, opt-in per agent (LLM_HEDGE_AGENTS, e.g.
+    # "research,verification"): a call still running after the
+    # LLM_HEDGE_PERCENTILE of the agent's recent latencies (at least
+    # LLM_HEDGE_MIN_DELAY_SECONDS, once LLM_HEDGE_MIN_SAMPLES calls are known)
+    # gets a duplicate and the first reply wins; hedges stay within
+    # LLM_HEDGE_BUDGET of all calls
+    LLM_HEDGE_AGENTS: str = ""
+    LLM_HEDGE_PERCENTILE: float = 95
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 1.0
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_BUDGET: float = 0.05
+
+    # Embedding settings ("azure" calls the remote service, "onnx" runs on CPU)
+    EMBEDDING_BACKEND: str = "azure"
+    ONNX_EMBEDDING_MODEL_PATH: str = "models/all-MiniLM-L6-v2/model.onnx"
+    ONNX_EMBEDDING_TOKENIZER_PATH: str = "models/all-MiniLM-L6-v2/tokenizer.json"
+    ONNX_EMBEDDING_MAX_LENGTH: int = 256
+    ONNX_EMBEDDING_BATCH_TOKENS: int = 16384
+    ONNX_EMBEDDING_MAX_BATCH_SIZE: int = 64
+    ONNX_NUM_THREADS: int = 0  # 0 = one thread per physical core
+    ONNX_QUANTIZE_INT8: bool = False
+
+    # Remote embedding scheduling (concurrency within the deployment's quota)
+    EMBEDDING_TPM_LIMIT: int = 350_000
+    EMBEDDING_RPM_LIMIT: int = 2_100
+    EMBEDDING_MAX_CONCURRENCY: int = 8
+    EMBEDDING_MAX_BATCH_TOKENS: int = 64_000
+    EMBEDDING_MAX_BATCH_SIZE: int = 256
+    EMBEDDING_MAX_RETRIES: int = 6
+
+    # Vector index: "chroma", "hnswlib" (in-memory), "exact" (NumPy) or "auto"
+    # ("auto" uses exact search up to EXACT_SEARCH_MAX_DOCS chunks, Chroma above)
+    VECTOR_BACKEND: str = "chroma"
+    EXACT_SEARCH_MAX_DOCS: int = 5000
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCTION: int = 100
+    HNSW_EF_SEARCH: int = 64
 
     # Retrieval settings
     VECTOR_SEARCH_K: int = 10
     HYBRID_RETRIEVER_WEIGHTS: list = [0.4, 0.6]
 
+    # Optional cross-encoder rerank of the fused candidates (ONNX Runtime, CPU)
+    RERANKER_ENABLED: bool = False
+    RERANKER_MODEL_PATH: str = "models/ms-marco-MiniLM-L-6-v2/model.onnx"
+    RERANKER_TOKENIZER_PATH: str = "models/ms-marco-MiniLM-L-6-v2/tokenizer.json"
+    RERANKER_TOP_N: int = 5
+    RERANKER_BATCH_SIZE: int = 16
+    RERANKER_MAX_LENGTH: int = 512
+    RERANKER_CACHE_SIZE: int = 4096
+
+    # Relevance gate in front of the LLM relevance check: "off", "scores" (label
+    # clear cases from query-term coverage and the fused / vector scores of the
+    # top RELEVANCE_GATE_DOCS chunks) or "classifier" (also score them with the
+    # reranker's cross-encoder); anything in between still goes to the LLM
+    RELEVANCE_GATE: str = "off"
+    RELEVANCE_GATE_DOCS: int = 5
+    RELEVANCE_ACCEPT_COVERAGE: float = 0.8  # CAN_ANSWER at or above...
+    RELEVANCE_MIN_AGREEMENT: float = 0.75  # ...if the top fused score reaches this
+    RELEVANCE_REJECT_COVERAGE: float = 0.0  # NO_MATCH at or below...
+    RELEVANCE_REJECT_VECTOR_SCORE: float = 0.3  # ...if no chunk is this similar
+    RELEVANCE_CLASSIFIER_ACCEPT: float = 0.8  # cross-encoder probabilities
+    RELEVANCE_CLASSIFIER_REJECT: float = 0.1
+
+    # Adaptive context: instead of every retrieved chunk, the answering calls
+    # get the chunks up to the first drop of CONTEXT_SCORE_GAP (share of the
+    # retrieval score range) between neighbours, at least CONTEXT_MIN_DOCS and
+    # at most the budget of the relevance label; every re-research after a
+    # failed verification doubles the context
+    CONTEXT_ADAPTIVE: bool = False
+    CONTEXT_MIN_DOCS: int = 3
+    CONTEXT_DOCS_CAN_ANSWER: int = 5
+    CONTEXT_DOCS_PARTIAL: int = 10
+    CONTEXT_SCORE_GAP: float = 0.3
+
+    # Answer mode, also selectable per request: "two_step" (research, then a
+    # separate verification call) or "single_call" (one structured call answers,
+    # cites its chunks and rates their support; the verifier only runs when the
+    # rating is below SELF_VERIFY_MIN_CONFIDENCE or the cited chunks contain
+    # less than SELF_VERIFY_MIN_CITATION_COVERAGE of the answer's terms)
+    ANSWER_MODE: str = "two_step"
+    SELF_VERIFY_MIN_CONFIDENCE: float = 0.7
+    SELF_VERIFY_MIN_CITATION_COVERAGE: float = 0.6
+
+    # Local claim check before the verifier LLM: "off" or "local" (split the
+    # draft into claims and match each against the chunks by term coverage,
+    # numbers and named entities; only claims it cannot confirm go to the LLM,
+    # and none do when all are confirmed)
+    GROUNDING_MODE: str = "off"
+    GROUNDING_MIN_COVERAGE: float = 0.7
+
+    # Batch question answering: questions running through the agents at once
+    BATCH_MAX_CONCURRENCY: int = 8
+
+    # HTTP service (python -m server): uploads and corpus manifests live in
+    # SERVER_DATA_DIR so every worker process can resolve any corpus ID
+    SERVER_HOST: str = "127.0.0.1"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 1
+    SERVER_MAX_CONCURRENT_REQUESTS: int = 16  # beyond this, requests queue
+    SERVER_QUEUE_TIMEOUT_SECONDS: float = 10.0  # then they get 503
+    SERVER_DATA_DIR: str = "server_data"
+    SERVER_MAX_CACHED_CORPORA: int = 8  # retrievers kept in memory per worker
+
+    # Fair scheduling of questions between sessions (Gradio sessions, or the
+    # API's X-Session-ID header / client address): at most
+    # PIPELINE_MAX_CONCURRENCY questions run at once per process and
+    # PIPELINE_SESSION_CONCURRENCY per session, the others wait in weighted fair
+    # order. New questions are turned away as busy when PIPELINE_MAX_QUEUED
+    # (PIPELINE_SESSION_MAX_QUEUED for their session) are already waiting, or
+    # after waiting PIPELINE_QUEUE_TIMEOUT_SECONDS. Batch questions are
+    # scheduled as questions of the batch's session. PIPELINE_SESSION_WEIGHTS
+    # gives sessions a larger share, e.g. "reports-service=3,partner=2"; it
+    # trusts the session IDs, so only set it behind a trusted proxy
+    PIPELINE_MAX_CONCURRENCY: int = 8
+    PIPELINE_SESSION_CONCURRENCY: int = 2
+    PIPELINE_MAX_QUEUED: int = 32
+    PIPELINE_SESSION_MAX_QUEUED: int = 4
+    PIPELINE_QUEUE_TIMEOUT_SECONDS: float = 60.0
+    PIPELINE_SESSION_WEIGHTS: str = ""
+
+    # Background ingestion: jobs live in SQLite next to the corpus manifests and
+    # run on INGEST_WORKERS threads per process; failures retry with backoff.
+    # Each worker converts with a Docling converter (and models) of its own
+    INGEST_WORKERS: int = 2
+    # Workers go to the session with the fewest running jobs first; uploads are
+    # turned away as busy beyond the queued-job limits
+    INGEST_SESSION_CONCURRENCY: int = 1
+    INGEST_MAX_QUEUED: int = 64
+    INGEST_SESSION_MAX_QUEUED: int = 8
+    INGEST_MAX_ATTEMPTS: int = 3
+    INGEST_RETRY_BACKOFF_SECONDS: float = 5.0
+    # Running jobs without progress or a heartbeat (sent every third of the
+    # lease) for this long are assumed lost and re-run
+    INGEST_LEASE_SECONDS: float = 900.0
+    INGEST_WAIT_TIMEOUT_SECONDS: float = 300.0  # questions wait this long for a corpus
+
+    # Workflow checkpoints (SQLite): a failed run retried with the same request
+    # ID resumes after its last completed node; empty disables checkpointing.
+    # Failed runs not retried within CHECKPOINT_TTL_HOURS are dropped, on
+    # startup and every CHECKPOINT_GC_INTERVAL_SECONDS when runs start
+    CHECKPOINT_DB_PATH: str = "checkpoints.sqlite"
+    CHECKPOINT_TTL_HOURS: float = 24
+    CHECKPOINT_GC_INTERVAL_SECONDS: int = 600
+
+    # Startup: Docling/torch, chromadb and the agents load on first use; with
+    # STARTUP_PREWARM they load in background threads once the app is up
+    STARTUP_PREWARM: bool = False
+
     # Logging settings
     LOG_LEVEL: str = "INFO"
+    LOG_FILE: str = "app.log"  # JSON lines, written from a background thread
+    LOG_PAYLOAD_MAX_CHARS: int = 500  # cap on logged prompts / contexts / responses
+    LOG_PAYLOAD_SAMPLE_RATE: float = 0.1  # share of requests that log payloads
+
+    # Tracing and metrics: spans go to "none", "console" or "file" (TRACING_FILE,
+    # one JSON span per line); METRICS_PORT > 0 serves Prometheus text at /metrics
+    TRACING_EXPORTER: str = "none"
+    TRACING_FILE: str = "traces.jsonl"
+    METRICS_PORT: int = 0
 
     # New cache settings with type annotations
     CACHE_DIR: str = "document_cache"
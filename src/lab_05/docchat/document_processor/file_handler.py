@@ -1,16 +1,19 @@
 import hashlib
 import os
 import pickle
+import queue
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List
 
-from docling.document_converter import DocumentConverter
 from langchain_text_splitters import MarkdownHeaderTextSplitter
 
 from config import constants
 from config.settings import settings
 from utils.logging import logger
+from utils.metrics import record_cache
 
 
 class DocumentProcessor:
@@ -18,6 +21,20 @@ class DocumentProcessor:
         self.headers = [("#", "Header 1"), ("##", "Header 2")]
         self.cache_dir = Path(settings.CACHE_DIR)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Docling pipelines are not documented as thread-safe, so each
+        # conversion borrows a converter of its own; at most one per ingest
+        # worker is ever created, since each loads its own models
+        self._idle_converters = queue.LifoQueue()
+        self._converter_slots = threading.BoundedSemaphore(
+            max(1, settings.INGEST_WORKERS)
+        )
+
+    def warm_up(self):
+        """Load Docling and its PDF models ahead of the first conversion."""
+        from docling.datamodel.base_models import InputFormat
+
+        with self._converter() as converter:
+            converter.initialize_pipeline(InputFormat.PDF)
 
     def validate_files(self, files: List) -> None:
         """Validate the total size of the uploaded files."""
@@ -41,7 +58,9 @@ class DocumentProcessor:
 
                 cache_path = self.cache_dir / f"{file_hash}.pkl"
 
-                if self._is_cache_valid(cache_path):
+                cache_hit = self._is_cache_valid(cache_path)
+                record_cache("documents", hit=cache_hit)
+                if cache_hit:
                     logger.info(f"Loading from cache: {file.name}")
                     chunks = self._load_from_cache(cache_path)
                 else:
@@ -69,11 +88,27 @@ class DocumentProcessor:
             logger.warning(f"Skipping unsupported file type: {file.name}")
             return []
 
-        converter = DocumentConverter()
-        markdown = converter.convert(file.name).document.export_to_markdown()
+        with self._converter() as converter:
+            result = converter.convert(file.name)
+        markdown = result.document.export_to_markdown()
         splitter = MarkdownHeaderTextSplitter(self.headers)
         return splitter.split_text(markdown)
 
+    @contextmanager
+    def _converter(self):
+        with self._converter_slots:
+            try:
+                converter = self._idle_converters.get_nowait()
+            except queue.Empty:
+                # Docling pulls in torch and easyocr; import it on first use
+                from docling.document_converter import DocumentConverter
+
+                converter = DocumentConverter()
+            try:
+                yield converter
+            finally:
+                self._idle_converters.put(converter)
+
     def _generate_hash(self, content: bytes) -> str:
         return hashlib.sha256(content).hexdigest()
 
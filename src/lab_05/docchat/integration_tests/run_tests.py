@@ -9,11 +9,26 @@ import sys
 import time
 from datetime import datetime
 
+from integration_tests.test_collection_registry import run_collection_registry_tests
+from integration_tests.test_embedding_scheduler import run_embedding_scheduler_tests
+from integration_tests.test_embeddings import run_embeddings_tests
+from integration_tests.test_fair_scheduler import run_fair_scheduler_tests
+from integration_tests.test_llm import run_llm_tests
+from integration_tests.test_logging import run_logging_tests
+from integration_tests.test_mock_azure import run_mock_azure_tests
+from integration_tests.test_prompts import run_prompts_tests
 from integration_tests.test_relevance_checker import run_relevance_checker_tests
+from integration_tests.test_reranker import run_reranker_tests
 from integration_tests.test_research_agent import run_research_agent_tests
+from integration_tests.test_retrieval_eval import run_retrieval_eval_tests
 from integration_tests.test_retriever_builder import run_retriever_builder_tests
+from integration_tests.test_server import run_server_tests
+from integration_tests.test_startup import run_startup_tests
+from integration_tests.test_tracing import run_tracing_tests
 from integration_tests.test_utils import check_environment_variables
+from integration_tests.test_vector_store import run_vector_store_tests
 from integration_tests.test_verification_agent import run_verification_agent_tests
+from integration_tests.test_workflow import run_workflow_tests
 
 
 def print_banner():
@@ -129,6 +144,156 @@ def run_all_tests():
         print(f"💥 RetrieverBuilder tests failed with exception: {e}")
         test_results["retriever_builder"] = False
 
+    print("\n")
+
+    # Run embedding backend tests
+    print("5️⃣ " + "=" * 60)
+    try:
+        test_results["embeddings"] = run_embeddings_tests()
+    except Exception as e:
+        print(f"💥 Embedding backend tests failed with exception: {e}")
+        test_results["embeddings"] = False
+
+    print("\n")
+
+    # Run EmbeddingScheduler tests
+    print("6️⃣ " + "=" * 60)
+    try:
+        test_results["embedding_scheduler"] = run_embedding_scheduler_tests()
+    except Exception as e:
+        print(f"💥 EmbeddingScheduler tests failed with exception: {e}")
+        test_results["embedding_scheduler"] = False
+
+    print("\n")
+
+    # Run reranker tests
+    print("7️⃣ " + "=" * 60)
+    try:
+        test_results["reranker"] = run_reranker_tests()
+    except Exception as e:
+        print(f"💥 Reranker tests failed with exception: {e}")
+        test_results["reranker"] = False
+
+    print("\n")
+
+    # Run vector backend tests
+    print("8️⃣ " + "=" * 60)
+    try:
+        test_results["vector_store"] = run_vector_store_tests()
+    except Exception as e:
+        print(f"💥 Vector backend tests failed with exception: {e}")
+        test_results["vector_store"] = False
+
+    print("\n")
+
+    # Run collection registry tests
+    print("9️⃣ " + "=" * 60)
+    try:
+        test_results["collection_registry"] = run_collection_registry_tests()
+    except Exception as e:
+        print(f"💥 Collection registry tests failed with exception: {e}")
+        test_results["collection_registry"] = False
+
+    print("\n")
+
+    # Run AgentWorkflow tests
+    print("🔟 " + "=" * 60)
+    try:
+        test_results["workflow"] = run_workflow_tests()
+    except Exception as e:
+        print(f"💥 AgentWorkflow tests failed with exception: {e}")
+        test_results["workflow"] = False
+
+    print("\n")
+
+    # Run tracing and metrics tests
+    print("1️⃣1️⃣ " + "=" * 60)
+    try:
+        test_results["tracing"] = run_tracing_tests()
+    except Exception as e:
+        print(f"💥 Tracing tests failed with exception: {e}")
+        test_results["tracing"] = False
+
+    print("\n")
+
+    # Run logging tests
+    print("1️⃣2️⃣ " + "=" * 60)
+    try:
+        test_results["logging"] = run_logging_tests()
+    except Exception as e:
+        print(f"💥 Logging tests failed with exception: {e}")
+        test_results["logging"] = False
+
+    print("\n")
+
+    # Run mock Azure server tests
+    print("1️⃣3️⃣ " + "=" * 60)
+    try:
+        test_results["mock_azure"] = run_mock_azure_tests()
+    except Exception as e:
+        print(f"💥 Mock Azure server tests failed with exception: {e}")
+        test_results["mock_azure"] = False
+
+    print("\n")
+
+    # Run retrieval evaluation tests
+    print("1️⃣4️⃣ " + "=" * 60)
+    try:
+        test_results["retrieval_eval"] = run_retrieval_eval_tests()
+    except Exception as e:
+        print(f"💥 Retrieval evaluation tests failed with exception: {e}")
+        test_results["retrieval_eval"] = False
+
+    print("\n")
+
+    # Run HTTP service tests
+    print("1️⃣5️⃣ " + "=" * 60)
+    try:
+        test_results["server"] = run_server_tests()
+    except Exception as e:
+        print(f"💥 HTTP service tests failed with exception: {e}")
+        test_results["server"] = False
+
+    print("\n")
+
+    # Run startup tests
+    print("1️⃣6️⃣ " + "=" * 60)
+    try:
+        test_results["startup"] = run_startup_tests()
+    except Exception as e:
+        print(f"💥 Startup tests failed with exception: {e}")
+        test_results["startup"] = False
+
+    print("\n")
+
+    # Run prompt layout tests
+    print("1️⃣7️⃣ " + "=" * 60)
+    try:
+        test_results["prompts"] = run_prompts_tests()
+    except Exception as e:
+        print(f"💥 Prompt layout tests failed with exception: {e}")
+        test_results["prompts"] = False
+
+    print("\n")
+
+    # Run LLM backend tests
+    print("1️⃣8️⃣ " + "=" * 60)
+    try:
+        test_results["llm"] = run_llm_tests()
+    except Exception as e:
+        print(f"💥 LLM backend tests failed with exception: {e}")
+        test_results["llm"] = False
+
+    print("\n")
+
+    # Run fair scheduling tests
+    print("1️⃣9️⃣ " + "=" * 60)
+    try:
+        test_results["fair_scheduler"] = run_fair_scheduler_tests()
+    except Exception as e:
+        print(f"💥 Fair scheduling tests failed with exception: {e}")
+        test_results["fair_scheduler"] = False
+
     # Calculate total time
     end_time = time.time()
     total_time = end_time - start_time
@@ -180,9 +345,56 @@ def run_specific_agent_test(agent_name):
     elif agent_name in ["builder", "retriever", "retriever_builder"]:
         print("Running RetrieverBuilder tests only...")
         return run_retriever_builder_tests()
+    elif agent_name in ["embeddings", "embedding"]:
+        print("Running embedding backend tests only...")
+        return run_embeddings_tests()
+    elif agent_name in ["scheduler", "embedding_scheduler"]:
+        print("Running EmbeddingScheduler tests only...")
+        return run_embedding_scheduler_tests()
+    elif agent_name in ["reranker", "rerank"]:
+        print("Running reranker tests only...")
+        return run_reranker_tests()
+    elif agent_name in ["vector", "vector_store"]:
+        print("Running vector backend tests only...")
+        return run_vector_store_tests()
+    elif agent_name in ["collections", "collection_registry"]:
+        print("Running collection registry tests only...")
+        return run_collection_registry_tests()
+    elif agent_name in ["workflow", "agent_workflow"]:
+        print("Running AgentWorkflow tests only...")
+        return run_workflow_tests()
+    elif agent_name in ["tracing", "metrics"]:
+        print("Running tracing tests only...")
+        return run_tracing_tests()
+    elif agent_name in ["logging", "logs"]:
+        print("Running logging tests only...")
+        return run_logging_tests()
+    elif agent_name in ["mock", "mock_azure"]:
+        print("Running mock Azure server tests only...")
+        return run_mock_azure_tests()
+    elif agent_name in ["eval", "retrieval_eval"]:
+        print("Running retrieval evaluation tests only...")
+        return run_retrieval_eval_tests()
+    elif agent_name in ["server", "api"]:
+        print("Running HTTP service tests only...")
+        return run_server_tests()
+    elif agent_name in ["startup", "lazy"]:
+        print("Running startup tests only...")
+        return run_startup_tests()
+    elif agent_name in ["prompts", "prompt"]:
+        print("Running prompt layout tests only...")
+        return run_prompts_tests()
+    elif agent_name in ["llm", "backends"]:
+        print("Running LLM backend tests only...")
+        return run_llm_tests()
+    elif agent_name in ["fair_scheduler", "admission"]:
+        print("Running fair scheduling tests only...")
+        return run_fair_scheduler_tests()
     else:
         print(f"❌ Unknown agent: {agent_name}")
-        print("Available agents: relevance, research, verification, builder")
+        print(
+            "Available agents: relevance, research, verification, builder, embeddings"
+        )
         return False
 
 
@@ -0,0 +1,178 @@
+"""
+Integration tests for per-corpus Chroma collection book-keeping.
+"""
+
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from integration_tests.test_utils import TestData
+from retriever.collection_registry import (
+    LEGACY_COLLECTION_NAME,
+    CollectionRegistry,
+    corpus_fingerprint,
+)
+
+
+class Handle:
+    """Stand-in for a retriever that references a collection."""
+
+
+class TestCorpusFingerprint(unittest.TestCase):
+    """Test cases for corpus fingerprints."""
+
+    def test_order_insensitive(self):
+        """Test that the same chunks in another order share a fingerprint."""
+        docs = TestData.SAMPLE_DOCUMENTS
+        self.assertEqual(
+            corpus_fingerprint(docs, "cfg"),
+            corpus_fingerprint(list(reversed(docs)), "cfg"),
+        )
+        print("✅ Order-insensitive fingerprint test passed")
+
+    def test_depends_on_content_and_config(self):
+        """Test that content and index configuration change the fingerprint."""
+        docs = TestData.SAMPLE_DOCUMENTS
+        base = corpus_fingerprint(docs, "cfg")
+        self.assertNotEqual(base, corpus_fingerprint(docs[:3], "cfg"))
+        self.assertNotEqual(base, corpus_fingerprint(docs, "other-model"))
+        print("✅ Fingerprint sensitivity test passed")
+
+
+class TestCollectionRegistry(unittest.TestCase):
+    """Test cases for CollectionRegistry."""
+
+    def setUp(self):
+        """Set up before each test."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.registry = CollectionRegistry(self.temp_dir, ttl_hours=0, gc_interval=0)
+        self.deleted = []
+
+    def tearDown(self):
+        """Clean up after each test."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def delete(self, name):
+        if name == LEGACY_COLLECTION_NAME:
+            raise ValueError("collection does not exist")
+        self.deleted.append(name)
+
+    def test_unreferenced_collections_are_collected(self):
+        """Test that expired, unreferenced collections are deleted."""
+        self.registry.touch("documents_a", 3)
+        self.registry.touch("documents_b", 5)
+        handle = Handle()
+        self.registry.track(handle, "documents_b")
+
+        deleted = self.registry.collect_garbage(self.delete, force=True)
+
+        self.assertEqual(deleted, ["documents_a"])
+        self.assertEqual(self.deleted, ["documents_a"])
+        print("✅ Garbage collection test passed")
+
+    def test_reference_released_with_retriever(self):
+        """Test that a collection becomes collectable once its retriever is gone."""
+        self.registry.touch("documents_a", 3)
+        handle = Handle()
+        self.registry.track(handle, "documents_a")
+        self.assertEqual(self.registry.referenced(), {"documents_a"})
+
+        del handle
+        gc.collect()
+
+        self.assertEqual(self.registry.referenced(), set())
+        self.assertEqual(
+            self.registry.collect_garbage(self.delete, force=True), ["documents_a"]
+        )
+        print("✅ Reference release test passed")
+
+    def test_recent_collections_are_kept(self):
+        """Test that collections used within the TTL survive garbage collection."""
+        registry = CollectionRegistry(self.temp_dir, ttl_hours=1, gc_interval=0)
+        registry.touch("documents_a", 3)
+
+        self.assertEqual(registry.collect_garbage(self.delete, force=True), [])
+        print("✅ TTL retention test passed")
+
+    def test_registry_shared_through_disk(self):
+        """Test that another registry on the same directory sees the entries."""
+        self.registry.touch("documents_a", 3)
+        other = CollectionRegistry(self.temp_dir, ttl_hours=0, gc_interval=0)
+
+        self.assertEqual(
+            other.collect_garbage(self.delete, force=True), ["documents_a"]
+        )
+        print("✅ Shared registry test passed")
+
+    def test_gc_during_rebuild_of_expired_collection(self):
+        """Test that GC and a build of the same expired collection do not deadlock."""
+        registry = CollectionRegistry(self.temp_dir, ttl_hours=1, gc_interval=0)
+        registry._write({"documents_a": {"created": 0, "last_used": 0}})
+        building = threading.Event()
+        results = []
+
+        def build():
+            # As the builder does: collection lock first, then the registry
+            with registry.collection_lock("documents_a"):
+                building.set()
+                time.sleep(0.3)  # GC is now waiting for this collection
+                registry.touch("documents_a", 3)
+
+        builder = threading.Thread(target=build)
+        collector = threading.Thread(
+            target=lambda: results.append(
+                registry.collect_garbage(self.delete, force=True)
+            )
+        )
+        builder.start()
+        building.wait(5)
+        collector.start()
+        builder.join(5)
+        collector.join(5)
+
+        self.assertFalse(builder.is_alive() or collector.is_alive())
+        # Touched by the build while GC waited, so no longer expired
+        self.assertEqual(results, [[]])
+        self.assertEqual(self.deleted, [])
+        print("✅ Concurrent GC and rebuild test passed")
+
+
+def run_collection_registry_tests():
+    """Run all collection registry tests."""
+    print("\n🧪 Running Collection Registry Integration Tests...\n")
+
+    # Create test suite
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    for case in (TestCorpusFingerprint, TestCollectionRegistry):
+        suite.addTests(loader.loadTestsFromTestCase(case))
+
+    # Run tests
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    # Print summary
+    print("\n📊 Collection Registry Test Results:")
+    print(f"   Tests run: {result.testsRun}")
+    print(f"   Failures: {len(result.failures)}")
+    print(f"   Errors: {len(result.errors)}")
+
+    success = len(result.failures) == 0 and len(result.errors) == 0
+    if success:
+        print("\n🎉 All collection registry tests passed!")
+    else:
+        print("\n💥 Some collection registry tests failed!")
+
+    return success
+
+
+if __name__ == "__main__":
+    run_collection_registry_tests()
@@ -0,0 +1,210 @@
+"""
+Integration tests for the EmbeddingScheduler used with remote embedding backends.
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.embeddings import Embeddings
+
+from retriever.embedding_scheduler import (
+    EmbeddingBatchError,
+    EmbeddingScheduler,
+    RateLimiter,
+)
+
+
+class RateLimitedError(Exception):
+    """Stand-in for the OpenAI client's 429 error."""
+
+    status_code = 429
+
+
+class FakeRemoteEmbeddings(Embeddings):
+    """Deterministic embeddings that can simulate latency and failures."""
+
+    def __init__(self, latency=0.0, fail_texts=(), rate_limit_first=0, drop_first=0):
+        self.latency = latency
+        self.fail_texts = set(fail_texts)
+        self.rate_limit_first = rate_limit_first
+        self.drop_first = drop_first
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls.append(list(texts))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            rate_limited = self.rate_limit_first > 0
+            if rate_limited:
+                self.rate_limit_first -= 1
+            dropped = not rate_limited and self.drop_first > 0
+            if dropped:
+                self.drop_first -= 1
+        try:
+            time.sleep(self.latency)
+            if rate_limited:
+                raise RateLimitedError("429 Too Many Requests")
+            if dropped:
+                raise ConnectionResetError("Connection reset by peer")
+            if self.fail_texts.intersection(texts):
+                raise ValueError("400 bad input")
+            return [[float(len(text)), 1.0] for text in texts]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def make_scheduler(remote, **kwargs):
+    options = dict(
+        tokens_per_minute=10_000_000,
+        requests_per_minute=1_000_000,
+        max_concurrency=4,
+        max_batch_tokens=10,
+        max_batch_size=4,
+        max_retries=2,
+        backoff_base=0.01,
+        token_counter=lambda text: len(text.split()),
+    )
+    options.update(kwargs)
+    return EmbeddingScheduler(remote, **options)
+
+
+class TestEmbeddingScheduler(unittest.TestCase):
+    """Test cases for EmbeddingScheduler."""
+
+    def test_results_preserve_input_order(self):
+        """Test that concurrent batches are reassembled in input order."""
+        texts = [" ".join(["w"] * n) for n in range(1, 12)]
+        scheduler = make_scheduler(FakeRemoteEmbeddings(latency=0.01))
+
+        vectors = scheduler.embed_documents(texts)
+
+        self.assertEqual([v[0] for v in vectors], [float(len(t)) for t in texts])
+        print("✅ Order preservation test passed")
+
+    def test_batches_adapt_to_token_counts(self):
+        """Test that batches respect both the token and item budgets."""
+        scheduler = make_scheduler(FakeRemoteEmbeddings())
+
+        batches = scheduler.plan_batches([2, 2, 2, 2, 2, 9, 1, 1])
+
+        self.assertEqual(batches, [[0, 1, 2, 3], [4], [5, 6], [7]])
+        print("✅ Token-aware batching test passed")
+
+    def test_batches_run_concurrently(self):
+        """Test that batches are sent in parallel up to max_concurrency."""
+        remote = FakeRemoteEmbeddings(latency=0.05)
+        scheduler = make_scheduler(remote, max_batch_size=1, max_concurrency=4)
+
+        scheduler.embed_documents([f"text {i}" for i in range(8)])
+
+        self.assertGreater(remote.max_in_flight, 1)
+        self.assertLessEqual(remote.max_in_flight, 4)
+        print(f"✅ Concurrency test passed (max in flight: {remote.max_in_flight})")
+
+    def test_rate_limit_is_retried(self):
+        """Test that 429 responses trigger backoff and a retry."""
+        remote = FakeRemoteEmbeddings(rate_limit_first=1)
+        scheduler = make_scheduler(remote)
+
+        vectors = scheduler.embed_documents(["a b", "c d"])
+
+        self.assertEqual(len(vectors), 2)
+        self.assertEqual(len(remote.calls), 2)
+        print("✅ Rate limit retry test passed")
+
+    def test_query_rate_limit_is_retried(self):
+        """Test that query embeddings are retried on 429 as well."""
+        remote = FakeRemoteEmbeddings(rate_limit_first=1)
+        scheduler = make_scheduler(remote)
+
+        vector = scheduler.embed_query("a b")
+
+        self.assertEqual(vector, [3.0, 1.0])
+        self.assertEqual(len(remote.calls), 2)
+        print("✅ Query rate limit retry test passed")
+
+    def test_only_transient_errors_are_retried(self):
+        """Test that dropped connections retry but bad input fails at once."""
+        remote = FakeRemoteEmbeddings(drop_first=1)
+        scheduler = make_scheduler(remote)
+        self.assertEqual(scheduler.embed_query("a b"), [3.0, 1.0])
+        self.assertEqual(len(remote.calls), 2)
+
+        remote = FakeRemoteEmbeddings(fail_texts={"bad"})
+        scheduler = make_scheduler(remote)
+        with self.assertRaises(ValueError):
+            scheduler.embed_query("bad")
+        self.assertEqual(remote.calls, [["bad"]])
+        print("✅ Non-retryable error test passed")
+
+    def test_partial_failure_resumes(self):
+        """Test that a repeated call only re-embeds the batches that failed."""
+        texts = ["one", "two", "bad", "four"]
+        remote = FakeRemoteEmbeddings(fail_texts={"bad"})
+        scheduler = make_scheduler(remote, max_batch_size=1)
+
+        with self.assertRaises(EmbeddingBatchError) as ctx:
+            scheduler.embed_documents(texts)
+        self.assertEqual(ctx.exception.failed_batches, 1)
+
+        remote.fail_texts.clear()
+        remote.calls.clear()
+        vectors = scheduler.embed_documents(texts)
+
+        self.assertEqual(remote.calls, [["bad"]])
+        self.assertEqual(len(vectors), 4)
+        print("✅ Partial failure resume test passed")
+
+    def test_rate_limiter_waits_for_budget(self):
+        """Test that the request budget throttles callers."""
+        limiter = RateLimiter(tokens_per_minute=1_000_000, requests_per_minute=600)
+        limiter._requests = 0  # empty bucket: 10 requests/s refill
+
+        waited = limiter.acquire(1)
+
+        self.assertGreater(waited, 0.05)
+        print(f"✅ Rate limiter test passed (waited {waited:.2f}s)")
+
+
+def run_embedding_scheduler_tests():
+    """Run all EmbeddingScheduler tests."""
+    print("\n🧪 Running EmbeddingScheduler Integration Tests...\n")
+
+    # Create test suite
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestEmbeddingScheduler)
+
+    # Run tests
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    # Print summary
+    print("\n📊 EmbeddingScheduler Test Results:")
+    print(f"   Tests run: {result.testsRun}")
+    print(f"   Failures: {len(result.failures)}")
+    print(f"   Errors: {len(result.errors)}")
+
+    success = len(result.failures) == 0 and len(result.errors) == 0
+    if success:
+        print("\n🎉 All EmbeddingScheduler tests passed!")
+    else:
+        print("\n💥 Some EmbeddingScheduler tests failed!")
+
+    return success
+
+
+if __name__ == "__main__":
+    run_embedding_scheduler_tests()
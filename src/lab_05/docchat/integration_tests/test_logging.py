@@ -0,0 +1,146 @@
+"""
+Integration tests for the structured logging helpers.
+"""
+
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from integration_tests.test_utils import MockRetriever, TestData
+from integration_tests.test_workflow import make_workflow
+from utils.logging import (
+    get_request_id,
+    logger,
+    payload,
+    request_context,
+    request_scope,
+)
+
+
+class TestLoggingHelpers(unittest.TestCase):
+    """Test cases for correlation IDs, payload capping and lazy formatting."""
+
+    def setUp(self):
+        """Capture log records in memory (synchronously) for each test."""
+        self.records = []
+        self.sink_id = logger.add(
+            lambda message: self.records.append(message.record), level="DEBUG"
+        )
+
+    def tearDown(self):
+        """Remove the capturing sink."""
+        logger.remove(self.sink_id)
+
+    def test_request_id_attached_to_records(self):
+        """Test that records inside a request carry its correlation ID."""
+        with request_context("req-1"):
+            logger.info("inside")
+        logger.info("outside")
+
+        self.assertEqual(self.records[0]["extra"]["request_id"], "req-1")
+        self.assertEqual(self.records[1]["extra"]["request_id"], "-")
+        print("✅ Request ID test passed")
+
+    @patch("utils.logging.settings")
+    def test_payload_capped_when_sampled(self, mock_settings):
+        """Test that sampled payloads are truncated to the size cap."""
+        mock_settings.LOG_PAYLOAD_SAMPLE_RATE = 1.0
+        mock_settings.LOG_PAYLOAD_MAX_CHARS = 10
+        with request_context():
+            text = payload("x" * 25)
+
+        self.assertTrue(text.startswith("x" * 10))
+        self.assertIn("15 more chars", text)
+        print("✅ Payload cap test passed")
+
+    @patch("utils.logging.settings")
+    def test_payload_omitted_when_not_sampled(self, mock_settings):
+        """Test that unsampled requests only log the payload size."""
+        mock_settings.LOG_PAYLOAD_SAMPLE_RATE = 0.0
+        with request_context():
+            text = payload("secret context " * 100)
+
+        self.assertNotIn("secret", text)
+        self.assertIn("1500 chars", text)
+        print("✅ Payload sampling test passed")
+
+    def test_lazy_arguments_skipped_below_level(self):
+        """Test that lazy payloads are not built when the level is disabled."""
+        calls = []
+
+        def build():
+            calls.append(1)
+            return "payload"
+
+        logger.opt(lazy=True).trace("Prompt: {}", build)
+        self.assertEqual(calls, [])
+
+        logger.opt(lazy=True).debug("Prompt: {}", build)
+        self.assertEqual(calls, [1])
+        print("✅ Lazy formatting test passed")
+
+    def test_scope_survives_thread_switches(self):
+        """Test that a request scope keeps its ID when resumed on other threads."""
+        scope = request_scope("req-2")
+        seen = []
+
+        def step():
+            seen.append(scope.run(get_request_id))
+
+        threads = [threading.Thread(target=step) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+            thread.join()
+
+        self.assertEqual(seen, ["req-2"] * 3)
+        self.assertEqual(get_request_id(), "-")
+        print("✅ Request scope test passed")
+
+    def test_workflow_logs_share_request_id(self):
+        """Test that every workflow record of one run has the same ID."""
+        workflow = make_workflow()
+        retriever = MockRetriever(TestData.SAMPLE_DOCUMENTS)
+
+        list(workflow.stream_pipeline("What is Python?", retriever, "req-3"))
+
+        workflow_records = [r for r in self.records if r["name"] == "agents.workflow"]
+        self.assertTrue(workflow_records)
+        self.assertTrue(
+            all(r["extra"]["request_id"] == "req-3" for r in workflow_records)
+        )
+        print("✅ Workflow correlation test passed")
+
+
+def run_logging_tests():
+    """Run all logging tests."""
+    print("\n🧪 Running Logging Integration Tests...\n")
+
+    # Create test suite
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestLoggingHelpers)
+
+    # Run tests
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    # Print summary
+    print("\n📊 Logging Test Results:")
+    print(f"   Tests run: {result.testsRun}")
+    print(f"   Failures: {len(result.failures)}")
+    print(f"   Errors: {len(result.errors)}")
+
+    success = len(result.failures) == 0 and len(result.errors) == 0
+    if success:
+        print("\n🎉 All logging tests passed!")
+    else:
+        print("\n💥 Some logging tests failed!")
+
+    return success
+
+
+if __name__ == "__main__":
+    run_logging_tests()
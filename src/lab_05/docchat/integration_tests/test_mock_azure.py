@@ -0,0 +1,184 @@
+"""
+Integration tests for the offline mock Azure OpenAI server used by benchmarks.
+"""
+
+import json
+import os
+import sys
+import unittest
+import urllib.error
+import urllib.request
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from azure.ai.inference import ChatCompletionsClient
+from azure.ai.inference.models import SystemMessage, UserMessage
+from azure.core.credentials import AzureKeyCredential
+
+from benchmarks.mock_azure import (
+    LatencyModel,
+    MockAzureServer,
+    canned_reply,
+    hashed_embedding,
+)
+
+
+class TestMockAzureHelpers(unittest.TestCase):
+    """Test cases for latency specs, embeddings and canned replies."""
+
+    def test_latency_specs(self):
+        """Test parsing of the supported latency distributions."""
+        self.assertEqual(LatencyModel("0").sample(), 0.0)
+        self.assertEqual(LatencyModel("fixed:0.25").sample(), 0.25)
+        sample = LatencyModel("uniform:0.1:0.2", seed=1).sample()
+        self.assertTrue(0.1 <= sample <= 0.2)
+        self.assertGreater(LatencyModel("lognormal:0.5:0.3", seed=1).sample(), 0)
+        for spec in ("fixed", "uniform:1", "gamma:1:2"):
+            with self.assertRaises(ValueError):
+                LatencyModel(spec)
+        print("✅ Latency spec test passed")
+
+    def test_embeddings_are_deterministic_and_similar(self):
+        """Test that texts sharing words get closer vectors than unrelated ones."""
+        first = hashed_embedding("reinforcement learning improves reasoning", 256)
+        again = hashed_embedding("reinforcement learning improves reasoning", 256)
+        near = hashed_embedding("reinforcement learning for reasoning", 256)
+        far = hashed_embedding("data center energy usage", 256)
+
+        def dot(a, b):
+            return sum(x * y for x, y in zip(a, b))
+
+        self.assertEqual(first, again)
+        self.assertGreater(dot(first, near), dot(first, far))
+        print("✅ Hashed embedding test passed")
+
+    def test_reply_depends_on_agent(self):
+        """Test that each agent's system prompt gets a fitting reply."""
+        relevance = [{"role": "system", "content": "You are a relevance checker."}]
+        verifier = [{"role": "system", "content": "Verify the answer."}]
+        research = [
+            {"role": "system", "content": "You are an AI assistant."},
+            {"role": "user", "content": "**Context:**\nPython is a language."},
+        ]
+
+        self.assertEqual(canned_reply(relevance), "CAN_ANSWER")
+        self.assertIn("Supported: YES", canned_reply(verifier))
+        self.assertIn("Python is a language.", canned_reply(research))
+        single_call = [
+            {"role": "system", "content": "Rate the answer. Reply in JSON."},
+            {"role": "user", "content": "**Context:**\n[1] Python is a language."},
+        ]
+        reply = json.loads(canned_reply(single_call))
+        self.assertEqual(reply["citations"], [1])
+        self.assertIn("Python is a language.", reply["answer"])
+        print("✅ Canned reply test passed")
+
+
+class TestMockAzureServer(unittest.TestCase):
+    """Test cases for the HTTP endpoints, driven through the real SDK client."""
+
+    def setUp(self):
+        """Start a mock server with no latency."""
+        self.server = MockAzureServer().start()
+        self.client = ChatCompletionsClient(
+            endpoint=f"{self.server.url}openai/deployments/mock-chat",
+            credential=AzureKeyCredential("mock-key"),
+            api_version="2024-12-01-preview",
+        )
+        self.messages = [
+            SystemMessage(content="You are an AI assistant."),
+            UserMessage(content="**Context:**\nPython is a programming language."),
+        ]
+
+    def tearDown(self):
+        """Stop the mock server."""
+        self.client.close()
+        self.server.stop()
+
+    def test_chat_completion(self):
+        """Test a non-streaming chat completion with usage."""
+        response = self.client.complete(messages=self.messages, max_tokens=50)
+
+        self.assertIn("Python", response.choices[0].message.content)
+        self.assertGreater(response.usage.prompt_tokens, 0)
+        self.assertEqual(self.server.stats["chat"], 1)
+        print("✅ Chat completion test passed")
+
+    def test_streamed_chat_completion(self):
+        """Test that streamed deltas join up to the full reply."""
+        expected = self.client.complete(messages=self.messages).choices[0]
+        response = self.client.complete(messages=self.messages, stream=True)
+
+        text = "".join(
+            update.choices[0].delta.content or ""
+            for update in response
+            if update.choices
+        )
+
+        self.assertEqual(text.strip(), expected.message.content)
+        print("✅ Streaming test passed")
+
+    def test_embeddings_endpoint(self):
+        """Test an embeddings request returns one vector per input."""
+        request = urllib.request.Request(
+            f"{self.server.url}openai/deployments/mock-embedding/embeddings",
+            data=json.dumps({"input": ["one", "two"]}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request) as resp:
+            body = json.loads(resp.read())
+
+        self.assertEqual(len(body["data"]), 2)
+        self.assertEqual(len(body["data"][0]["embedding"]), 256)
+        print("✅ Embeddings endpoint test passed")
+
+    def test_throttled_request_carries_retry_after(self):
+        """Test that throttled requests get a 429 with retry-after-ms."""
+        self.server.error_rate = 1.0
+        request = urllib.request.Request(
+            f"{self.server.url}openai/deployments/mock-chat/chat/completions",
+            data=json.dumps({"messages": []}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            urllib.request.urlopen(request)
+
+        self.assertEqual(ctx.exception.code, 429)
+        self.assertEqual(ctx.exception.headers["retry-after-ms"], "200")
+        self.assertEqual(self.server.stats["throttled"], 1)
+        print("✅ Throttling test passed")
+
+
+def run_mock_azure_tests():
+    """Run all mock Azure server tests."""
+    print("\n🧪 Running Mock Azure Server Integration Tests...\n")
+
+    # Create test suite
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    for case in (TestMockAzureHelpers, TestMockAzureServer):
+        suite.addTests(loader.loadTestsFromTestCase(case))
+
+    # Run tests
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    # Print summary
+    print("\n📊 Mock Azure Server Test Results:")
+    print(f"   Tests run: {result.testsRun}")
+    print(f"   Failures: {len(result.failures)}")
+    print(f"   Errors: {len(result.errors)}")
+
+    success = len(result.failures) == 0 and len(result.errors) == 0
+    if success:
+        print("\n🎉 All mock Azure server tests passed!")
+    else:
+        print("\n💥 Some mock Azure server tests failed!")
+
+    return success
+
+
+if __name__ == "__main__":
+    run_mock_azure_tests()
@@ -10,12 +10,16 @@ from unittest.mock import MagicMock, patch
 # Add the parent directory to the path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from langchain.schema import Document
+
 from agents.relevance_checker import RelevanceChecker
+from agents.relevance_gate import RelevanceGate, escalation_rate
 from integration_tests.test_utils import (
     MockRetriever,
     TestData,
     check_environment_variables,
 )
+from utils.metrics import RELEVANCE_DECISIONS
 
 
 class TestRelevanceChecker(unittest.TestCase):
@@ -128,12 +132,121 @@ class TestRelevanceChecker(unittest.TestCase):
             print("✅ Response validation test passed")
 
 
+class TestRelevanceGate(unittest.TestCase):
+    """Test cases for the local relevance gate (no LLM needed)."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test fixtures before running tests."""
+        cls.test_data = TestData()
+        cls.documents = [
+            Document(page_content=doc.page_content, metadata={"fused_score": 0.9})
+            for doc in cls.test_data.SAMPLE_DOCUMENTS
+        ]
+
+    def test_clear_cases_decided_locally(self):
+        """Test that covered questions pass and unrelated ones are rejected."""
+        gate = RelevanceGate(mode="scores")
+        questions = self.test_data.TEST_QUESTIONS
+
+        self.assertEqual(
+            gate.decide(questions["azure_openai"], self.documents), "CAN_ANSWER"
+        )
+        self.assertEqual(
+            gate.decide(questions["unrelated"], self.documents), "NO_MATCH"
+        )
+        # Some terms match, others do not: the LLM has to judge
+        self.assertIsNone(
+            gate.decide("How much does Azure OpenAI cost per month?", self.documents)
+        )
+        print("✅ Local decision test passed")
+
+    def test_retrieval_scores_hold_back_decisions(self):
+        """Test that weak fusion agreement or high similarity escalate."""
+        gate = RelevanceGate(mode="scores")
+        weak = [
+            Document(page_content=doc.page_content, metadata={"fused_score": 0.4})
+            for doc in self.documents
+        ]
+        similar = [
+            Document(page_content=doc.page_content, metadata={"vector_score": 0.8})
+            for doc in self.documents
+        ]
+
+        self.assertIsNone(gate.decide(self.test_data.TEST_QUESTIONS["python"], weak))
+        self.assertIsNone(
+            gate.decide(self.test_data.TEST_QUESTIONS["unrelated"], similar)
+        )
+        print("✅ Retrieval score test passed")
+
+    def test_classifier_scores_decide(self):
+        """Test that reranker scores take precedence over term coverage."""
+        gate = RelevanceGate(mode="scores")
+        question = self.test_data.TEST_QUESTIONS["azure_openai"]
+
+        def reranked(logit):
+            return [
+                Document(
+                    page_content=doc.page_content, metadata={"rerank_score": logit}
+                )
+                for doc in self.documents
+            ]
+
+        self.assertEqual(gate.decide(question, reranked(-6.0)), "NO_MATCH")
+        self.assertEqual(gate.decide(question, reranked(4.0)), "CAN_ANSWER")
+        self.assertIsNone(gate.decide(question, reranked(0.0)))
+
+        classifier_gate = RelevanceGate(mode="classifier")
+        classifier_gate.classifier = MagicMock()
+        classifier_gate.classifier.get.return_value.score.return_value = [-6.0, -5.0]
+        self.assertEqual(classifier_gate.decide(question, self.documents), "NO_MATCH")
+        print("✅ Classifier test passed")
+
+    def test_off_and_invalid_modes(self):
+        """Test that mode 'off' always escalates and unknown modes are rejected."""
+        gate = RelevanceGate(mode="off")
+        question = self.test_data.TEST_QUESTIONS["azure_openai"]
+
+        self.assertIsNone(gate.decide(question, self.documents))
+        with self.assertRaises(ValueError):
+            RelevanceGate(mode="sometimes")
+        print("✅ Gate mode test passed")
+
+    @patch("agents.relevance_checker.get_client", lambda agent: (MagicMock(), "mock"))
+    def test_checker_skips_llm_for_local_labels(self):
+        """Test that RelevanceChecker only calls the LLM for escalated questions."""
+        checker = RelevanceChecker(gate=RelevanceGate(mode="scores"))
+        response = MagicMock()
+        response.choices[0].message.content = "PARTIAL"
+        checker.client.complete.return_value = response
+        RELEVANCE_DECISIONS.reset()
+
+        local = checker.check(
+            self.test_data.TEST_QUESTIONS["unrelated"], None, documents=self.documents
+        )
+        self.assertEqual(local, "NO_MATCH")
+        checker.client.complete.assert_not_called()
+
+        escalated = checker.check(
+            "How much does Azure OpenAI cost per month?", None, documents=self.documents
+        )
+        self.assertEqual(escalated, "PARTIAL")
+        checker.client.complete.assert_called_once()
+        self.assertEqual(RELEVANCE_DECISIONS.value(tier="local", label="NO_MATCH"), 1)
+        self.assertEqual(RELEVANCE_DECISIONS.value(tier="llm", label="PARTIAL"), 1)
+        self.assertEqual(escalation_rate(), 0.5)
+        print("✅ Checker escalation test passed")
+
+
 def run_relevance_checker_tests():
     """Run all RelevanceChecker tests."""
     print("\n🧪 Running RelevanceChecker Integration Tests...\n")
 
     # Create test suite
-    suite = unittest.TestLoader().loadTestsFromTestCase(TestRelevanceChecker)
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    for case in (TestRelevanceChecker, TestRelevanceGate):
+        suite.addTests(loader.loadTestsFromTestCase(case))
 
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)
@@ -0,0 +1,176 @@
+"""
+Integration tests for the cross-encoder reranking stage.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.schema import Document
+from langchain_core.runnables import RunnableLambda
+from tokenizers import Tokenizer, models, pre_tokenizers
+
+from integration_tests.test_utils import MockRetriever, TestData
+from retriever.reranker import CrossEncoderReranker, RerankingRetriever
+
+
+class FakeCrossEncoderSession:
+    """Scores a pair by how many of its tokens are known words."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def get_inputs(self):
+        return [
+            SimpleNamespace(name=name)
+            for name in ("input_ids", "attention_mask", "token_type_ids")
+        ]
+
+    def run(self, _outputs, feeds):
+        self.batch_sizes.append(len(feeds["input_ids"]))
+        known = (feeds["input_ids"] > 1).sum(axis=1).astype(np.float32)
+        return [known[:, None]]
+
+
+class TestCrossEncoderReranker(unittest.TestCase):
+    """Test cases for CrossEncoderReranker with a stub ONNX session."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test fixtures before running tests."""
+        cls.test_data = TestData()
+        cls.temp_dir = tempfile.mkdtemp()
+        vocab = {"[PAD]": 0, "[UNK]": 1}
+        for word in "what is machine learning python azure openai".split():
+            vocab[word] = len(vocab)
+        tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+        tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+        cls.tokenizer_path = os.path.join(cls.temp_dir, "tokenizer.json")
+        tokenizer.save(cls.tokenizer_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up after all tests."""
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def setUp(self):
+        """Set up before each test."""
+        self.session = FakeCrossEncoderSession()
+        with patch("retriever.reranker.create_session", return_value=self.session):
+            self.reranker = CrossEncoderReranker(
+                model_path="unused.onnx",
+                tokenizer_path=self.tokenizer_path,
+                batch_size=2,
+                cache_size=3,
+            )
+
+    def test_rerank_orders_by_score(self):
+        """Test that documents come back best first and truncated to top_n."""
+        documents = [
+            Document(page_content="unrelated text"),
+            Document(page_content="machine learning"),
+            Document(page_content="python machine learning azure"),
+        ]
+
+        reranked = self.reranker.rerank("what is machine learning", documents, 2)
+
+        self.assertEqual(
+            [doc.page_content for doc in reranked],
+            ["python machine learning azure", "machine learning"],
+        )
+        self.assertIn("rerank_score", reranked[0].metadata)
+        # The input documents are not mutated
+        self.assertNotIn("rerank_score", documents[0].metadata)
+        print("✅ Rerank ordering test passed")
+
+    def test_inference_is_batched(self):
+        """Test that pairs are scored in batches of at most batch_size."""
+        documents = self.test_data.SAMPLE_DOCUMENTS
+
+        self.reranker.score("machine learning", documents)
+
+        self.assertEqual(sum(self.session.batch_sizes), len(documents))
+        self.assertTrue(all(size <= 2 for size in self.session.batch_sizes))
+        print("✅ Batched inference test passed")
+
+    def test_scores_are_cached(self):
+        """Test that repeated (query, passage) pairs skip inference."""
+        documents = self.test_data.SAMPLE_DOCUMENTS[:2]
+
+        first = self.reranker.score("azure openai", documents)
+        calls = len(self.session.batch_sizes)
+        second = self.reranker.score("azure openai", documents)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.session.batch_sizes), calls)
+        self.assertEqual(self.reranker.cache_hits, 2)
+        print("✅ Score cache test passed")
+
+    def test_cache_is_bounded(self):
+        """Test that the LRU cache never exceeds cache_size entries."""
+        self.reranker.score("python", self.test_data.SAMPLE_DOCUMENTS)
+
+        self.assertEqual(len(self.reranker._cache), 3)
+        print("✅ Bounded cache test passed")
+
+
+class TestRerankingRetriever(unittest.TestCase):
+    """Test cases for RerankingRetriever."""
+
+    def test_keeps_top_n_of_fused_candidates(self):
+        """Test that only the reranker's top_n candidates are returned."""
+        documents = TestData.SAMPLE_DOCUMENTS
+        base = MockRetriever(documents)
+        reranker = SimpleNamespace(
+            rerank=lambda query, docs, top_n: list(reversed(docs))[:top_n]
+        )
+        retriever = RerankingRetriever(
+            base_retriever=RunnableLambda(base.invoke), reranker=reranker, top_n=1
+        )
+
+        results = retriever.invoke("Python programming")
+
+        self.assertEqual(len(results), 1)
+        print("✅ Reranking retriever test passed")
+
+
+def run_reranker_tests():
+    """Run all reranker tests."""
+    print("\n🧪 Running Reranker Integration Tests...\n")
+
+    # Create test suite
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    for case in (TestCrossEncoderReranker, TestRerankingRetriever):
+        suite.addTests(loader.loadTestsFromTestCase(case))
+
+    # Run tests
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    # Print summary
+    print("\n📊 Reranker Test Results:")
+    print(f"   Tests run: {result.testsRun}")
+    print(f"   Failures: {len(result.failures)}")
+    print(f"   Errors: {len(result.errors)}")
+
+    success = len(result.failures) == 0 and len(result.errors) == 0
+    if success:
+        print("\n🎉 All reranker tests passed!")
+    else:
+        print("\n💥 Some reranker tests failed!")
+
+    return success
+
+
+if __name__ == "__main__":
+    run_reranker_tests()
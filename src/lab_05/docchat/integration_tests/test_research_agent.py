@@ -5,12 +5,13 @@ Integration tests for ResearchAgent.
 import os
 import sys
 import unittest
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
 # Add the parent directory to the path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from agents.research_agent import ResearchAgent
+from agents.research_agent import ResearchAgent, citations_hold
 from integration_tests.test_utils import TestData, check_environment_variables
 
 
@@ -203,13 +204,84 @@ class TestResearchAgent(unittest.TestCase):
             self.assertIn("cannot answer", result["draft_answer"].lower())
             print("✅ Response structure error handling test passed")
 
+    def test_generate_streams_tokens(self):
+        """Test that on_token receives every streamed delta in order."""
+        deltas = ["Azure OpenAI ", "provides ", "REST API access."]
+        updates = [
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=d))])
+            for d in deltas
+        ]
+        # Usage-only updates at the end of a stream carry no choices
+        updates.append(SimpleNamespace(choices=[]))
+
+        with patch.object(self.research_agent.client, "complete") as mock_complete:
+            mock_complete.return_value = iter(updates)
+            received = []
+
+            question = self.test_data.TEST_QUESTIONS["azure_openai"]
+            documents = [self.test_data.SAMPLE_DOCUMENTS[0]]
+            result = self.research_agent.generate(
+                question, documents, on_token=received.append
+            )
+
+            self.assertTrue(mock_complete.call_args.kwargs["stream"])
+            self.assertEqual(received, deltas)
+            self.assertEqual(result["draft_answer"], "".join(deltas))
+            print("✅ Token streaming test passed")
+
+
+class TestAssessedAnswer(unittest.TestCase):
+    """Test cases for the single-call reply parsing and citation check."""
+
+    def setUp(self):
+        """Set up an agent without a client; parsing needs none."""
+        self.agent = ResearchAgent.__new__(ResearchAgent)
+        self.documents = TestData.SAMPLE_DOCUMENTS
+
+    def test_parse_json_reply(self):
+        """Test that fenced JSON is parsed and values are normalized."""
+        reply = (
+            '```json\n{"answer": " Python is interpreted. ", "citations": ["4"], '
+            '"supported": "yes", "confidence": 1.7}\n```'
+        )
+
+        result = self.agent.parse_assessed_response(reply)
+
+        self.assertEqual(result["draft_answer"], "Python is interpreted.")
+        self.assertEqual(result["citations"], [4])
+        self.assertEqual(result["supported"], "YES")
+        self.assertEqual(result["confidence"], 1.0)
+        print("✅ Assessed reply parsing test passed")
+
+    def test_malformed_reply_is_unsupported(self):
+        """Test that a non-JSON reply keeps its text and forces verification."""
+        result = self.agent.parse_assessed_response("Python is interpreted.")
+
+        self.assertEqual(result["draft_answer"], "Python is interpreted.")
+        self.assertEqual(result["supported"], "NO")
+        self.assertEqual(result["citations"], [])
+        print("✅ Malformed reply test passed")
+
+    def test_citations_hold(self):
+        """Test the local citation check against the cited chunks."""
+        answer = "Python is an interpreted programming language with dynamic typing."
+
+        self.assertTrue(citations_hold(answer, self.documents, [4]))
+        self.assertFalse(citations_hold(answer, self.documents, [1]))
+        self.assertFalse(citations_hold(answer, self.documents, [9]))
+        self.assertFalse(citations_hold(answer, self.documents, []))
+        print("✅ Citation check test passed")
+
 
 def run_research_agent_tests():
     """Run all ResearchAgent tests."""
     print("\n🧪 Running ResearchAgent Integration Tests...\n")
 
     # Create test suite
-    suite = unittest.TestLoader().loadTestsFromTestCase(TestResearchAgent)
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    for case in (TestResearchAgent, TestAssessedAnswer):
+        suite.addTests(loader.loadTestsFromTestCase(case))
 
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)
@@ -0,0 +1,178 @@
+"""
+Integration tests for the retrieval quality-versus-cost evaluation.
+"""
+
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from langchain.retrievers import EnsembleRetriever
+from langchain_community.retrievers import BM25Retriever
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.mock_azure import hashed_embedding
+from benchmarks.retrieval_eval import (
+    configure_retriever,
+    evaluate,
+    label_questions,
+    normalize,
+    pick_cheapest,
+    recall,
+    reciprocal_rank,
+    split_markdown,
+)
+from retriever.vector_store import ExactIndex, IndexRetriever
+
+MARKDOWN = """# Report
+
+## Training
+
+We pre-train the model on 14.8 trillion tokens. The learning rate warms up
+over the first steps and then decays.
+
+## Hardware
+
+The cluster has 2048 NVIDIA H800 GPUs connected with NVLink and InfiniBand.
+
+## Inference
+
+Redundant experts balance the load across GPUs during decoding.
+"""
+
+EVAL_SET = [
+    ("How many tokens was the model trained on?", ["14.8 trillion"]),
+    ("Which GPUs are in the cluster?", ["2048 NVIDIA H800 GPUs"]),
+    ("What is the model's favourite colour?", ["favourite colour is blue"]),
+]
+
+
+class HashedEmbeddings(Embeddings):
+    """Offline embeddings: texts sharing words get similar vectors."""
+
+    def embed_documents(self, texts):
+        return [hashed_embedding(text, 64) for text in texts]
+
+    def embed_query(self, text):
+        return hashed_embedding(text, 64)
+
+
+def make_hybrid(chunks, k=2):
+    embeddings = HashedEmbeddings()
+    vectors = np.asarray(
+        embeddings.embed_documents([c.page_content for c in chunks]), dtype=np.float32
+    )
+    bm25 = BM25Retriever.from_documents(chunks)
+    bm25.k = k
+    vector = IndexRetriever(
+        index=ExactIndex(vectors), embeddings=embeddings, documents=chunks, k=k
+    )
+    return EnsembleRetriever(retrievers=[bm25, vector], weights=[0.4, 0.6])
+
+
+class TestRetrievalEval(unittest.TestCase):
+    """Test cases for labeling, metrics and the configuration sweep."""
+
+    def test_normalize_ignores_ligatures_and_punctuation(self):
+        """Test that evidence matching survives PDF conversion artefacts."""
+        self.assertEqual(normalize("Efﬁcient  Cost: $5.576M"), "efficient cost 5 576m")
+        print("✅ Normalization test passed")
+
+    def test_chunkers(self):
+        """Test the header split and the size-bounded recursive split."""
+        sections = split_markdown(MARKDOWN, "markdown")
+        small = split_markdown(MARKDOWN, "recursive:60")
+
+        self.assertEqual(len(sections), 3)
+        self.assertGreater(len(small), len(sections))
+        self.assertTrue(all(len(c.page_content) <= 60 for c in small))
+        with self.assertRaises(ValueError):
+            split_markdown(MARKDOWN, "semantic")
+        print("✅ Chunker test passed")
+
+    def test_labels_follow_the_chunker(self):
+        """Test that evidence phrases resolve to relevant chunks per chunker."""
+        chunks = split_markdown(MARKDOWN, "markdown")
+
+        labeled = label_questions(chunks, EVAL_SET)
+
+        self.assertEqual(
+            labeled,
+            [
+                ("How many tokens was the model trained on?", {0}),
+                ("Which GPUs are in the cluster?", {1}),
+            ],
+        )
+        print("✅ Labeling test passed")
+
+    def test_ranking_metrics(self):
+        """Test recall and reciprocal rank of a ranked result list."""
+        self.assertEqual(recall({1, 2}, [0, 2, 5]), 0.5)
+        self.assertEqual(reciprocal_rank({1, 2}, [0, 2, 5]), 0.5)
+        self.assertEqual(reciprocal_rank({9}, [0, 2, 5]), 0.0)
+        print("✅ Ranking metrics test passed")
+
+    def test_configure_and_evaluate(self):
+        """Test that k and weights change a built retriever in place."""
+        chunks = split_markdown(MARKDOWN, "markdown")
+        labeled = label_questions(chunks, EVAL_SET)
+        hybrid = make_hybrid(chunks, k=3)
+
+        configure_retriever(hybrid, 1, [0.9, 0.1])
+        narrow = evaluate(hybrid, labeled, chunks, lambda text: len(text.split()))
+        configure_retriever(hybrid, 3, [0.5, 0.5])
+        wide = evaluate(hybrid, labeled, chunks, lambda text: len(text.split()))
+
+        self.assertEqual(hybrid.weights, [0.5, 0.5])
+        self.assertLessEqual(narrow["docs"], 2)
+        self.assertEqual(wide["docs"], 3)
+        self.assertEqual(wide["recall"], 1.0)
+        self.assertGreater(wide["context_tokens"], narrow["context_tokens"])
+        for key in ("mrr", "p50_ms", "p95_ms"):
+            self.assertIn(key, wide)
+        print("✅ Configure and evaluate test passed")
+
+    def test_pick_cheapest_keeps_recall(self):
+        """Test that the cheapest pick never trades away more recall than allowed."""
+        results = [
+            {"recall": 0.95, "context_tokens": 4000, "p50_ms": 5},
+            {"recall": 0.94, "context_tokens": 1500, "p50_ms": 5},
+            {"recall": 0.80, "context_tokens": 500, "p50_ms": 5},
+        ]
+
+        self.assertEqual(pick_cheapest(results, 0.02)["context_tokens"], 1500)
+        self.assertEqual(pick_cheapest(results, 0.0)["context_tokens"], 4000)
+        print("✅ Cheapest configuration test passed")
+
+
+def run_retrieval_eval_tests():
+    """Run all retrieval evaluation tests."""
+    print("\n🧪 Running Retrieval Evaluation Integration Tests...\n")
+
+    # Create test suite
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestRetrievalEval)
+
+    # Run tests
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    # Print summary
+    print("\n📊 Retrieval Evaluation Test Results:")
+    print(f"   Tests run: {result.testsRun}")
+    print(f"   Failures: {len(result.failures)}")
+    print(f"   Errors: {len(result.errors)}")
+
+    success = len(result.failures) == 0 and len(result.errors) == 0
+    if success:
+        print("\n🎉 All retrieval evaluation tests passed!")
+    else:
+        print("\n💥 Some retrieval evaluation tests failed!")
+
+    return success
+
+
+if __name__ == "__main__":
+    run_retrieval_eval_tests()
@@ -17,6 +17,7 @@ from langchain.schema import Document
 
 from integration_tests.test_utils import TestData, check_environment_variables
 from retriever.builder import RetrieverBuilder
+from retriever.embedding_scheduler import EmbeddingScheduler
 
 
 class TestRetrieverBuilder(unittest.TestCase):
@@ -41,6 +42,10 @@ class TestRetrieverBuilder(unittest.TestCase):
         self.mock_settings.CHROMA_DB_PATH = self.temp_dir
         self.mock_settings.VECTOR_SEARCH_K = 5
         self.mock_settings.HYBRID_RETRIEVER_WEIGHTS = [0.4, 0.6]
+        self.mock_settings.RERANKER_ENABLED = False
+        self.mock_settings.CHROMA_COLLECTION_NAME = "documents"
+        self.mock_settings.CHROMA_COLLECTION_TTL_HOURS = 24
+        self.mock_settings.CHROMA_GC_INTERVAL_SECONDS = 600
         self.addCleanup(patcher.stop)
 
         # Initialize builder
@@ -64,10 +69,14 @@ class TestRetrieverBuilder(unittest.TestCase):
         # Check that embeddings instance is created
         self.assertIsNotNone(embeddings)
 
+        # The Azure client is wrapped by the EmbeddingScheduler
+        self.assertIsInstance(embeddings, EmbeddingScheduler)
+        azure_embeddings = embeddings.embeddings
+
         # Check configuration attributes (these may vary based on langchain version)
         self.assertTrue(
-            hasattr(embeddings, "azure_endpoint")
-            or hasattr(embeddings, "openai_api_base")
+            hasattr(azure_embeddings, "azure_endpoint")
+            or hasattr(azure_embeddings, "openai_api_base")
         )
 
         print("✅ Embeddings configuration test passed")
@@ -231,6 +240,10 @@ class TestRetrieverBuilder(unittest.TestCase):
                 mock_settings.CHROMA_DB_PATH = self.temp_dir
                 mock_settings.VECTOR_SEARCH_K = k
                 mock_settings.HYBRID_RETRIEVER_WEIGHTS = [0.4, 0.6]
+                mock_settings.RERANKER_ENABLED = False
+                mock_settings.CHROMA_COLLECTION_NAME = "documents"
+                mock_settings.CHROMA_COLLECTION_TTL_HOURS = 24
+                mock_settings.CHROMA_GC_INTERVAL_SECONDS = 600
 
                 from langchain_core.runnables import RunnableLambda
 
@@ -272,6 +285,10 @@ class TestRetrieverBuilder(unittest.TestCase):
                 mock_settings.CHROMA_DB_PATH = self.temp_dir
                 mock_settings.VECTOR_SEARCH_K = 5
                 mock_settings.HYBRID_RETRIEVER_WEIGHTS = weights
+                mock_settings.RERANKER_ENABLED = False
+                mock_settings.CHROMA_COLLECTION_NAME = "documents"
+                mock_settings.CHROMA_COLLECTION_TTL_HOURS = 24
+                mock_settings.CHROMA_GC_INTERVAL_SECONDS = 600
 
                 from langchain_core.runnables import RunnableLambda
 
@@ -329,7 +346,7 @@ class TestRetrieverBuilder(unittest.TestCase):
         print("✅ Embedding error handling test passed")
 
     def test_chroma_persistence(self):
-        """Test that Chroma vector store persists correctly."""
+        """Test that the corpus collection is reused on a second build."""
         documents = self.test_data.SAMPLE_DOCUMENTS
 
         # Mock both Chroma and BM25Retriever to test persistence logic
@@ -345,6 +362,11 @@ class TestRetrieverBuilder(unittest.TestCase):
             mock_vector_store.as_retriever.return_value = mock_vector_retriever
             mock_chroma.from_documents.return_value = mock_vector_store
 
+            # The collection is empty on the first build and complete afterwards
+            existing_store = mock_chroma.return_value
+            existing_store._collection.count.side_effect = [0, len(documents)]
+            existing_store.as_retriever.return_value = mock_vector_retriever
+
             # Mock BM25 retriever
             mock_bm25_retriever = RunnableLambda(lambda x: documents[:2])
             mock_bm25.from_documents.return_value = mock_bm25_retriever
@@ -360,11 +382,47 @@ class TestRetrieverBuilder(unittest.TestCase):
             # Results should be similar (though order might differ)
             self.assertEqual(len(results1), len(results2))
 
-            # Verify that Chroma.from_documents was called twice
-            self.assertEqual(mock_chroma.from_documents.call_count, 2)
+            # Documents are only embedded once; both builds use the same collection
+            self.assertEqual(mock_chroma.from_documents.call_count, 1)
+            names = {c.kwargs["collection_name"] for c in mock_chroma.call_args_list}
+            self.assertEqual(len(names), 1)
 
         print("✅ Chroma persistence test passed")
 
+    def test_collections_are_per_corpus(self):
+        """Test that different corpora are indexed in different collections."""
+        documents = self.test_data.SAMPLE_DOCUMENTS
+
+        with (
+            patch("retriever.builder.Chroma") as mock_chroma,
+            patch("retriever.builder.BM25Retriever") as mock_bm25,
+        ):
+            from langchain_core.runnables import RunnableLambda
+
+            mock_vector_store = MagicMock()
+            mock_vector_store.as_retriever.return_value = RunnableLambda(
+                lambda x: documents[:1]
+            )
+            mock_chroma.from_documents.return_value = mock_vector_store
+            mock_chroma.return_value._collection.count.return_value = 0
+            mock_bm25.from_documents.return_value = RunnableLambda(
+                lambda x: documents[:1]
+            )
+
+            self.builder.build_hybrid_retriever(documents[:2])
+            self.builder.build_hybrid_retriever(documents[2:])
+            # Same chunks in another order form the same corpus
+            self.builder.build_hybrid_retriever(list(reversed(documents[:2])))
+
+            names = [
+                c.kwargs["collection_name"]
+                for c in mock_chroma.from_documents.call_args_list
+            ]
+            self.assertNotEqual(names[0], names[1])
+            self.assertEqual(names[0], names[2])
+
+        print("✅ Per-corpus collection test passed")
+
     def test_retriever_performance(self):
         """Test retriever performance with multiple queries."""
         documents = self.test_data.SAMPLE_DOCUMENTS
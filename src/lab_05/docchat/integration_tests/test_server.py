@@ -0,0 +1,599 @@
+"""
+Integration tests for the HTTP service and the shared corpus index.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import settings
+from document_processor.file_handler import DocumentProcessor
+from integration_tests.test_utils import MockRetriever, TestData
+from integration_tests.test_workflow import make_workflow
+from retriever.corpus_index import CorpusIndex
+from retriever.ingest_queue import IngestQueue
+from server.api import create_app
+from server.limits import ConcurrencyLimitMiddleware
+from utils.scheduler import Busy, FairScheduler
+
+
+class FakeProcessor:
+    """Document processor returning the sample documents for any file."""
+
+    def __init__(self, gate=None, gated_suffix=".md"):
+        self.calls = 0
+        self.gate = gate
+        self.gated_suffix = gated_suffix
+
+    def process(self, files):
+        self.calls += 1
+        if self.gate is not None and any(
+            f.name.endswith(self.gated_suffix) for f in files
+        ):
+            self.gate.wait(5)
+        return list(TestData.SAMPLE_DOCUMENTS)
+
+
+class FakeBuilder:
+    """Retriever builder counting builds; slow enough to overlap requests."""
+
+    def __init__(self, failures=()):
+        self.builds = 0
+        self.failures = list(failures)
+
+    def build_hybrid_retriever(self, chunks):
+        self.builds += 1
+        time.sleep(0.05)
+        if self.failures:
+            raise self.failures.pop(0)
+        return MockRetriever(chunks)
+
+
+def make_index(root_dir, max_cached=8, processor=None, builder=None):
+    processor = processor or FakeProcessor()
+    builder = builder or FakeBuilder()
+    index = CorpusIndex(
+        root_dir,
+        processor_factory=lambda: processor,
+        builder_factory=lambda: builder,
+        max_cached=max_cached,
+    )
+    return index, processor, builder
+
+
+class TestCorpusIndex(unittest.TestCase):
+    """Test cases for CorpusIndex."""
+
+    def setUp(self):
+        """Set up before each test."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_corpus_id_is_stable(self):
+        """Test that the same files give the same ID in any order."""
+        index, _, _ = make_index(self.tmp.name)
+
+        first = index.add_files([("a.txt", b"alpha"), ("b.txt", b"beta")])
+        second = index.add_files([("b.txt", b"beta"), ("a.txt", b"alpha")])
+        other = index.add_files([("a.txt", b"alpha")])
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(len(index.files(first)), 2)
+        self.assertFalse(index.exists("../etc"))
+        print("✅ Stable corpus ID test passed")
+
+    def test_concurrent_requests_build_once(self):
+        """Test that concurrent lookups of a new corpus share one build."""
+        index, _, builder = make_index(self.tmp.name)
+        corpus_id = index.add_files([("a.txt", b"alpha")])
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(index.get_retriever(corpus_id))
+            )
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(builder.builds, 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        print("✅ Single build test passed")
+
+    def test_lru_eviction_and_other_process(self):
+        """Test that evicted corpora rebuild and another index resolves IDs."""
+        index, _, builder = make_index(self.tmp.name, max_cached=1)
+        first = index.ingest([("a.txt", b"alpha")])
+        index.ingest([("b.txt", b"beta")])
+        index.get_retriever(first)
+        self.assertEqual(builder.builds, 3)
+
+        # A second worker process sees the corpus through the manifests only
+        other, _, other_builder = make_index(self.tmp.name)
+        self.assertTrue(other.exists(first))
+        self.assertIsNotNone(other.get_retriever(first))
+        self.assertEqual(other_builder.builds, 1)
+        print("✅ Eviction and shared manifest test passed")
+
+
+class TestIngestQueue(unittest.TestCase):
+    """Test cases for the background ingestion queue."""
+
+    def setUp(self):
+        """Set up before each test."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.gate = threading.Event()
+        self.processor = FakeProcessor(gate=self.gate)
+        self.builder = FakeBuilder()
+        self.index, _, _ = make_index(
+            self.tmp.name, processor=self.processor, builder=self.builder
+        )
+
+    def make_queue(self, **kwargs):
+        options = {"workers": 2, "retry_backoff": 0, "poll_interval": 0.02}
+        options.update(kwargs)
+        queue = IngestQueue(self.index, **options)
+        self.addCleanup(queue.stop)
+        return queue
+
+    def test_job_reports_progress(self):
+        """Test that a job moves through conversion and indexing to done."""
+        queue = self.make_queue()
+        queue.start()
+
+        job = queue.submit([("a.txt", b"alpha"), ("slow.md", b"slow")])
+        for update in queue.subscribe(job["id"], 5):
+            if update["message"] == "Converting slow.md":
+                break
+        again = queue.submit([("slow.md", b"slow"), ("a.txt", b"alpha")])
+        self.gate.set()
+        done = queue.wait(job["id"], 5)
+
+        self.assertAlmostEqual(update["progress"], 1 / 3)
+        self.assertEqual((done["status"], done["progress"]), ("done", 1.0))
+        self.assertEqual(again["id"], job["id"])
+        self.assertEqual(self.builder.builds, 1)
+        print("✅ Job progress test passed")
+
+    def test_retries_then_fails(self):
+        """Test that transient errors retry and unusable documents fail at once."""
+        queue = self.make_queue(max_attempts=3)
+        queue.start()
+
+        self.builder.failures = [RuntimeError("Rate limited")]
+        retried = queue.wait(queue.submit([("a.txt", b"alpha")])["id"], 5)
+        self.builder.failures = [ValueError("No content")]
+        failed = queue.wait(queue.submit([("b.txt", b"beta")])["id"], 5)
+
+        self.assertEqual((retried["status"], retried["attempts"]), ("done", 2))
+        self.assertEqual((failed["status"], failed["attempts"]), ("failed", 1))
+        self.assertEqual(failed["error"], "No content")
+        print("✅ Retry test passed")
+
+    def test_cancel_queued_and_running(self):
+        """Test that queued jobs never run and running ones stop at a step."""
+        queue = self.make_queue(workers=1)
+        queued = queue.submit([("a.txt", b"alpha")])
+        self.assertEqual(queue.cancel(queued["id"])["status"], "cancelled")
+
+        queue.start()
+        running = queue.submit([("slow.md", b"slow")])
+        for update in queue.subscribe(running["id"], 5):
+            if update["message"].startswith("Converting"):
+                break
+        queue.cancel(running["id"])
+        self.gate.set()
+
+        self.assertEqual(queue.wait(running["id"], 5)["status"], "cancelled")
+        self.assertEqual(self.builder.builds, 0)
+        print("✅ Cancellation test passed")
+
+    def test_questions_wait_only_on_their_corpus(self):
+        """Test that a slow corpus does not hold up another corpus."""
+        queue = self.make_queue()
+        queue.start()
+
+        slow = queue.submit([("slow.md", b"slow")])
+        fast = queue.submit([("fast.txt", b"fast")])
+
+        ready = queue.wait_for_corpus(fast["corpus_id"], 5)
+        self.assertEqual(ready["status"], "done")
+        self.assertEqual(queue.get(slow["id"])["status"], "running")
+        self.gate.set()
+        self.assertEqual(queue.wait_for_corpus(slow["corpus_id"], 5)["status"], "done")
+        print("✅ Per-corpus waiting test passed")
+
+    def test_sessions_share_the_workers(self):
+        """Test that one session's backlog does not hold up another session."""
+        queue = self.make_queue(workers=2, session_concurrency=1)
+        heavy = [
+            queue.submit([(f"slow{i}.md", f"slow {i}".encode())], session="heavy")
+            for i in range(3)
+        ]
+        light = queue.submit([("fast.txt", b"fast")], session="light")
+        queue.start()
+
+        self.assertEqual(queue.wait(light["id"], 5)["status"], "done")
+        statuses = [queue.get(job["id"])["status"] for job in heavy]
+        self.assertEqual(statuses, ["running", "queued", "queued"])
+        self.gate.set()
+        for job in heavy:
+            self.assertEqual(queue.wait(job["id"], 5)["status"], "done")
+        print("✅ Fair ingestion test passed")
+
+    def test_full_queue_turns_uploads_away(self):
+        """Test Busy beyond the global and per-session queued-job limits."""
+        queue = self.make_queue(max_queued=2, session_max_queued=1)
+        first = queue.submit([("a.txt", b"alpha")], session="a")
+        with self.assertRaises(Busy):
+            queue.submit([("b.txt", b"beta")], session="a")
+        queue.submit([("c.txt", b"gamma")], session="c")
+        with self.assertRaises(Busy):
+            queue.submit([("d.txt", b"delta")], session="d")
+
+        # Files already queued are never turned away
+        again = queue.submit([("a.txt", b"alpha")], session="a")
+        self.assertEqual(again["id"], first["id"])
+        print("✅ Ingestion load shedding test passed")
+
+    def test_heartbeat_keeps_long_conversion(self):
+        """Test that a job converting past its lease is not claimed again."""
+        queue = self.make_queue(workers=1, lease_seconds=0.3)
+        other = self.make_queue(workers=1, lease_seconds=0.3)
+        queue.start()
+        job = queue.submit([("slow.md", b"slow")])
+        for update in queue.subscribe(job["id"], 5):
+            if update["message"].startswith("Converting"):
+                break
+
+        # No progress for twice the lease, only heartbeats
+        time.sleep(0.6)
+        self.assertIsNone(other._claim())
+        self.gate.set()
+        done = queue.wait(job["id"], 5)
+        self.assertEqual((done["status"], done["attempts"]), ("done", 1))
+        self.assertEqual(self.builder.builds, 1)
+        print("✅ Lease heartbeat test passed")
+
+    def test_lost_job_is_reclaimed(self):
+        """Test that a running job without heartbeats is claimed again."""
+        queue = self.make_queue(workers=1, lease_seconds=0.3)
+        job = queue.submit([("a.txt", b"alpha")])
+        # Claimed by a process that died before its first heartbeat
+        self.assertEqual(queue._claim()["id"], job["id"])
+        self.assertIsNone(queue._claim())
+        time.sleep(0.4)
+        self.assertEqual(queue._claim()["attempts"], 2)
+        print("✅ Lost job reclaim test passed")
+
+
+class SlowConverter:
+    """Stand-in for Docling's DocumentConverter recording overlapping calls."""
+
+    created = 0
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def __init__(self):
+        with SlowConverter.lock:
+            SlowConverter.created += 1
+
+    def convert(self, path):
+        with SlowConverter.lock:
+            SlowConverter.active += 1
+            SlowConverter.peak = max(SlowConverter.peak, SlowConverter.active)
+        time.sleep(0.1)
+        with SlowConverter.lock:
+            SlowConverter.active -= 1
+        return types.SimpleNamespace(
+            document=types.SimpleNamespace(export_to_markdown=lambda: "# Title\ntext")
+        )
+
+
+class TestDocumentConversion(unittest.TestCase):
+    """Test cases for converter use by concurrent ingestion workers."""
+
+    def setUp(self):
+        """Set up before each test."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        SlowConverter.created = SlowConverter.peak = 0
+        module = types.ModuleType("docling.document_converter")
+        module.DocumentConverter = SlowConverter
+        for patcher in (
+            patch.dict(sys.modules, {"docling.document_converter": module}),
+            patch.object(settings, "INGEST_WORKERS", 2),
+            patch.object(settings, "CACHE_DIR", self.tmp.name),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_workers_convert_in_parallel(self):
+        """Test that workers convert at once, with one converter per worker."""
+        processor = DocumentProcessor()
+        paths = []
+        for i in range(4):
+            path = os.path.join(self.tmp.name, f"doc{i}.md")
+            with open(path, "w") as f:
+                f.write(f"document {i}")
+            paths.append(path)
+
+        threads = [
+            threading.Thread(
+                target=processor.process, args=([types.SimpleNamespace(name=p)],)
+            )
+            for p in paths
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(SlowConverter.peak, 2)
+        self.assertEqual(SlowConverter.created, 2)
+        print("✅ Parallel conversion test passed")
+
+
+class TestServerAPI(unittest.TestCase):
+    """Test cases for the FastAPI endpoints."""
+
+    def setUp(self):
+        """Set up before each test."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.builder = FakeBuilder()
+        self.index, _, _ = make_index(self.tmp.name, builder=self.builder)
+        self.queue = IngestQueue(
+            self.index, workers=1, retry_backoff=0, poll_interval=0.02
+        )
+        self.workflow = make_workflow()
+        self.workflow.verifier.check.side_effect = lambda *args, **kwargs: {
+            "verification_report": "Supported: YES"
+        }
+        self.client = TestClient(create_app(self.index, self.workflow, self.queue))
+        self.client.__enter__()
+        self.addCleanup(self.client.__exit__, None, None, None)
+
+    def ingest(self, content=b"Python notes"):
+        response = self.client.post(
+            "/corpora", files=[("files", ("notes.txt", content, "text/plain"))]
+        )
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def test_ingest_and_query(self):
+        """Test that a question waits for its corpus and is answered by ID."""
+        corpus_id = self.ingest()["corpus_id"]
+        self.assertEqual(corpus_id, self.ingest()["corpus_id"])
+
+        response = self.client.post(
+            f"/corpora/{corpus_id}/query",
+            json={"question": "What is Python?"},
+            headers={"X-Request-ID": "req-123"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["draft_answer"], "Python is a programming language.")
+        self.assertEqual(body["verification_report"], "Supported: YES")
+        self.assertEqual(body["request_id"], "req-123")
+        self.assertEqual(self.builder.builds, 1)
+        print("✅ Ingest and query test passed")
+
+    def test_job_status_and_events(self):
+        """Test that ingestion jobs can be polled, followed and cancelled."""
+        job = self.ingest()["job"]
+
+        with self.client.stream("GET", f"/jobs/{job['id']}/events") as response:
+            events = [
+                json.loads(line[len("data: ") :])
+                for line in response.iter_lines()
+                if line.startswith("data: ")
+            ]
+        status = self.client.get(f"/jobs/{job['id']}")
+        unknown = self.client.delete("/jobs/0123456789abcdef")
+
+        self.assertEqual(events[-1]["status"], "done")
+        self.assertEqual(status.json()["progress"], 1.0)
+        self.assertEqual(unknown.status_code, 404)
+        print("✅ Job status endpoints test passed")
+
+    def test_failed_corpus_is_not_queried(self):
+        """Test that questions on a corpus whose ingestion failed get 409."""
+        self.builder.failures = [ValueError("No content")]
+        corpus_id = self.ingest(b"Empty notes")["corpus_id"]
+
+        response = self.client.post(
+            f"/corpora/{corpus_id}/query", json={"question": "What is Python?"}
+        )
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["detail"]["job"]["status"], "failed")
+        print("✅ Failed corpus test passed")
+
+    def test_rejects_bad_requests(self):
+        """Test that unknown corpora, bad types and empty questions are refused."""
+        bad_type = self.client.post(
+            "/corpora", files=[("files", ("tool.exe", b"MZ", "application/x-binary"))]
+        )
+        unknown = self.client.post(
+            "/corpora/0123456789abcdef/query", json={"question": "What is Python?"}
+        )
+        corpus_id = self.ingest()["corpus_id"]
+        empty = self.client.post(f"/corpora/{corpus_id}/query", json={"question": ""})
+
+        self.assertEqual(bad_type.status_code, 400)
+        self.assertEqual(unknown.status_code, 404)
+        self.assertEqual(empty.status_code, 422)
+        print("✅ Bad request test passed")
+
+    def test_stream_query_sends_events(self):
+        """Test that the streaming endpoint sends tokens and a final event."""
+        corpus_id = self.ingest()["corpus_id"]
+
+        with self.client.stream(
+            "POST",
+            f"/corpora/{corpus_id}/query/stream",
+            json={"question": "What is Python?"},
+        ) as response:
+            self.assertEqual(response.status_code, 200)
+            events = [
+                json.loads(line[len("data: ") :])
+                for line in response.iter_lines()
+                if line.startswith("data: ")
+            ]
+
+        types = [event["type"] for event in events]
+        self.assertIn("token", types)
+        self.assertEqual(types[-1], "final")
+        self.assertNotIn("update", events[0])
+        print("✅ Streaming endpoint test passed")
+
+    def test_busy_requests_get_503(self):
+        """Test 503 with Retry-After when questions or uploads are turned away."""
+        corpus_id = self.ingest()["corpus_id"]
+        self.workflow.scheduler = FairScheduler(
+            "pipeline",
+            max_concurrency=1,
+            session_concurrency=1,
+            max_queued=0,
+            session_max_queued=0,
+            queue_timeout=2,
+        )
+        holder = self.workflow.scheduler.admit("other")
+        self.queue.max_queued = 0
+
+        query = self.client.post(
+            f"/corpora/{corpus_id}/query", json={"question": "What is Python?"}
+        )
+        stream = self.client.post(
+            f"/corpora/{corpus_id}/query/stream",
+            json={"question": "What is Python?"},
+            headers={"X-Session-ID": "tab-1"},
+        )
+        upload = self.client.post(
+            "/corpora", files=[("files", ("new.txt", b"New notes", "text/plain"))]
+        )
+        holder.release()
+
+        self.assertEqual(
+            [query.status_code, stream.status_code, upload.status_code],
+            [503, 503, 503],
+        )
+        self.assertEqual(query.headers["Retry-After"], "2")
+        self.assertIn("busy", query.json()["detail"])
+        print("✅ Busy response test passed")
+
+    def test_batch_returns_lines_in_order(self):
+        """Test that the batch endpoint returns one JSON line per question."""
+        corpus_id = self.ingest()["corpus_id"]
+        questions = ["What is Python?", "What is Azure?", "What is LangChain?"]
+
+        response = self.client.post(
+            f"/corpora/{corpus_id}/batch",
+            json={"questions": questions, "max_concurrency": 2},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in response.text.splitlines() if line]
+        self.assertEqual([line["question"] for line in lines], questions)
+        self.assertTrue(all(line["error"] is None for line in lines))
+        print("✅ Batch endpoint test passed")
+
+
+class TestConcurrencyLimit(unittest.TestCase):
+    """Test cases for ConcurrencyLimitMiddleware."""
+
+    def test_sheds_requests_beyond_limit(self):
+        """Test that a request waiting longer than the timeout gets 503."""
+
+        async def slow(request):
+            await asyncio.sleep(0.5)
+            return JSONResponse({"ok": True})
+
+        app = Starlette(routes=[Route("/slow", slow), Route("/health", slow)])
+        app.add_middleware(
+            ConcurrencyLimitMiddleware,
+            limit=1,
+            timeout=0.1,
+            exempt_prefixes=("/health",),
+        )
+
+        statuses = []
+        with TestClient(app) as client:
+            threads = [
+                threading.Thread(
+                    target=lambda: statuses.append(client.get("/slow").status_code)
+                )
+                for _ in range(2)
+            ]
+            for thread in threads:
+                thread.start()
+                time.sleep(0.05)
+            exempt = client.get("/health")
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sorted(statuses), [200, 503])
+        self.assertEqual(exempt.status_code, 200)
+        print("✅ Load shedding test passed")
+
+
+def run_server_tests():
+    """Run all HTTP service tests."""
+    print("\n🧪 Running HTTP Service Integration Tests...\n")
+
+    # Create test suite
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    for case in (
+        TestCorpusIndex,
+        TestIngestQueue,
+        TestDocumentConversion,
+        TestServerAPI,
+        TestConcurrencyLimit,
+    ):
+        suite.addTests(loader.loadTestsFromTestCase(case))
+
+    # Run tests
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    # Print summary
+    print("\n📊 HTTP Service Test Results:")
+    print(f"   Tests run: {result.testsRun}")
+    print(f"   Failures: {len(result.failures)}")
+    print(f"   Errors: {len(result.errors)}")
+
+    success = len(result.failures) == 0 and len(result.errors) == 0
+    if success:
+        print("\n🎉 All HTTP service tests passed!")
+    else:
+        print("\n💥 Some HTTP service tests failed!")
+
+    return success
+
+
+if __name__ == "__main__":
+    run_server_tests()
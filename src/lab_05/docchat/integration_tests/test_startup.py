@@ -0,0 +1,127 @@
+"""
+Integration tests for lazy initialization and the startup benchmark.
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.startup import heavy_packages, measure, parse_importtime
+from utils.lazy import Lazy
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        420 | io
+import time:      2500 |       2500 |     chromadb.api
+import time:      1000 |       3500 |   chromadb
+import time:       700 |       4200 | retriever.builder
+"""
+
+
+class TestLazy(unittest.TestCase):
+    """Test cases for Lazy."""
+
+    def test_builds_once_across_threads(self):
+        """Test that concurrent first uses share a single construction."""
+        calls = []
+
+        def factory():
+            calls.append(1)
+            time.sleep(0.05)
+            return object()
+
+        lazy = Lazy(factory, "test object")
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(lazy.get()))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertTrue(lazy.ready)
+        print("✅ Single construction test passed")
+
+    def test_prewarm_runs_in_background(self):
+        """Test that pre-warming builds the object and swallows failures."""
+        lazy = Lazy(lambda: "ready", "test object")
+        failing = Lazy(lambda: 1 / 0, "failing object")
+
+        lazy.prewarm().join(5)
+        failing.prewarm().join(5)
+
+        self.assertTrue(lazy.ready)
+        self.assertFalse(failing.ready)
+        print("✅ Pre-warm test passed")
+
+
+class TestStartupBenchmark(unittest.TestCase):
+    """Test cases for benchmarks.startup."""
+
+    def test_parse_importtime(self):
+        """Test that import time lines keep name, depth and timings."""
+        entries = parse_importtime(IMPORTTIME_OUTPUT)
+
+        self.assertEqual(len(entries), 5)
+        self.assertEqual(entries[2]["name"], "chromadb.api")
+        self.assertEqual(entries[2]["depth"], 2)
+        self.assertEqual(entries[4]["cumulative_us"], 4200)
+        self.assertEqual(heavy_packages([e["name"] for e in entries]), ["chromadb"])
+        print("✅ Import time parsing test passed")
+
+    def test_light_modules_skip_heavy_packages(self):
+        """Test that queue and document modules import without heavy packages."""
+        for module in ("retriever.ingest_queue", "document_processor.file_handler"):
+            result = measure(module, runs=1, top=3)
+
+            self.assertNotIn("error", result, module)
+            self.assertNotIn("docling", result["heavy_packages"])
+            self.assertNotIn("chromadb", result["heavy_packages"])
+            self.assertGreater(result["max_rss_mb"], 0)
+            self.assertEqual(len(result["slowest_imports"]), 3)
+
+        missing = measure("no_such_module", runs=1)
+        self.assertIn("ModuleNotFoundError", missing["error"])
+        print("✅ Lazy import test passed")
+
+
+def run_startup_tests():
+    """Run all startup tests."""
+    print("\n🧪 Running Startup Integration Tests...\n")
+
+    # Create test suite
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    for case in (TestLazy, TestStartupBenchmark):
+        suite.addTests(loader.loadTestsFromTestCase(case))
+
+    # Run tests
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    # Print summary
+    print("\n📊 Startup Test Results:")
+    print(f"   Tests run: {result.testsRun}")
+    print(f"   Failures: {len(result.failures)}")
+    print(f"   Errors: {len(result.errors)}")
+
+    success = len(result.failures) == 0 and len(result.errors) == 0
+    if success:
+        print("\n🎉 All startup tests passed!")
+    else:
+        print("\n💥 Some startup tests failed!")
+
+    return success
+
+
+if __name__ == "__main__":
+    run_startup_tests()
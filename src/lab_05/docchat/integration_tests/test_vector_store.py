@@ -0,0 +1,253 @@
+"""
+Integration tests for the in-memory vector backends and backend selection.
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.retrievers import EnsembleRetriever
+from langchain_community.retrievers import BM25Retriever
+from langchain_core.embeddings import Embeddings
+
+from config.settings import settings
+from integration_tests.test_utils import TestData
+from retriever.batch_retrieval import batch_retrieve
+from retriever.fusion import ScoredEnsembleRetriever
+from retriever.vector_store import (
+    ExactIndex,
+    HnswIndex,
+    build_index_retriever,
+    select_backend,
+)
+
+
+class KeywordEmbeddings(Embeddings):
+    """Bag-of-keywords embeddings, enough to make nearest neighbours meaningful."""
+
+    KEYWORDS = ["azure", "embedding", "learning", "python", "model", "data"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        text = text.lower()
+        return [float(text.count(word)) + 0.01 for word in self.KEYWORDS]
+
+
+class TestVectorIndexes(unittest.TestCase):
+    """Test cases for ExactIndex and HnswIndex."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test fixtures before running tests."""
+        rng = np.random.default_rng(0)
+        cls.vectors = rng.normal(size=(500, 32)).astype(np.float32)
+        cls.queries = rng.normal(size=(20, 32)).astype(np.float32)
+
+    def test_exact_search_matches_brute_force(self):
+        """Test that ExactIndex returns the true cosine nearest neighbours."""
+        ids, scores = ExactIndex(self.vectors).search(self.queries, 5)
+
+        normed = self.vectors / np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        q = self.queries / np.linalg.norm(self.queries, axis=1, keepdims=True)
+        expected = np.argsort(-(q @ normed.T), axis=1)[:, :5]
+
+        np.testing.assert_array_equal(ids, expected)
+        self.assertTrue(np.all(np.diff(scores, axis=1) <= 1e-6))
+        print("✅ Exact search test passed")
+
+    def test_hnsw_recall_against_exact(self):
+        """Test that HNSW with a generous ef finds nearly all true neighbours."""
+        truth, _ = ExactIndex(self.vectors).search(self.queries, 10)
+        found, _ = HnswIndex(self.vectors, ef_search=200).search(self.queries, 10)
+
+        recall = sum(len(set(t) & set(f)) for t, f in zip(truth, found)) / truth.size
+        self.assertGreater(recall, 0.9)
+        print(f"✅ HNSW recall test passed (recall@10 = {recall:.3f})")
+
+    def test_hnsw_ef_set_once(self):
+        """Test that ef is fixed at build time and only raised for a larger k."""
+        index = HnswIndex(self.vectors, ef_search=8)
+        self.assertEqual(index.ef, max(8, settings.VECTOR_SEARCH_K))
+        index.search(self.queries, 5)
+        self.assertEqual(index.index.ef, index.ef)
+        ids, _ = index.search(self.queries[:1], 50)
+        self.assertEqual(ids.shape, (1, 50))
+        self.assertEqual((index.ef, index.index.ef), (50, 50))
+        index.search(self.queries, 5)
+        self.assertEqual(index.index.ef, 50)
+
+        # As swept by benchmarks/ann_backends.py
+        index.set_ef_search(20)
+        self.assertEqual((index.ef, index.index.ef), (20, 20))
+        print("✅ HNSW ef test passed")
+
+    def test_k_larger_than_corpus(self):
+        """Test that k is clamped to the number of indexed vectors."""
+        ids, _ = ExactIndex(self.vectors[:3]).search(self.queries[:1], 10)
+        self.assertEqual(ids.shape, (1, 3))
+        print("✅ Clamped k test passed")
+
+
+class TestIndexRetriever(unittest.TestCase):
+    """Test cases for the retriever built on the in-memory backends."""
+
+    def test_retrieves_best_matching_document(self):
+        """Test that both in-memory backends rank the matching document first."""
+        documents = TestData.SAMPLE_DOCUMENTS
+        for backend in ("exact", "hnswlib"):
+            retriever = build_index_retriever(
+                documents, KeywordEmbeddings(), backend, k=2
+            )
+            results = retriever.invoke("python python python")
+
+            self.assertEqual(len(results), 2)
+            self.assertEqual(results[0].metadata["source"], "python_intro.txt")
+            self.assertIn("vector_score", results[0].metadata)
+        print("✅ Index retriever test passed")
+
+    def test_unknown_in_memory_backend(self):
+        """Test that Chroma is not accepted as an in-memory backend."""
+        with self.assertRaises(ValueError):
+            build_index_retriever(
+                TestData.SAMPLE_DOCUMENTS, KeywordEmbeddings(), "chroma", 2
+            )
+        print("✅ Unknown in-memory backend test passed")
+
+
+class CountingEmbeddings(KeywordEmbeddings):
+    """KeywordEmbeddings that records every embedding call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(("documents", len(texts)))
+        embed = super().embed_query
+        return [embed(text) for text in texts]
+
+    def embed_query(self, text):
+        self.calls.append(("query", 1))
+        return super().embed_query(text)
+
+
+class TestBatchRetrieval(unittest.TestCase):
+    """Test cases for retrieving many queries at once."""
+
+    def setUp(self):
+        """Build a hybrid retriever like RetrieverBuilder does."""
+        documents = TestData.SAMPLE_DOCUMENTS
+        self.embeddings = CountingEmbeddings()
+        vector = build_index_retriever(documents, self.embeddings, "exact", k=2)
+        bm25 = BM25Retriever.from_documents(documents)
+        bm25.k = 2
+        self.hybrid = EnsembleRetriever(retrievers=[bm25, vector], weights=[0.4, 0.6])
+        self.embeddings.calls.clear()
+
+    def test_matches_per_query_retrieval(self):
+        """Test that batched results equal invoking the retriever per query."""
+        queries = ["python programming", "azure model", "machine learning data"]
+
+        batched = batch_retrieve(self.hybrid, queries)
+        single = [self.hybrid.invoke(query) for query in queries]
+
+        self.assertEqual(
+            [[d.page_content for d in docs] for docs in batched],
+            [[d.page_content for d in docs] for docs in single],
+        )
+        print("✅ Batched retrieval equivalence test passed")
+
+    def test_queries_embedded_in_one_call(self):
+        """Test that all queries go to the embedding backend together."""
+        batch_retrieve(self.hybrid, ["python", "azure", "learning", "data"])
+
+        self.assertEqual(self.embeddings.calls, [("documents", 4)])
+        print("✅ Single embedding call test passed")
+
+    def test_fused_scores_in_metadata(self):
+        """Test that the scored ensemble keeps fused scores without changing order."""
+        scored = ScoredEnsembleRetriever(
+            retrievers=self.hybrid.retrievers, weights=self.hybrid.weights
+        )
+        query = "azure model"
+
+        docs = scored.invoke(query)
+        scores = [doc.metadata["fused_score"] for doc in docs]
+
+        self.assertEqual(
+            [d.page_content for d in docs],
+            [d.page_content for d in self.hybrid.invoke(query)],
+        )
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertTrue(all(0 < score <= 1 for score in scores))
+        self.assertEqual(batch_retrieve(scored, [query])[0], docs)
+        # The shared BM25 documents are not modified
+        self.assertNotIn("fused_score", TestData.SAMPLE_DOCUMENTS[0].metadata)
+        print("✅ Fused score test passed")
+
+
+class TestSelectBackend(unittest.TestCase):
+    """Test cases for VECTOR_BACKEND resolution."""
+
+    @patch("retriever.vector_store.settings")
+    def test_auto_uses_exact_for_small_corpora(self, mock_settings):
+        """Test that 'auto' switches from exact search to Chroma by size."""
+        mock_settings.VECTOR_BACKEND = "auto"
+        mock_settings.EXACT_SEARCH_MAX_DOCS = 100
+
+        self.assertEqual(select_backend(100), "exact")
+        self.assertEqual(select_backend(101), "chroma")
+        print("✅ Auto backend selection test passed")
+
+    @patch("retriever.vector_store.settings")
+    def test_invalid_backend(self, mock_settings):
+        """Test that an unknown backend name is rejected."""
+        mock_settings.VECTOR_BACKEND = "faiss-gpu"
+        with self.assertRaises(ValueError):
+            select_backend(10)
+        print("✅ Invalid backend test passed")
+
+
+def run_vector_store_tests():
+    """Run all vector backend tests."""
+    print("\n🧪 Running Vector Backend Integration Tests...\n")
+
+    # Create test suite
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    for case in (
+        TestVectorIndexes,
+        TestIndexRetriever,
+        TestBatchRetrieval,
+        TestSelectBackend,
+    ):
+        suite.addTests(loader.loadTestsFromTestCase(case))
+
+    # Run tests
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    # Print summary
+    print("\n📊 Vector Backend Test Results:")
+    print(f"   Tests run: {result.testsRun}")
+    print(f"   Failures: {len(result.failures)}")
+    print(f"   Errors: {len(result.errors)}")
+
+    success = len(result.failures) == 0 and len(result.errors) == 0
+    if success:
+        print("\n🎉 All vector backend tests passed!")
+    else:
+        print("\n💥 Some vector backend tests failed!")
+
+    return success
+
+
+if __name__ == "__main__":
+    run_vector_store_tests()
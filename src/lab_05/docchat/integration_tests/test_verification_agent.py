@@ -10,9 +10,25 @@ from unittest.mock import MagicMock, patch
 # Add the parent directory to the path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from langchain.schema import Document
+
+from agents.grounding import GroundingChecker, entities, numbers, split_claims
 from agents.verification_agent import VerificationAgent
+from config.settings import settings
 from integration_tests.test_utils import TestData, check_environment_variables
 
+# Shaped like the Google environmental report tables behind the app's example
+PUE_DOCUMENTS = [
+    Document(
+        page_content="Data center PUE by facility. Singapore (2nd facility): "
+        "2019 1.12, 2020 1.11, 2021 1.10, 2022 1.10."
+    ),
+    Document(
+        page_content="Regional average carbon-free energy (CFE) in 2023: "
+        "Asia Pacific 17%, Europe 76%, Americas 70%."
+    ),
+]
+
 
 class TestVerificationAgent(unittest.TestCase):
     """Test cases for VerificationAgent."""
@@ -277,12 +293,89 @@ class TestVerificationAgent(unittest.TestCase):
             print("✅ Empty LLM response handling test passed")
 
 
+class TestGrounding(unittest.TestCase):
+    """Test cases for the local claim-level grounding check."""
+
+    def test_split_claims_numbers_and_entities(self):
+        """Test claim splitting and the numbers / names extracted from claims."""
+        answer = (
+            "**Singapore:** The PUE was 1.12 in 2019.\n"
+            "- It fell to 1.10 in 2022. Asia Pacific CFE was 17%."
+        )
+
+        claims = split_claims(answer)
+
+        self.assertEqual(
+            claims,
+            [
+                "Singapore: The PUE was 1.12 in 2019.",
+                "It fell to 1.10 in 2022.",
+                "Asia Pacific CFE was 17%.",
+            ],
+        )
+        self.assertEqual(numbers("1,536 dimensions, PUE 1.10"), {"1536", "1.1"})
+        self.assertEqual(entities(claims[2]), {"pacific", "cfe"})
+        print("✅ Claim extraction test passed")
+
+    def test_numbers_decide_support(self):
+        """Test that matching figures are supported and altered ones are not."""
+        checker = GroundingChecker(min_coverage=0.6)
+        answer = (
+            "The Singapore 2nd facility had a PUE of 1.12 in 2019 and 1.10 in 2022. "
+            "The regional average CFE in Asia Pacific in 2023 was 12%."
+        )
+
+        report = checker.check(answer, PUE_DOCUMENTS)
+
+        self.assertEqual(report["supported"], 1)
+        self.assertEqual(report["unconfirmed"], 1)
+        first, second = report["claims"]
+        self.assertEqual((first["status"], first["chunk"]), ("supported", 1))
+        self.assertEqual(second["chunk"], 2)
+        self.assertEqual(second["missing_numbers"], ["12"])
+        print("✅ Numeric grounding test passed")
+
+    @patch("agents.verification_agent.get_client", lambda agent: (MagicMock(), "mock"))
+    def test_verifier_only_sends_unconfirmed_claims(self):
+        """Test that confirmed answers skip the LLM and others send the rest."""
+        with (
+            patch.object(settings, "GROUNDING_MODE", "local"),
+            patch.object(settings, "GROUNDING_MIN_COVERAGE", 0.6),
+        ):
+            agent = VerificationAgent()
+            response = MagicMock()
+            response.choices[0].message.content = "Supported: NO\nRelevant: YES"
+            agent.client.complete.return_value = response
+
+            confirmed = agent.check(
+                "The Singapore facility had a PUE of 1.12 in 2019.", PUE_DOCUMENTS
+            )
+            agent.client.complete.assert_not_called()
+            self.assertIn("**Supported:** YES", confirmed["verification_report"])
+            self.assertEqual(confirmed["claims"][0]["status"], "supported")
+
+            mixed = agent.check(
+                "The Singapore facility had a PUE of 1.12 in 2019. "
+                "Asia Pacific CFE was 12% in 2023.",
+                PUE_DOCUMENTS,
+            )
+            prompt = agent.client.complete.call_args.kwargs["messages"][1].content
+            self.assertIn("Asia Pacific CFE was 12% in 2023.", prompt)
+            self.assertNotIn("PUE of 1.12", prompt)
+            self.assertIn("**Supported:** NO", mixed["verification_report"])
+            self.assertIn("1 of 2 claims", mixed["verification_report"])
+        print("✅ Grounding-gated verification test passed")
+
+
 def run_verification_agent_tests():
     """Run all VerificationAgent tests."""
     print("\n🧪 Running VerificationAgent Integration Tests...\n")
 
     # Create test suite
-    suite = unittest.TestLoader().loadTestsFromTestCase(TestVerificationAgent)
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    for case in (TestVerificationAgent, TestGrounding):
+        suite.addTests(loader.loadTestsFromTestCase(case))
 
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)
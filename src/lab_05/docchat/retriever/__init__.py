@@ -1,3 +1,11 @@
-from retriever.builder import RetrieverBuilder
-
+# RetrieverBuilder pulls in chromadb and langchain; it is imported on first
+# access so that light modules such as retriever.corpus_index load without them
 __all__ = ["RetrieverBuilder"]
+
+
+def __getattr__(name):
+    if name == "RetrieverBuilder":
+        from retriever.builder import RetrieverBuilder
+
+        return RetrieverBuilder
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
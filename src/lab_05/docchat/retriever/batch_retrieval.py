@@ -0,0 +1,75 @@
+import logging
+from typing import List
+
+import numpy as np
+from langchain.retrievers import EnsembleRetriever
+from langchain.schema import Document
+from langchain_core.vectorstores import VectorStoreRetriever
+
+from retriever.reranker import RerankingRetriever
+from retriever.vector_store import IndexRetriever
+
+logger = logging.getLogger(__name__)
+
+
+def batch_retrieve(retriever, queries: List[str]) -> List[List[Document]]:
+    """
+    Retrieve for many queries at once; one document list per query, in order.
+
+    Walks the retriever built by RetrieverBuilder: all queries are embedded in
+    one embed_documents call and searched as one matrix against the vector
+    index, BM25 and fusion run per query as they are cheap CPU work, and the
+    reranker is applied to each fused list. Other retrievers fall back to
+    their own batch() (or invoke() per query).
+    """
+    if not queries:
+        return []
+    if isinstance(retriever, RerankingRetriever):
+        candidates = batch_retrieve(retriever.base_retriever, queries)
+        return [
+            retriever.reranker.rerank(query, docs, retriever.top_n)
+            for query, docs in zip(queries, candidates)
+        ]
+    if isinstance(retriever, EnsembleRetriever):
+        per_retriever = [batch_retrieve(r, queries) for r in retriever.retrievers]
+        return [
+            retriever.weighted_reciprocal_rank([docs[i] for docs in per_retriever])
+            for i in range(len(queries))
+        ]
+    if isinstance(retriever, IndexRetriever):
+        vectors = np.asarray(
+            retriever.embeddings.embed_documents(list(queries)), dtype=np.float32
+        )
+        return retriever.search_by_vectors(vectors)
+    if _is_chroma_similarity(retriever):
+        return _chroma_batch(retriever, queries)
+    if hasattr(retriever, "batch"):
+        return retriever.batch(list(queries))
+    return [retriever.invoke(query) for query in queries]
+
+
+def _is_chroma_similarity(retriever) -> bool:
+    return (
+        isinstance(retriever, VectorStoreRetriever)
+        and retriever.search_type == "similarity"
+        and hasattr(retriever.vectorstore, "_collection")
+    )
+
+
+def _chroma_batch(retriever: VectorStoreRetriever, queries: List[str]):
+    store = retriever.vectorstore
+    vectors = store.embeddings.embed_documents(list(queries))
+    # Chroma answers several query embeddings in one call
+    results = store._collection.query(
+        query_embeddings=vectors,
+        n_results=retriever.search_kwargs.get("k", 4),
+        include=["documents", "metadatas"],
+    )
+    logger.debug(f"Searched {len(queries)} query vectors in one Chroma call")
+    return [
+        [
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(texts, metadatas)
+        ]
+        for texts, metadatas in zip(results["documents"], results["metadatas"])
+    ]
@@ -9,42 +9,49 @@ except ImportError:
     pass  # Use system sqlite3 if pysqlite3 not available
 
 import logging
-import os
+import threading
+from pathlib import Path
 
-from dotenv import load_dotenv
-from langchain.retrievers import EnsembleRetriever
 from langchain_community.retrievers import BM25Retriever
 from langchain_community.vectorstores import Chroma
-from langchain_openai import AzureOpenAIEmbeddings
 
 from config.settings import settings
-
-# Load environment variables
-load_dotenv()
+from retriever.collection_registry import (
+    CollectionRegistry,
+    chunk_id,
+    corpus_fingerprint,
+)
+from retriever.embeddings import build_embeddings, embedding_model_id
+from retriever.fusion import ScoredEnsembleRetriever
+from retriever.reranker import RerankingRetriever, build_reranker
+from retriever.vector_store import (
+    build_index_retriever,
+    chroma_collection_metadata,
+    select_backend,
+)
+from utils.metrics import record_cache
 
 logger = logging.getLogger(__name__)
 
+# chromadb's client setup is not thread-safe for a shared persist directory
+_chroma_client_lock = threading.Lock()
+
 
 class RetrieverBuilder:
     def __init__(self):
-        """Initialize the retriever builder with Azure OpenAI embeddings."""
-        # Azure OpenAI embedding configuration
-        azure_embedding = AzureOpenAIEmbeddings(
-            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-            azure_deployment=os.getenv("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT_NAME"),
-            openai_api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-            chunk_size=1000,  # Adjust based on your needs
-        )
-        self.embeddings = azure_embedding
+        """Initialize the retriever builder with the configured embedding backend."""
+        self.embeddings = build_embeddings()
+        self._collection_registry = None
+        self._chroma_client = None
+        self._chroma_client_path = None
+
+        # Shared across corpora so the score cache survives re-ingestion
+        self.reranker = build_reranker() if settings.RERANKER_ENABLED else None
 
     def build_hybrid_retriever(self, docs):
         """Build a hybrid retriever using BM25 and vector-based retrieval."""
         try:
             # Ensure all docs are proper Document objects with required attributes
-            import os
-            import shutil
-
             from langchain.schema import Document
 
             processed_docs = []
@@ -73,48 +80,36 @@ class RetrieverBuilder:
             bm25.k = settings.VECTOR_SEARCH_K  # Set the number of documents to retrieve
             logger.info("BM25 retriever created successfully.")
 
-            # Handle ChromaDB corruption by cleaning up if needed
-            try:
-                # Create Chroma vector store
-                vector_store = Chroma.from_documents(
-                    documents=processed_docs,
-                    embedding=self.embeddings,
-                    persist_directory=settings.CHROMA_DB_PATH,
+            # Create vector-based retriever with the configured ANN backend
+            backend = select_backend(len(processed_docs))
+            if backend == "chroma":
+                vector_retriever = self._build_chroma_retriever(processed_docs)
+            else:
+                vector_retriever = build_index_retriever(
+                    processed_docs,
+                    self.embeddings,
+                    backend,
+                    k=settings.VECTOR_SEARCH_K,
                 )
-                logger.info("Vector store created successfully.")
-            except Exception as chroma_error:
-                if "'_type'" in str(chroma_error):
-                    logger.warning(
-                        "ChromaDB corruption detected, cleaning up and retrying..."
-                    )
-                    if os.path.exists(settings.CHROMA_DB_PATH):
-                        shutil.rmtree(settings.CHROMA_DB_PATH)
-                        logger.info(
-                            f"Cleaned up corrupted ChromaDB at {settings.CHROMA_DB_PATH}"
-                        )
-
-                    # Retry creating vector store
-                    vector_store = Chroma.from_documents(
-                        documents=processed_docs,
-                        embedding=self.embeddings,
-                        persist_directory=settings.CHROMA_DB_PATH,
-                    )
-                    logger.info("Vector store created successfully after cleanup.")
-                else:
-                    raise chroma_error
-
-            # Create vector-based retriever
-            vector_retriever = vector_store.as_retriever(
-                search_kwargs={"k": settings.VECTOR_SEARCH_K}
-            )
-            logger.info("Vector retriever created successfully.")
+            logger.info(f"Vector retriever created successfully ({backend}).")
 
-            # Combine retrievers into a hybrid retriever
-            hybrid_retriever = EnsembleRetriever(
+            # Combine retrievers into a hybrid retriever (fused scores kept in
+            # each document's metadata)
+            hybrid_retriever = ScoredEnsembleRetriever(
                 retrievers=[bm25, vector_retriever],
                 weights=settings.HYBRID_RETRIEVER_WEIGHTS,
             )
             logger.info("Hybrid retriever created successfully.")
+
+            if self.reranker is not None:
+                logger.info(
+                    f"Reranking fused candidates to top {settings.RERANKER_TOP_N}."
+                )
+                return RerankingRetriever(
+                    base_retriever=hybrid_retriever,
+                    reranker=self.reranker,
+                    top_n=settings.RERANKER_TOP_N,
+                )
             return hybrid_retriever
         except Exception as e:
             logger.error(f"Failed to build hybrid retriever: {e}")
@@ -122,3 +117,104 @@ class RetrieverBuilder:
 
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise
+
+    def _build_chroma_retriever(self, processed_docs):
+        """
+        Index the documents in their own Chroma collection, named by the corpus
+        fingerprint, and reuse that collection if it was already built.
+        """
+        collection_metadata = chroma_collection_metadata()
+        fingerprint = corpus_fingerprint(
+            processed_docs,
+            f"{embedding_model_id()}|{sorted(collection_metadata.items())}",
+        )
+        name = f"{settings.CHROMA_COLLECTION_NAME}_{fingerprint}"
+        registry = self._get_collection_registry()
+
+        with registry.collection_lock(name):
+            try:
+                vector_store = self._open_or_create_collection(
+                    name, processed_docs, collection_metadata
+                )
+            except Exception as chroma_error:
+                if "'_type'" not in str(chroma_error):
+                    raise chroma_error
+                # Only this corpus's collection is dropped; other sessions keep theirs
+                logger.warning(
+                    f"ChromaDB collection {name} is corrupted, recreating it..."
+                )
+                self._delete_collection(name)
+                vector_store = self._open_or_create_collection(
+                    name, processed_docs, collection_metadata
+                )
+                logger.info("Vector store created successfully after cleanup.")
+            registry.touch(name, len(processed_docs))
+
+        vector_retriever = vector_store.as_retriever(
+            search_kwargs={"k": settings.VECTOR_SEARCH_K}
+        )
+        registry.track(vector_retriever, name)
+        registry.collect_garbage(self._delete_collection)
+        return vector_retriever
+
+    def _open_or_create_collection(self, name, processed_docs, collection_metadata):
+        client = self._get_chroma_client()
+        existing = Chroma(
+            client=client,
+            collection_name=name,
+            embedding_function=self.embeddings,
+            persist_directory=settings.CHROMA_DB_PATH,
+            collection_metadata=collection_metadata,
+        )
+        count = existing._collection.count()
+        reuse = count == len(processed_docs)
+        record_cache("vector_store", hit=reuse)
+        if reuse:
+            logger.info(f"Reusing vector store collection {name} ({count} chunks).")
+            return existing
+        if count:
+            # Left over from an interrupted build
+            logger.warning(f"Collection {name} is incomplete, rebuilding it.")
+            existing.delete_collection()
+
+        vector_store = Chroma.from_documents(
+            client=client,
+            documents=processed_docs,
+            embedding=self.embeddings,
+            ids=[f"{i}-{chunk_id(doc)[:16]}" for i, doc in enumerate(processed_docs)],
+            collection_name=name,
+            persist_directory=settings.CHROMA_DB_PATH,
+            collection_metadata=collection_metadata,
+        )
+        logger.info(f"Vector store collection {name} created successfully.")
+        return vector_store
+
+    def _delete_collection(self, name: str):
+        self._get_chroma_client().delete_collection(name)
+
+    def _get_chroma_client(self):
+        """One client per persist directory, shared by concurrent builds."""
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+
+        path = settings.CHROMA_DB_PATH
+        with _chroma_client_lock:
+            if self._chroma_client is None or self._chroma_client_path != path:
+                # Telemetry would post an event to the network per query
+                self._chroma_client = chromadb.PersistentClient(
+                    path=path, settings=ChromaSettings(anonymized_telemetry=False)
+                )
+                self._chroma_client_path = path
+            return self._chroma_client
+
+    def _get_collection_registry(self) -> CollectionRegistry:
+        path = settings.CHROMA_DB_PATH
+        if self._collection_registry is None or str(
+            self._collection_registry.persist_directory
+        ) != str(Path(path)):
+            self._collection_registry = CollectionRegistry(
+                path,
+                ttl_hours=settings.CHROMA_COLLECTION_TTL_HOURS,
+                gc_interval=settings.CHROMA_GC_INTERVAL_SECONDS,
+            )
+        return self._collection_registry
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List
+
+from filelock import FileLock
+from langchain.schema import Document
+
+logger = logging.getLogger(__name__)
+
+# Collection created by earlier versions, which shared one store for every upload
+LEGACY_COLLECTION_NAME = "langchain"
+
+
+def chunk_id(doc: Document) -> str:
+    """Stable content hash of a chunk."""
+    return hashlib.sha256(doc.page_content.encode()).hexdigest()
+
+
+def corpus_fingerprint(docs: List[Document], index_config: str) -> str:
+    """
+    Fingerprint a corpus by its chunk contents and the index configuration.
+
+    The chunk order does not matter; the embedding model and HNSW parameters do,
+    because vectors and graph parameters are fixed when a collection is created.
+    """
+    digest = hashlib.sha256(index_config.encode())
+    for content_hash in sorted(chunk_id(doc) for doc in docs):
+        digest.update(content_hash.encode())
+    return digest.hexdigest()[:32]
+
+
+class CollectionRegistry:
+    """
+    Book-keeping for the per-corpus Chroma collections in one persist directory.
+
+    A JSON file records when each collection was last used; it is shared by all
+    processes and guarded by a file lock. Retrievers handed out by this process
+    hold an in-memory reference, and collections referenced here are refreshed
+    on every garbage collection pass so other processes keep them too.
+    """
+
+    def __init__(self, persist_directory: str, ttl_hours: float, gc_interval: float):
+        self.persist_directory = Path(persist_directory)
+        self.persist_directory.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_hours * 3600
+        self.gc_interval = gc_interval
+        self.registry_path = self.persist_directory / "collections.json"
+        self.lock_dir = self.persist_directory / "locks"
+        self.lock_dir.mkdir(exist_ok=True)
+        self._registry_lock = FileLock(str(self.persist_directory / ".registry.lock"))
+        self._refs = {}
+        self._refs_lock = threading.Lock()
+        self._last_gc = 0.0
+
+    @contextmanager
+    def collection_lock(self, name: str):
+        """Serialize building/deleting a collection across threads and processes."""
+        with FileLock(str(self.lock_dir / f"{name}.lock")):
+            yield
+
+    def _read(self) -> dict:
+        if not self.registry_path.exists():
+            return {}
+        try:
+            return json.loads(self.registry_path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Collection registry unreadable, starting fresh: {e}")
+            return {}
+
+    def _write(self, entries: dict):
+        tmp_path = self.registry_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(entries, indent=2))
+        tmp_path.replace(self.registry_path)
+
+    def touch(self, name: str, num_documents: int = None):
+        """Record that a collection was just built or reused."""
+        with self._registry_lock:
+            entries = self._read()
+            entry = entries.setdefault(name, {"created": time.time()})
+            entry["last_used"] = time.time()
+            if num_documents is not None:
+                entry["documents"] = num_documents
+            self._write(entries)
+
+    def track(self, retriever, name: str):
+        """Hold a reference to the collection for as long as the retriever lives."""
+        with self._refs_lock:
+            self._refs[name] = self._refs.get(name, 0) + 1
+        weakref.finalize(retriever, self._release, name)
+
+    def _release(self, name: str):
+        with self._refs_lock:
+            self._refs[name] -= 1
+            if self._refs[name] <= 0:
+                del self._refs[name]
+
+    def referenced(self) -> set:
+        with self._refs_lock:
+            return set(self._refs)
+
+    def _expired(self, entry: dict, now: float) -> bool:
+        return now - entry.get("last_used", 0) > self.ttl_seconds
+
+    def collect_garbage(self, delete_collection, force: bool = False) -> List[str]:
+        """
+        Delete collections that nobody has used within the TTL.
+
+        delete_collection(name) performs the actual deletion. Runs at most once
+        per gc_interval unless forced. Returns the names that were deleted.
+        """
+        now = time.time()
+        if not force and now - self._last_gc < self.gc_interval:
+            return []
+        self._last_gc = now
+
+        referenced = self.referenced()
+        # The registry lock is only held briefly, never while waiting for a
+        # collection lock: builders take the collection lock first, then
+        # touch() the registry, and the opposite order would deadlock
+        with self._registry_lock:
+            entries = self._read()
+            for name in referenced:
+                if name in entries:
+                    entries[name]["last_used"] = now
+            self._write(entries)
+            expired = [
+                name
+                for name, entry in entries.items()
+                if name not in referenced and self._expired(entry, now)
+            ]
+
+        deleted = []
+        for name in expired + [LEGACY_COLLECTION_NAME]:
+            try:
+                with self.collection_lock(name):
+                    # Rebuilt or reused while we waited for the lock?
+                    if name != LEGACY_COLLECTION_NAME and name in self.referenced():
+                        continue
+                    with self._registry_lock:
+                        entry = self._read().get(name)
+                    if entry is not None and not self._expired(entry, time.time()):
+                        continue
+                    delete_collection(name)
+                    with self._registry_lock:
+                        entries = self._read()
+                        entries.pop(name, None)
+                        self._write(entries)
+            except Exception as e:
+                if name != LEGACY_COLLECTION_NAME:
+                    logger.warning(f"Could not delete collection {name}: {e}")
+                continue
+            deleted.append(name)
+
+        if deleted:
+            logger.info(f"Garbage-collected vector collections: {', '.join(deleted)}")
+        return deleted
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def corpus_id_for(file_hashes) -> str:
+    """Stable corpus ID of a set of files, independent of upload order."""
+    joined = "\n".join(sorted(set(file_hashes)))
+    return hashlib.sha256(joined.encode()).hexdigest()[:16]
+
+
+def _write_atomic(path: Path, data: bytes):
+    # A unique temporary name, as other worker processes may write the same file
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+
+
+class CorpusIndex:
+    """
+    Process-independent registry of ingested corpora and their retrievers.
+
+    Uploaded files are stored under root_dir by content hash and each corpus
+    gets a small JSON manifest, so any process (e.g. another server worker)
+    can resolve a corpus ID. Retrievers are built on first use and kept in an
+    LRU of max_cached corpora; rebuilding one hits the document cache and
+    reuses the corpus's Chroma collection, so nothing is parsed or embedded
+    twice.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        processor_factory: Callable,
+        builder_factory: Callable,
+        max_cached: int = 8,
+    ):
+        self.root = Path(root_dir)
+        self.uploads_dir = self.root / "uploads"
+        self.manifests_dir = self.root / "corpora"
+        self.uploads_dir.mkdir(parents=True, exist_ok=True)
+        self.manifests_dir.mkdir(parents=True, exist_ok=True)
+        self.max_cached = max_cached
+        self._processor_factory = processor_factory
+        self._builder_factory = builder_factory
+        self._processor = None
+        self._builder = None
+        self._retrievers = OrderedDict()
+        self._lock = threading.Lock()
+        self._corpus_locks: Dict[str, threading.Lock] = {}
+
+    def add_files(self, files: List[Tuple[str, bytes]]) -> str:
+        """Store (filename, content) pairs and register them as one corpus."""
+        if not files:
+            raise ValueError("No files given")
+        entries = []
+        for name, content in files:
+            digest = file_hash(content)
+            path = self.uploads_dir / f"{digest}{Path(name).suffix.lower()}"
+            if not path.exists():
+                _write_atomic(path, content)
+            entries.append({"name": name, "hash": digest, "path": str(path)})
+
+        corpus_id = corpus_id_for(entry["hash"] for entry in entries)
+        manifest = self._manifest_path(corpus_id)
+        if not manifest.exists():
+            record = {"files": entries, "created": time.time()}
+            _write_atomic(manifest, json.dumps(record).encode())
+        return corpus_id
+
+    def exists(self, corpus_id: str) -> bool:
+        try:
+            return self._manifest_path(corpus_id).exists()
+        except KeyError:
+            return False
+
+    def files(self, corpus_id: str) -> List[dict]:
+        """Manifest entries (name, hash, path) of a corpus."""
+        path = self._manifest_path(corpus_id)
+        if not path.exists():
+            raise KeyError(corpus_id)
+        return json.loads(path.read_text())["files"]
+
+    def get_retriever(
+        self, corpus_id: str, progress: Optional[Callable[[str, float], None]] = None
+    ):
+        """
+        Return the corpus's retriever, building it once if needed.
+
+        progress, if given, is called with a message and the completed fraction
+        between documents and before indexing; it may raise to abort the build.
+        """
+        with self._lock:
+            if corpus_id in self._retrievers:
+                self._retrievers.move_to_end(corpus_id)
+                return self._retrievers[corpus_id]
+            corpus_lock = self._corpus_locks.setdefault(corpus_id, threading.Lock())
+
+        # Concurrent requests for the same corpus wait for a single build
+        with corpus_lock:
+            with self._lock:
+                if corpus_id in self._retrievers:
+                    return self._retrievers[corpus_id]
+            retriever = self._build(corpus_id, progress)
+            with self._lock:
+                self._retrievers[corpus_id] = retriever
+                while len(self._retrievers) > self.max_cached:
+                    evicted, _ = self._retrievers.popitem(last=False)
+                    logger.info(f"Evicted retriever of corpus {evicted} from memory")
+            return retriever
+
+    def ingest(self, files: List[Tuple[str, bytes]]) -> str:
+        """Register the files and build the corpus's retriever."""
+        corpus_id = self.add_files(files)
+        self.get_retriever(corpus_id)
+        return corpus_id
+
+    def warm_up(self):
+        """Create the processor and builder and load their models ahead of use."""
+        processor, _ = self._components()
+        warm_up = getattr(processor, "warm_up", None)
+        if warm_up is not None:
+            warm_up()
+
+    def _build(self, corpus_id: str, progress=None):
+        entries = self.files(corpus_id)
+        files = [SimpleNamespace(name=entry["path"]) for entry in entries]
+        processor, builder = self._components()
+        if progress is not None:
+            # Convert document by document so progress and cancellation land
+            # in between; the pass over all files below reads the cache
+            for i, (entry, file) in enumerate(zip(entries, files)):
+                progress(f"Converting {entry['name']}", i / (len(files) + 1))
+                processor.process([file])
+        chunks = processor.process(files)
+        if not chunks:
+            raise ValueError(f"No content could be extracted from corpus {corpus_id}")
+        logger.info(f"Building retriever of corpus {corpus_id} ({len(chunks)} chunks)")
+        if progress is not None:
+            progress(f"Indexing {len(chunks)} chunks", len(files) / (len(files) + 1))
+        return builder.build_hybrid_retriever(chunks)
+
+    def _components(self):
+        with self._lock:
+            if self._processor is None:
+                self._processor = self._processor_factory()
+                self._builder = self._builder_factory()
+            return self._processor, self._builder
+
+    def _manifest_path(self, corpus_id: str) -> Path:
+        if not corpus_id.isalnum():
+            raise KeyError(corpus_id)
+        return self.manifests_dir / f"{corpus_id}.json"
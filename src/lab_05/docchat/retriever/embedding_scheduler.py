@@ -0,0 +1,312 @@
+import hashlib
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from utils.metrics import QUEUE_WAIT_SECONDS, RETRIES
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatchError(RuntimeError):
+    """Raised when some embedding batches still fail after all retries."""
+
+    def __init__(self, failed_batches: int, total_batches: int, last_error: Exception):
+        super().__init__(
+            f"{failed_batches}/{total_batches} embedding batches failed: {last_error}"
+        )
+        self.failed_batches = failed_batches
+        self.total_batches = total_batches
+        self.last_error = last_error
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket for a tokens-per-minute and requests-per-minute budget.
+
+    Both buckets start full and refill continuously. A 429 from the service can
+    pause every caller until the server's retry-after has elapsed.
+    """
+
+    def __init__(self, tokens_per_minute: int, requests_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self._tokens = float(tokens_per_minute)
+        self._requests = float(requests_per_minute)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(
+            self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60
+        )
+        self._requests = min(
+            self.requests_per_minute,
+            self._requests + elapsed * self.requests_per_minute / 60,
+        )
+
+    def acquire(self, tokens: int) -> float:
+        """Block until the request fits in the budget; return the seconds waited."""
+        # A batch larger than the whole bucket only has to wait for a full bucket
+        tokens = min(tokens, self.tokens_per_minute)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    wait = max(
+                        (tokens - self._tokens) * 60 / self.tokens_per_minute,
+                        (1 - self._requests) * 60 / self.requests_per_minute,
+                        0,
+                    )
+                    if wait == 0:
+                        self._tokens -= tokens
+                        self._requests -= 1
+                        return waited
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float):
+        """Hold back all callers for the given number of seconds."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+@lru_cache(maxsize=1)
+def _transport_errors() -> Tuple[type, ...]:
+    # Connection failures and timeouts of the clients embeddings may go through
+    errors = [ConnectionError, TimeoutError]
+    try:
+        import openai
+
+        errors.append(openai.APIConnectionError)  # timeouts included
+    except ImportError:
+        pass
+    try:
+        import httpx
+
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    try:
+        import requests
+
+        errors.extend([requests.ConnectionError, requests.Timeout])
+    except ImportError:
+        pass
+    try:
+        from azure.core.exceptions import ServiceRequestError, ServiceResponseError
+
+        errors.extend([ServiceRequestError, ServiceResponseError])
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+def _retryable(error: Exception) -> bool:
+    """429s, server errors and transport failures; never bad input or bugs."""
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, _transport_errors())
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for header in ("retry-after-ms", "retry-after"):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        return seconds / 1000 if header == "retry-after-ms" else seconds
+    return None
+
+
+def default_token_counter() -> Callable[[str], int]:
+    """cl100k_base token counts, or a length estimate when tiktoken is unavailable."""
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:
+        # The BPE file is downloaded on first use; fall back on offline machines
+        logger.warning(f"tiktoken unavailable ({e}), estimating tokens from length")
+        return lambda text: max(1, len(text) // 4)
+
+
+class EmbeddingScheduler(Embeddings):
+    """
+    Embed through a remote backend with concurrent, rate-limited batches.
+
+    Texts are packed into batches by token count, batches are sent concurrently
+    within the tokens/requests per minute budget, 429s and transient errors are
+    retried with backoff, and vectors from batches that succeeded are kept so a
+    repeated call after a partial failure only embeds what is still missing.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        tokens_per_minute: int = 350_000,
+        requests_per_minute: int = 2_100,
+        max_concurrency: int = 8,
+        max_batch_tokens: int = 64_000,
+        max_batch_size: int = 256,
+        max_retries: int = 6,
+        backoff_base: float = 1.0,
+        token_counter: Optional[Callable[[str], int]] = None,
+    ):
+        self.embeddings = embeddings
+        self.limiter = RateLimiter(tokens_per_minute, requests_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._count_tokens = token_counter
+        # Vectors of batches that completed during a call that later failed
+        self._resume = {}
+        self._resume_lock = threading.Lock()
+
+    def count_tokens(self, text: str) -> int:
+        if self._count_tokens is None:
+            self._count_tokens = default_token_counter()
+        return self._count_tokens(text)
+
+    def plan_batches(self, token_counts: List[int]) -> List[List[int]]:
+        """Pack consecutive items into batches bounded by tokens and item count."""
+        batches = []
+        current = []
+        current_tokens = 0
+        for idx, tokens in enumerate(token_counts):
+            if current and (
+                len(current) >= self.max_batch_size
+                or current_tokens + tokens > self.max_batch_tokens
+            ):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(idx)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        keys = [hashlib.sha256(text.encode()).hexdigest() for text in texts]
+        with self._resume_lock:
+            vectors = [self._resume.get(key) for key in keys]
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if len(missing) < len(texts):
+            logger.info(
+                f"Resuming embedding: {len(texts) - len(missing)}/{len(texts)} "
+                "texts already embedded"
+            )
+
+        token_counts = [self.count_tokens(texts[i]) for i in missing]
+        batches = [
+            [missing[i] for i in batch] for batch in self.plan_batches(token_counts)
+        ]
+        tokens_by_index = dict(zip(missing, token_counts))
+        logger.info(
+            f"Embedding {len(missing)} texts in {len(batches)} batches "
+            f"(concurrency={self.max_concurrency})"
+        )
+
+        errors = []
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = {
+                pool.submit(
+                    self._embed_batch,
+                    [texts[i] for i in batch],
+                    sum(tokens_by_index[i] for i in batch),
+                ): batch
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    batch_vectors = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                with self._resume_lock:
+                    for idx, vector in zip(batch, batch_vectors):
+                        vectors[idx] = vector
+                        self._resume[keys[idx]] = vector
+
+        if errors:
+            logger.error(
+                f"{len(errors)}/{len(batches)} embedding batches failed; "
+                "completed batches are kept for the next attempt"
+            )
+            raise EmbeddingBatchError(len(errors), len(batches), errors[-1])
+
+        # Everything succeeded: the resume state is no longer needed
+        with self._resume_lock:
+            for key in keys:
+                self._resume.pop(key, None)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        # Queries get the same quota accounting and 429 handling as batches
+        return self._with_retries(
+            lambda: self.embeddings.embed_query(text), self.count_tokens(text)
+        )
+
+    def _embed_batch(self, texts: List[str], tokens: int) -> List[List[float]]:
+        return self._with_retries(
+            lambda: self.embeddings.embed_documents(texts), tokens
+        )
+
+    def _with_retries(self, call: Callable, tokens: int):
+        attempt = 0
+        while True:
+            waited = self.limiter.acquire(tokens)
+            QUEUE_WAIT_SECONDS.observe(waited, stage="embedding")
+            try:
+                return call()
+            except Exception as e:
+                if not _retryable(e) or attempt >= self.max_retries:
+                    raise
+
+                delay = min(self.backoff_base * 2**attempt, 60.0)
+                delay += random.uniform(0, delay / 2)
+                if _status_code(e) == 429:
+                    delay = _retry_after(e) or delay
+                    # Everyone shares the quota, so every worker backs off
+                    self.limiter.pause(delay)
+                    logger.warning(f"Embedding rate limited, backing off {delay:.1f}s")
+                else:
+                    logger.warning(
+                        f"Embedding request failed ({e}), retrying in {delay:.1f}s"
+                    )
+                    time.sleep(delay)
+                RETRIES.inc(stage="embedding")
+                attempt += 1
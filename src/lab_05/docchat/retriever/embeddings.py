@@ -0,0 +1,132 @@
+import logging
+import os
+from typing import List
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+from config.settings import settings
+from retriever.embedding_scheduler import EmbeddingScheduler
+from retriever.onnx_runtime import (
+    create_session,
+    load_tokenizer,
+    pad_encodings,
+    plan_batches,
+)
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class OnnxEmbeddings(Embeddings):
+    """Sentence embeddings computed locally on CPU with ONNX Runtime."""
+
+    def __init__(
+        self,
+        model_path: str,
+        tokenizer_path: str,
+        max_length: int = 256,
+        max_batch_tokens: int = 16384,
+        max_batch_size: int = 64,
+        num_threads: int = 0,
+        quantize: bool = False,
+        normalize: bool = True,
+    ):
+        self.model_path = model_path
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.normalize = normalize
+        self.tokenizer = load_tokenizer(tokenizer_path, max_length)
+        self.session = create_session(model_path, num_threads, quantize)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in length-sorted batches and return them in input order."""
+        if not texts:
+            return []
+
+        encodings = self.tokenizer.encode_batch(list(texts))
+        lengths = [len(e.ids) for e in encodings]
+        batches = plan_batches(lengths, self.max_batch_tokens, self.max_batch_size)
+
+        vectors = [None] * len(texts)
+        for batch in batches:
+            batch_vectors = self._embed_batch([encodings[i] for i in batch])
+            for idx, vector in zip(batch, batch_vectors):
+                vectors[idx] = vector.tolist()
+
+        logger.debug(f"Embedded {len(texts)} texts in {len(batches)} batches")
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def _embed_batch(self, encodings: list) -> np.ndarray:
+        arrays = pad_encodings(encodings)
+        feeds = {k: v for k, v in arrays.items() if k in self.input_names}
+
+        output = self.session.run(None, feeds)[0]
+        if output.ndim == 3:
+            # Mean pooling over real tokens of the last hidden state
+            mask = arrays["attention_mask"][..., None].astype(output.dtype)
+            output = (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if self.normalize:
+            norms = np.linalg.norm(output, axis=1, keepdims=True)
+            output = output / np.clip(norms, 1e-12, None)
+        return output.astype(np.float32)
+
+
+def embedding_model_id() -> str:
+    """Identify the configured embedding model (vectors differ across models)."""
+    if settings.EMBEDDING_BACKEND.lower() == "onnx":
+        quantized = "int8" if settings.ONNX_QUANTIZE_INT8 else "fp32"
+        return f"onnx:{settings.ONNX_EMBEDDING_MODEL_PATH}:{quantized}"
+    return f"azure:{os.getenv('AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT_NAME')}"
+
+
+def build_embeddings() -> Embeddings:
+    """Create the embedding backend selected by settings.EMBEDDING_BACKEND."""
+    backend = settings.EMBEDDING_BACKEND.lower()
+
+    if backend == "onnx":
+        logger.info("Using local ONNX Runtime embeddings")
+        return OnnxEmbeddings(
+            model_path=settings.ONNX_EMBEDDING_MODEL_PATH,
+            tokenizer_path=settings.ONNX_EMBEDDING_TOKENIZER_PATH,
+            max_length=settings.ONNX_EMBEDDING_MAX_LENGTH,
+            max_batch_tokens=settings.ONNX_EMBEDDING_BATCH_TOKENS,
+            max_batch_size=settings.ONNX_EMBEDDING_MAX_BATCH_SIZE,
+            num_threads=settings.ONNX_NUM_THREADS,
+            quantize=settings.ONNX_QUANTIZE_INT8,
+        )
+
+    if backend == "azure":
+        from langchain_openai import AzureOpenAIEmbeddings
+
+        logger.info("Using Azure OpenAI embeddings")
+        azure_embedding = AzureOpenAIEmbeddings(
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+            azure_deployment=os.getenv("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT_NAME"),
+            openai_api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+            # One HTTP request per scheduler batch; retries are handled there
+            chunk_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+            max_retries=0,
+        )
+        return EmbeddingScheduler(
+            azure_embedding,
+            tokens_per_minute=settings.EMBEDDING_TPM_LIMIT,
+            requests_per_minute=settings.EMBEDDING_RPM_LIMIT,
+            max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+            max_batch_tokens=settings.EMBEDDING_MAX_BATCH_TOKENS,
+            max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+            max_retries=settings.EMBEDDING_MAX_RETRIES,
+        )
+
+    raise ValueError(
+        f"Unknown EMBEDDING_BACKEND '{settings.EMBEDDING_BACKEND}'. Use 'azure' or 'onnx'."
+    )
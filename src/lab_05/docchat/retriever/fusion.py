@@ -0,0 +1,44 @@
+from collections import defaultdict
+from typing import Dict, List
+
+from langchain.retrievers import EnsembleRetriever
+from langchain.schema import Document
+
+
+class ScoredEnsembleRetriever(EnsembleRetriever):
+    """
+    EnsembleRetriever that keeps each document's fused score.
+
+    Results are copies carrying `fused_score` in their metadata: the weighted
+    reciprocal rank score divided by its maximum, so 1.0 means every retriever
+    ranked the chunk first. Downstream stages (such as the relevance gate) can
+    then judge the retrieval without scoring it again.
+    """
+
+    def weighted_reciprocal_rank(
+        self, doc_lists: List[List[Document]]
+    ) -> List[Document]:
+        ranked = super().weighted_reciprocal_rank(doc_lists)
+
+        def key(doc: Document) -> str:
+            return (
+                doc.page_content if self.id_key is None else doc.metadata[self.id_key]
+            )
+
+        rrf_score: Dict[str, float] = defaultdict(float)
+        for doc_list, weight in zip(doc_lists, self.weights):
+            for rank, doc in enumerate(doc_list, start=1):
+                rrf_score[key(doc)] += weight / (rank + self.c)
+
+        best_possible = sum(self.weights) / (1 + self.c)
+        # Copies, since the BM25 retriever hands out its shared corpus documents
+        return [
+            Document(
+                page_content=doc.page_content,
+                metadata={
+                    **(doc.metadata or {}),
+                    "fused_score": rrf_score[key(doc)] / best_possible,
+                },
+            )
+            for doc in ranked
+        ]
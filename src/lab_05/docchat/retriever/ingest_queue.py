@@ -0,0 +1,406 @@
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config.settings import settings
+from retriever.corpus_index import CorpusIndex
+from utils.metrics import INGEST_JOBS, QUEUE_WAIT_SECONDS, REJECTED_REQUESTS, RETRIES
+from utils.scheduler import Busy
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE = (QUEUED, RUNNING)
+FINISHED = (DONE, FAILED, CANCELLED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    corpus_id TEXT NOT NULL,
+    session TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    heartbeat REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, not_before, created);
+CREATE INDEX IF NOT EXISTS jobs_by_corpus ON jobs (corpus_id, created);
+"""
+
+# Columns added since the first schema, created on open in older databases
+MIGRATIONS = {
+    "session": "ALTER TABLE jobs ADD COLUMN session TEXT NOT NULL DEFAULT ''",
+    "heartbeat": "ALTER TABLE jobs ADD COLUMN heartbeat REAL NOT NULL DEFAULT 0",
+}
+SESSION_INDEX = "CREATE INDEX IF NOT EXISTS jobs_by_session ON jobs (session, status)"
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once its cancellation was requested."""
+
+
+class IngestQueue:
+    """
+    SQLite-backed queue of corpus ingestion jobs and the threads that run them.
+
+    submit() stores the files and enqueues one job per corpus (an active or
+    finished job for the same files is returned instead). Worker threads claim
+    jobs atomically, so several processes can share the database, and build
+    the corpus through CorpusIndex, recording progress as they go. Failed jobs
+    are retried with exponential backoff. While a job runs, its worker sends a
+    heartbeat every third of lease_seconds, also in the middle of converting
+    one large document; running jobs with neither progress nor a heartbeat for
+    lease_seconds are assumed lost (their process died) and claimed again.
+
+    Jobs carry the session that submitted them. A free worker takes the oldest
+    job of the session with the fewest running jobs, skipping sessions that
+    already run session_concurrency jobs, so one session's uploads cannot hold
+    every worker; submit() raises Busy beyond max_queued queued jobs
+    (session_max_queued for one session). Jobs without a session are only
+    bound by the worker count.
+    """
+
+    def __init__(
+        self,
+        corpus_index: CorpusIndex,
+        db_path: Optional[str] = None,
+        workers: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+        lease_seconds: Optional[float] = None,
+        poll_interval: float = 0.5,
+        session_concurrency: Optional[int] = None,
+        max_queued: Optional[int] = None,
+        session_max_queued: Optional[int] = None,
+    ):
+        self.corpus_index = corpus_index
+        self.db_path = str(db_path or Path(corpus_index.root) / "jobs.sqlite3")
+        self.workers = workers if workers is not None else settings.INGEST_WORKERS
+        self.max_attempts = max_attempts or settings.INGEST_MAX_ATTEMPTS
+        self.retry_backoff = (
+            retry_backoff
+            if retry_backoff is not None
+            else settings.INGEST_RETRY_BACKOFF_SECONDS
+        )
+        self.lease_seconds = lease_seconds or settings.INGEST_LEASE_SECONDS
+        self.poll_interval = poll_interval
+        self.session_concurrency = (
+            session_concurrency or settings.INGEST_SESSION_CONCURRENCY
+        )
+        self.max_queued = max_queued or settings.INGEST_MAX_QUEUED
+        self.session_max_queued = (
+            session_max_queued or settings.INGEST_SESSION_MAX_QUEUED
+        )
+        self._changed = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, migration in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(migration)
+            conn.execute(SESSION_INDEX)
+
+    def start(self):
+        """Start the worker threads (once)."""
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"ingest-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop claiming jobs and wait for the workers to return."""
+        self._stop.set()
+        self._notify()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, files: List[Tuple[str, bytes]], session: str = "") -> Dict:
+        """
+        Store (filename, content) pairs and return the job ingesting them.
+
+        Raises Busy when the queue is full; files already queued or ingested
+        are never turned away.
+        """
+        corpus_id = self.corpus_index.add_files(files)
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE corpus_id = ? AND status IN (?, ?, ?) "
+                "ORDER BY created DESC LIMIT 1",
+                (corpus_id, QUEUED, RUNNING, DONE),
+            ).fetchone()
+            if row is None:
+                self._check_queue(conn, session)
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO jobs (id, corpus_id, session, status, message, "
+                    "created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, corpus_id, session, QUEUED, "Queued", now, now),
+                )
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+                logger.info(f"Queued ingestion job {job_id} for corpus {corpus_id}")
+        self._notify()
+        return dict(row)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def latest_for_corpus(self, corpus_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE corpus_id = ? ORDER BY created DESC LIMIT 1",
+                (corpus_id,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """
+        Cancel a job: queued jobs stop at once, running ones at their next
+        progress step. Returns the job, or None if it does not exist.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, message = 'Cancelled', updated = ? "
+                "WHERE id = ? AND status = ?",
+                (CANCELLED, now, job_id, QUEUED),
+            )
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+                (job_id, RUNNING),
+            )
+        self._notify()
+        return self.get(job_id)
+
+    def subscribe(self, job_id: str, timeout: Optional[float] = None) -> Iterator[Dict]:
+        """
+        Yield the job whenever its status, progress or message changes, until
+        it finishes or timeout seconds have passed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        last = None
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            state = (job["status"], job["progress"], job["message"])
+            if state != last:
+                last = state
+                yield job
+            if job["status"] in FINISHED:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            with self._changed:
+                self._changed.wait(self.poll_interval)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Dict:
+        """Block until the job finishes (or timeout) and return its last state."""
+        job = None
+        for job in self.subscribe(job_id, timeout):
+            pass
+        return job
+
+    def wait_for_corpus(
+        self, corpus_id: str, timeout: Optional[float] = None
+    ) -> Optional[Dict]:
+        """Wait for the corpus's latest job, if any is still active, and return it."""
+        job = self.latest_for_corpus(corpus_id)
+        if job is not None and job["status"] in ACTIVE:
+            job = self.wait(job["id"], timeout)
+        return job
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not claim an ingestion job: {e}")
+                job = None
+            if job is None:
+                with self._changed:
+                    self._changed.wait(self.poll_interval)
+                continue
+            self._run(job)
+
+    def _check_queue(self, conn: sqlite3.Connection, session: str):
+        queued = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(session = ? AND session != ''), 0) "
+            "FROM jobs WHERE status = ?",
+            (session, QUEUED),
+        ).fetchone()
+        if queued[0] >= self.max_queued:
+            reason = f"{queued[0]} ingestion jobs already queued"
+        elif queued[1] >= self.session_max_queued:
+            reason = f"{queued[1]} ingestion jobs of this session already queued"
+        else:
+            return
+        REJECTED_REQUESTS.inc(stage="ingest")
+        raise Busy(f"Server busy ({reason}), please retry later")
+
+    def _claim(self) -> Optional[Dict]:
+        now = time.time()
+        stale = now - self.lease_seconds
+        with self._transaction() as conn:
+            # Running jobs per session, lost ones (past their lease) excluded
+            running = (
+                "(SELECT COUNT(*) FROM jobs r WHERE r.session = j.session "
+                "AND j.session != '' AND r.status = ? "
+                "AND MAX(r.updated, r.heartbeat) >= ?)"
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs j WHERE ((status = ? AND not_before <= ?) "
+                f"OR (status = ? AND MAX(updated, heartbeat) < ?)) AND {running} < ? "
+                f"ORDER BY {running}, created LIMIT 1",
+                (
+                    QUEUED,
+                    now,
+                    RUNNING,
+                    stale,
+                    RUNNING,
+                    stale,
+                    self.session_concurrency,
+                    RUNNING,
+                    stale,
+                ),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, "
+                "message = 'Starting', updated = ? WHERE id = ?",
+                (RUNNING, now, row["id"]),
+            )
+        if row["attempts"] == 0:
+            QUEUE_WAIT_SECONDS.observe(now - row["created"], stage="ingest")
+        return dict(row, status=RUNNING, attempts=row["attempts"] + 1)
+
+    def _run(self, job: Dict):
+        job_id = job["id"]
+
+        def progress(message: str, fraction: float):
+            if self._update(job_id, message=message, progress=fraction)[
+                "cancel_requested"
+            ]:
+                raise JobCancelled(job_id)
+
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat,
+            args=(job_id, done),
+            name=f"ingest-heartbeat-{job_id[:8]}",
+            daemon=True,
+        )
+        heartbeat.start()
+        try:
+            progress("Starting", 0.0)
+            self.corpus_index.get_retriever(job["corpus_id"], progress=progress)
+        except JobCancelled:
+            logger.info(f"Ingestion job {job_id} cancelled")
+            self._finish(job_id, CANCELLED, "Cancelled")
+        except Exception as e:
+            # ValueError means the documents themselves are unusable
+            if isinstance(e, ValueError) or job["attempts"] >= self.max_attempts:
+                logger.error(f"Ingestion job {job_id} failed: {e}")
+                self._finish(job_id, FAILED, "Failed", error=str(e))
+                return
+            delay = self.retry_backoff * 2 ** (job["attempts"] - 1)
+            RETRIES.inc(stage="ingest")
+            logger.warning(
+                f"Ingestion job {job_id} failed (attempt {job['attempts']}), "
+                f"retrying in {delay:.0f}s: {e}"
+            )
+            self._update(
+                job_id,
+                status=QUEUED,
+                message="Waiting to retry",
+                error=str(e),
+                not_before=time.time() + delay,
+            )
+        else:
+            self._finish(job_id, DONE, "Ready", progress=1.0)
+        finally:
+            done.set()
+            heartbeat.join()
+
+    def _heartbeat(self, job_id: str, done: threading.Event):
+        # Keeps the lease of a running job between progress steps, which can be
+        # far apart (one large PDF); stops with the job or with its process
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = ?",
+                        (time.time(), job_id, RUNNING),
+                    )
+            except sqlite3.Error as e:
+                logger.warning(f"Could not renew the lease of job {job_id}: {e}")
+
+    def _finish(self, job_id: str, status: str, message: str, **fields):
+        INGEST_JOBS.inc(status=status)
+        self._update(job_id, status=status, message=message, **fields)
+
+    def _update(self, job_id: str, **fields) -> Dict:
+        fields["updated"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        self._notify()
+        return dict(row)
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        with closing(conn):
+            yield conn
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two processes can
+        # never claim the same job
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
@@ -0,0 +1,111 @@
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def quantized_model_path(model_path: str) -> str:
+    """Return the path used for the int8 copy of an ONNX model."""
+    path = Path(model_path)
+    return str(path.with_name(f"{path.stem}.int8{path.suffix}"))
+
+
+def create_session(model_path: str, num_threads: int = 0, quantize: bool = False):
+    """
+    Create a CPU ONNX Runtime inference session.
+
+    When quantize is set, the model weights are dynamically quantized to int8
+    once and the quantized copy is reused on subsequent runs.
+    """
+    # Imported lazily so that the remote-only setup never pays for onnxruntime
+    import onnxruntime as ort
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"ONNX model not found: {model_path}")
+
+    if quantize:
+        int8_path = quantized_model_path(model_path)
+        if not os.path.exists(int8_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            logger.info(f"Quantizing {model_path} to int8 at {int8_path}")
+            quantize_dynamic(model_path, int8_path, weight_type=QuantType.QInt8)
+        model_path = int8_path
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    # 0 lets ONNX Runtime use one intra-op thread per physical core
+    options.intra_op_num_threads = num_threads
+    options.inter_op_num_threads = 1
+
+    session = ort.InferenceSession(
+        model_path, sess_options=options, providers=["CPUExecutionProvider"]
+    )
+    logger.info(
+        f"ONNX session ready for {model_path} (threads={num_threads or 'auto'})"
+    )
+    return session
+
+
+def load_tokenizer(tokenizer_path: str, max_length: int):
+    """Load a Hugging Face fast tokenizer with truncation enabled."""
+    from tokenizers import Tokenizer
+
+    if not os.path.exists(tokenizer_path):
+        raise FileNotFoundError(f"Tokenizer not found: {tokenizer_path}")
+
+    tokenizer = Tokenizer.from_file(tokenizer_path)
+    tokenizer.enable_truncation(max_length=max_length)
+    # Padding is applied per batch by the callers, up to the batch's longest item
+    tokenizer.no_padding()
+    return tokenizer
+
+
+def pad_encodings(encodings: list, pad_id: int = 0) -> dict:
+    """Pad a batch of encodings to its longest item and return int64 arrays."""
+    longest = max(len(e.ids) for e in encodings)
+    input_ids = np.full((len(encodings), longest), pad_id, dtype=np.int64)
+    attention_mask = np.zeros((len(encodings), longest), dtype=np.int64)
+    token_type_ids = np.zeros((len(encodings), longest), dtype=np.int64)
+    for row, encoding in enumerate(encodings):
+        size = len(encoding.ids)
+        input_ids[row, :size] = encoding.ids
+        attention_mask[row, :size] = 1
+        token_type_ids[row, :size] = encoding.type_ids
+    return {
+        "input_ids": input_ids,
+        "attention_mask": attention_mask,
+        "token_type_ids": token_type_ids,
+    }
+
+
+def plan_batches(lengths: list, max_batch_tokens: int, max_batch_size: int) -> list:
+    """
+    Group item indices into batches of similar token length.
+
+    Items are sorted by length so that padding inside a batch is minimal, and a
+    batch is closed once its padded size (items * longest item) would exceed
+    max_batch_tokens or it reaches max_batch_size items.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    current = []
+    longest = 0
+    for idx in order:
+        candidate_longest = max(longest, lengths[idx])
+        if current and (
+            len(current) >= max_batch_size
+            or candidate_longest * (len(current) + 1) > max_batch_tokens
+        ):
+            batches.append(current)
+            current = []
+            candidate_longest = lengths[idx]
+        current.append(idx)
+        longest = candidate_longest
+    if current:
+        batches.append(current)
+    return batches
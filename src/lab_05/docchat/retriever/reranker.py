@@ -0,0 +1,145 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, List
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever, RetrieverLike
+
+from config.settings import settings
+from retriever.onnx_runtime import (
+    create_session,
+    load_tokenizer,
+    pad_encodings,
+    plan_batches,
+)
+from utils.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """
+    Score (query, passage) pairs with a small cross-encoder on CPU.
+
+    Pairs are scored in length-sorted batches and scores are kept in an LRU
+    cache, so repeated questions over the same corpus skip inference entirely.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        tokenizer_path: str,
+        max_length: int = 512,
+        batch_size: int = 16,
+        num_threads: int = 0,
+        quantize: bool = False,
+        cache_size: int = 4096,
+    ):
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.tokenizer = load_tokenizer(tokenizer_path, max_length)
+        self.session = create_session(model_path, num_threads, quantize)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _cache_key(self, query: str, document: Document) -> str:
+        return hashlib.sha256(f"{query}\0{document.page_content}".encode()).hexdigest()
+
+    def score(self, query: str, documents: List[Document]) -> List[float]:
+        """Return one relevance score per document, higher is more relevant."""
+        keys = [self._cache_key(query, doc) for doc in documents]
+        scores = [None] * len(documents)
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[i] = self._cache[key]
+            missing = [i for i, score in enumerate(scores) if score is None]
+            self.cache_hits += len(documents) - len(missing)
+            self.cache_misses += len(missing)
+        record_cache("reranker", hit=True, count=len(documents) - len(missing))
+        record_cache("reranker", hit=False, count=len(missing))
+
+        if missing:
+            encodings = self.tokenizer.encode_batch(
+                [(query, documents[i].page_content) for i in missing]
+            )
+            batches = plan_batches(
+                [len(e.ids) for e in encodings],
+                max_batch_tokens=self.batch_size * self.max_length,
+                max_batch_size=self.batch_size,
+            )
+            for batch in batches:
+                batch_scores = self._score_batch([encodings[i] for i in batch])
+                for pos, score in zip(batch, batch_scores):
+                    scores[missing[pos]] = float(score)
+
+            with self._lock:
+                for i in missing:
+                    self._cache[keys[i]] = scores[i]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return scores
+
+    def _score_batch(self, encodings: list) -> np.ndarray:
+        arrays = pad_encodings(encodings)
+        feeds = {k: v for k, v in arrays.items() if k in self.input_names}
+        logits = self.session.run(None, feeds)[0]
+        if logits.ndim == 2:
+            # Single-logit models score in column 0; two-class models use "relevant"
+            logits = logits[:, -1]
+        return logits
+
+    def rerank(self, query: str, documents: List[Document], top_n: int) -> List:
+        """Return copies of the top_n documents, best first, with their scores."""
+        if not documents:
+            return []
+        scores = self.score(query, documents)
+        ranked = sorted(zip(documents, scores), key=lambda pair: pair[1], reverse=True)
+        return [
+            Document(
+                page_content=doc.page_content,
+                metadata={**(doc.metadata or {}), "rerank_score": score},
+            )
+            for doc, score in ranked[:top_n]
+        ]
+
+
+def build_reranker() -> CrossEncoderReranker:
+    """Cross-encoder configured by the RERANKER_* settings."""
+    return CrossEncoderReranker(
+        model_path=settings.RERANKER_MODEL_PATH,
+        tokenizer_path=settings.RERANKER_TOKENIZER_PATH,
+        max_length=settings.RERANKER_MAX_LENGTH,
+        batch_size=settings.RERANKER_BATCH_SIZE,
+        num_threads=settings.ONNX_NUM_THREADS,
+        quantize=settings.ONNX_QUANTIZE_INT8,
+        cache_size=settings.RERANKER_CACHE_SIZE,
+    )
+
+
+class RerankingRetriever(BaseRetriever):
+    """Retriever that reranks the fused candidates of a base retriever."""
+
+    base_retriever: RetrieverLike
+    reranker: Any
+    top_n: int = 5
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        candidates = self.base_retriever.invoke(
+            query, config={"callbacks": run_manager.get_child()}
+        )
+        reranked = self.reranker.rerank(query, candidates, self.top_n)
+        logger.debug(f"Reranked {len(candidates)} candidates to {len(reranked)}")
+        return reranked
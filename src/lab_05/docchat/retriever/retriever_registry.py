@@ -0,0 +1,56 @@
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RetrieverRegistry:
+    """
+    Resolve the corpus IDs carried in workflow state to live retrievers.
+
+    The graph state only holds a corpus ID, so it can be checkpointed.
+    Retrievers handed to the workflow are registered here under their corpus
+    ID (CorpusIndex's content hash) and kept for the max_size most recent
+    corpora. A retriever without one gets a random ID for as long as it stays
+    registered, which no other corpus can ever resolve to. IDs unknown to
+    this process go to `resolver`, such as CorpusIndex.get_retriever, so a
+    checkpointed run can resume in a process that never saw the original
+    retriever.
+    """
+
+    def __init__(
+        self, resolver: Optional[Callable[[str], object]] = None, max_size: int = 64
+    ):
+        self.resolver = resolver
+        self.max_size = max_size
+        self._retrievers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, retriever, corpus_id: Optional[str] = None) -> str:
+        """Register a retriever and return the ID to put in the graph state."""
+        with self._lock:
+            if corpus_id is None:
+                corpus_id = next(
+                    (cid for cid, r in self._retrievers.items() if r is retriever),
+                    f"adhoc-{uuid.uuid4().hex}",
+                )
+            self._retrievers[corpus_id] = retriever
+            self._retrievers.move_to_end(corpus_id)
+            while len(self._retrievers) > self.max_size:
+                self._retrievers.popitem(last=False)
+        return corpus_id
+
+    def get(self, corpus_id: str):
+        with self._lock:
+            if corpus_id in self._retrievers:
+                self._retrievers.move_to_end(corpus_id)
+                return self._retrievers[corpus_id]
+        if self.resolver is None:
+            raise KeyError(f"No retriever registered for corpus '{corpus_id}'")
+        logger.info(f"Resolving retriever of corpus {corpus_id}")
+        retriever = self.resolver(corpus_id)
+        self.register(retriever, corpus_id)
+        return retriever
@@ -0,0 +1,170 @@
+import logging
+import threading
+from typing import Any, List, Tuple
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+VECTOR_BACKENDS = ("chroma", "hnswlib", "exact", "auto")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+class ExactIndex:
+    """Brute-force cosine search with a single matrix multiply per query batch."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (ids, cosine scores) of shape (n_queries, k), best first."""
+        k = min(k, len(self.vectors))
+        scores = _normalize(np.asarray(queries, dtype=np.float32)) @ self.vectors.T
+        # Partial sort: only the top k of each row are ordered
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return (
+            np.take_along_axis(top, order, axis=1),
+            np.take_along_axis(top_scores, order, axis=1),
+        )
+
+
+class HnswIndex:
+    """In-memory HNSW graph (hnswlib) with tunable M / ef parameters."""
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        m: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+        num_threads: int = -1,
+    ):
+        import hnswlib
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.size = len(vectors)
+        self.num_threads = num_threads
+        self.index = hnswlib.Index(space="cosine", dim=vectors.shape[1])
+        self.index.init_index(
+            max_elements=max(self.size, 1), ef_construction=ef_construction, M=m
+        )
+        self.index.add_items(vectors, np.arange(self.size), num_threads=num_threads)
+        # ef is shared by every search on the index, so it is set here (large
+        # enough for the usual k) rather than per query; it only ever grows
+        self.ef = max(ef_search, settings.VECTOR_SEARCH_K)
+        self.index.set_ef(self.ef)
+        self._ef_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def set_ef_search(self, ef: int):
+        """Set ef for every later search (searches still raise it to their k)."""
+        with self._ef_lock:
+            self.ef = ef
+            self.index.set_ef(ef)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (ids, cosine scores) of shape (n_queries, k), best first."""
+        k = min(k, self.size)
+        # ef must be at least k for hnswlib to return k neighbours; raising it
+        # never hurts a concurrent search with a smaller k
+        if k > self.ef:
+            with self._ef_lock:
+                if k > self.ef:
+                    self.ef = k
+                    self.index.set_ef(k)
+        labels, distances = self.index.knn_query(
+            np.asarray(queries, dtype=np.float32), k=k, num_threads=self.num_threads
+        )
+        return labels.astype(np.int64), 1.0 - distances
+
+
+class IndexRetriever(BaseRetriever):
+    """Vector retriever over an in-memory ExactIndex or HnswIndex."""
+
+    index: Any
+    embeddings: Any
+    documents: List[Document]
+    k: int = 10
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        vector = np.asarray([self.embeddings.embed_query(query)], dtype=np.float32)
+        return self.search_by_vectors(vector)[0]
+
+    def search_by_vectors(self, vectors: np.ndarray) -> List[List[Document]]:
+        """Search several query vectors at once; one result list per query."""
+        ids, scores = self.index.search(vectors, self.k)
+        return [
+            [
+                Document(
+                    page_content=self.documents[i].page_content,
+                    metadata={**self.documents[i].metadata, "vector_score": float(s)},
+                )
+                for i, s in zip(row_ids, row_scores)
+            ]
+            for row_ids, row_scores in zip(ids, scores)
+        ]
+
+
+def select_backend(num_docs: int) -> str:
+    """Resolve settings.VECTOR_BACKEND, mapping 'auto' by corpus size."""
+    backend = settings.VECTOR_BACKEND.lower()
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(
+            f"Unknown VECTOR_BACKEND '{settings.VECTOR_BACKEND}'. "
+            f"Use one of: {', '.join(VECTOR_BACKENDS)}."
+        )
+    if backend == "auto":
+        return "exact" if num_docs <= settings.EXACT_SEARCH_MAX_DOCS else "chroma"
+    return backend
+
+
+def chroma_collection_metadata() -> dict:
+    """HNSW parameters for a Chroma collection, taken from settings."""
+    return {
+        "hnsw:space": "cosine",
+        "hnsw:M": settings.HNSW_M,
+        "hnsw:construction_ef": settings.HNSW_EF_CONSTRUCTION,
+        "hnsw:search_ef": settings.HNSW_EF_SEARCH,
+    }
+
+
+def build_index_retriever(
+    docs: List[Document], embeddings, backend: str, k: int
+) -> IndexRetriever:
+    """Embed docs and index them in memory with the 'hnswlib' or 'exact' backend."""
+    vectors = np.asarray(
+        embeddings.embed_documents([doc.page_content for doc in docs]),
+        dtype=np.float32,
+    )
+    if backend == "hnswlib":
+        index = HnswIndex(
+            vectors,
+            m=settings.HNSW_M,
+            ef_construction=settings.HNSW_EF_CONSTRUCTION,
+            ef_search=settings.HNSW_EF_SEARCH,
+        )
+    elif backend == "exact":
+        index = ExactIndex(vectors)
+    else:
+        raise ValueError(f"'{backend}' is not an in-memory vector backend")
+
+    logger.info(f"Built {backend} index over {len(docs)} documents")
+    return IndexRetriever(index=index, embeddings=embeddings, documents=docs, k=k)
@@ -0,0 +1,358 @@
+import asyncio
+import itertools
+import json
+import re
+import threading
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Literal, Optional
+
+import anyio
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from config import constants
+from config.settings import settings
+from retriever.ingest_queue import DONE, FINISHED
+from server.limits import ConcurrencyLimitMiddleware
+from utils.logging import logger, new_request_id, request_context
+from utils.metrics import registry
+from utils.scheduler import Busy
+
+# Health checks, scrapes and job status must answer even when the worker is
+# saturated
+EXEMPT_PREFIXES = ("/health", "/metrics", "/jobs/")
+
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+AnswerMode = Literal["two_step", "single_call"]
+
+
+class QueryRequest(BaseModel):
+    question: str = Field(min_length=1)
+    answer_mode: Optional[AnswerMode] = None  # ANSWER_MODE by default
+
+
+class BatchRequest(BaseModel):
+    questions: List[str] = Field(min_length=1)
+    max_concurrency: Optional[int] = Field(default=None, ge=1)
+    answer_mode: Optional[AnswerMode] = None
+
+
+def build_components() -> Dict:
+    """The corpus index, ingestion queue and workflow a worker process uses."""
+    from agents.workflow import AgentWorkflow
+    from document_processor.file_handler import DocumentProcessor
+    from retriever.builder import RetrieverBuilder
+    from retriever.corpus_index import CorpusIndex
+    from retriever.ingest_queue import IngestQueue
+
+    corpus_index = CorpusIndex(
+        settings.SERVER_DATA_DIR,
+        processor_factory=DocumentProcessor,
+        builder_factory=RetrieverBuilder,
+        max_cached=settings.SERVER_MAX_CACHED_CORPORA,
+    )
+    return {
+        "corpus_index": corpus_index,
+        "ingest_queue": IngestQueue(corpus_index),
+        "workflow": AgentWorkflow(retriever_resolver=corpus_index.get_retriever),
+    }
+
+
+def _request_id(request: Request) -> str:
+    """Reuse a well-formed X-Request-ID from the load balancer, else make one."""
+    incoming = request.headers.get("x-request-id", "")
+    return incoming if _REQUEST_ID_PATTERN.match(incoming) else new_request_id()
+
+
+def _session_id(request: Request) -> str:
+    """The client's X-Session-ID if well-formed, else its address."""
+    incoming = request.headers.get("x-session-id", "")
+    if _REQUEST_ID_PATTERN.match(incoming):
+        return incoming
+    return request.client.host if request.client else ""
+
+
+def _busy(e: Busy) -> HTTPException:
+    return HTTPException(
+        503, str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))}
+    )
+
+
+def _start(events: Iterator[Dict]) -> Iterator[Dict]:
+    """
+    Pull a streamed run's first event, so the run has its slot (or was turned
+    away with Busy) before the response starts. Other errors are left for the
+    stream to report.
+    """
+    try:
+        first = next(events)
+    except StopIteration:
+        return iter(())
+    except Busy:
+        raise
+    except Exception as e:
+        error = e
+
+        def failed():
+            raise error
+            yield
+
+        return failed()
+    return itertools.chain([first], events)
+
+
+def _in_request(request_id: str, func, *args):
+    with request_context(request_id):
+        return func(*args)
+
+
+def _sse(events: Iterator[Dict]) -> Iterator[str]:
+    """Server-sent events of a streamed run; node updates are reduced to names."""
+    try:
+        for event in events:
+            if event["type"] == "node":
+                event = {"type": "node", "node": event["node"]}
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+    except Exception as e:
+        logger.error("Streamed query failed: {}", e)
+        yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+
+
+def create_app(corpus_index=None, workflow=None, ingest_queue=None) -> FastAPI:
+    """
+    Build the DocChat HTTP API.
+
+    Without arguments the corpus index, ingestion queue and workflow are
+    created when the worker starts; tests pass their own.
+    """
+    components = {
+        "corpus_index": corpus_index,
+        "ingest_queue": ingest_queue,
+        "workflow": workflow,
+    }
+    components_lock = threading.Lock()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Every in-flight request may block a thread on LLM calls
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        limiter.total_tokens = max(
+            limiter.total_tokens, 2 * settings.SERVER_MAX_CONCURRENT_REQUESTS
+        )
+        if components["workflow"] is None:
+            await run_in_threadpool(get_components)
+        # Every worker process runs ingestion threads on the shared job queue
+        components["ingest_queue"].start()
+        try:
+            yield
+        finally:
+            components["ingest_queue"].stop()
+
+    def get_components() -> Dict:
+        with components_lock:
+            if components["workflow"] is None:
+                components.update(build_components())
+        return components
+
+    def get_job(job_id: str) -> Dict:
+        job = get_components()["ingest_queue"].get(job_id)
+        if job is None:
+            raise HTTPException(404, f"Unknown job '{job_id}'")
+        return job
+
+    async def get_retriever(corpus_id: str, request_id: str):
+        corpus_index = get_components()["corpus_index"]
+        if not corpus_index.exists(corpus_id):
+            raise HTTPException(404, f"Unknown corpus '{corpus_id}'")
+        # Questions wait only for the ingestion of the corpus they target
+        job = await run_in_threadpool(
+            get_components()["ingest_queue"].wait_for_corpus,
+            corpus_id,
+            settings.INGEST_WAIT_TIMEOUT_SECONDS,
+        )
+        if job is not None and job["status"] != DONE:
+            raise HTTPException(
+                409,
+                {"message": f"Corpus '{corpus_id}' is not ready", "job": job},
+            )
+        try:
+            return await run_in_threadpool(
+                _in_request, request_id, corpus_index.get_retriever, corpus_id
+            )
+        except ValueError as e:
+            raise HTTPException(422, str(e))
+
+    app = FastAPI(title="DocChat", version="0.1.0", lifespan=lifespan)
+    app.add_middleware(
+        ConcurrencyLimitMiddleware,
+        limit=settings.SERVER_MAX_CONCURRENT_REQUESTS,
+        timeout=settings.SERVER_QUEUE_TIMEOUT_SECONDS,
+        exempt_prefixes=EXEMPT_PREFIXES,
+    )
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def metrics():
+        return PlainTextResponse(
+            registry.render(), media_type="text/plain; version=0.0.4"
+        )
+
+    @app.post("/corpora", status_code=202)
+    async def ingest(request: Request, files: List[UploadFile] = File(...)):
+        """
+        Upload documents and queue their ingestion; returns the corpus ID to
+        query them with and the job to follow.
+        """
+        request_id = _request_id(request)
+        uploads, total = [], 0
+        for upload in files:
+            name = upload.filename or ""
+            if Path(name).suffix.lower() not in constants.ALLOWED_TYPES:
+                raise HTTPException(
+                    400,
+                    f"Unsupported file type: '{name}'. "
+                    f"Allowed: {', '.join(constants.ALLOWED_TYPES)}",
+                )
+            content = await upload.read()
+            total += len(content)
+            if total > constants.MAX_TOTAL_SIZE:
+                raise HTTPException(
+                    413,
+                    f"Total size exceeds {constants.MAX_TOTAL_SIZE // 1024 // 1024}MB",
+                )
+            uploads.append((name, content))
+
+        ingest_queue = get_components()["ingest_queue"]
+        try:
+            job = await run_in_threadpool(
+                _in_request,
+                request_id,
+                ingest_queue.submit,
+                uploads,
+                _session_id(request),
+            )
+        except Busy as e:
+            raise _busy(e)
+        except ValueError as e:
+            raise HTTPException(422, str(e))
+        return {
+            "corpus_id": job["corpus_id"],
+            "job": job,
+            "files": [name for name, _ in uploads],
+            "request_id": request_id,
+        }
+
+    @app.get("/jobs/{job_id}")
+    async def job_status(job_id: str):
+        return await run_in_threadpool(get_job, job_id)
+
+    @app.get("/jobs/{job_id}/events")
+    async def job_events(job_id: str):
+        """Server-sent events with the job's state on every change until done."""
+        job = await run_in_threadpool(get_job, job_id)
+        ingest_queue = get_components()["ingest_queue"]
+
+        async def events():
+            nonlocal job
+            last = None
+            while True:
+                state = (job["status"], job["progress"], job["message"])
+                if state != last:
+                    last = state
+                    yield f"data: {json.dumps(job)}\n\n"
+                if job["status"] in FINISHED:
+                    return
+                await asyncio.sleep(ingest_queue.poll_interval)
+                job = await run_in_threadpool(get_job, job_id)
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    @app.delete("/jobs/{job_id}")
+    async def cancel_job(job_id: str):
+        await run_in_threadpool(get_job, job_id)
+        return await run_in_threadpool(get_components()["ingest_queue"].cancel, job_id)
+
+    @app.post("/corpora/{corpus_id}/query")
+    async def query(corpus_id: str, body: QueryRequest, request: Request):
+        request_id = _request_id(request)
+        retriever = await get_retriever(corpus_id, request_id)
+        flow = get_components()["workflow"]
+        try:
+            result = await run_in_threadpool(
+                flow.full_pipeline,
+                body.question,
+                retriever,
+                request_id,
+                corpus_id,
+                body.answer_mode,
+                _session_id(request),
+            )
+        except Busy as e:
+            raise _busy(e)
+        return {**result, "corpus_id": corpus_id, "request_id": request_id}
+
+    @app.post("/corpora/{corpus_id}/query/stream")
+    async def stream_query(corpus_id: str, body: QueryRequest, request: Request):
+        """Server-sent events: node, draft_start, token and a final event."""
+        request_id = _request_id(request)
+        retriever = await get_retriever(corpus_id, request_id)
+        flow = get_components()["workflow"]
+        events = flow.stream_pipeline(
+            body.question,
+            retriever,
+            request_id,
+            corpus_id,
+            body.answer_mode,
+            _session_id(request),
+        )
+        try:
+            events = await run_in_threadpool(_start, events)
+        except Busy as e:
+            raise _busy(e)
+        return StreamingResponse(
+            _sse(events),
+            media_type="text/event-stream",
+            headers={"X-Request-ID": request_id, "Cache-Control": "no-cache"},
+        )
+
+    @app.post("/corpora/{corpus_id}/batch")
+    async def batch(corpus_id: str, body: BatchRequest, request: Request):
+        """One JSON line per question, in order, as answers complete."""
+        request_id = _request_id(request)
+        retriever = await get_retriever(corpus_id, request_id)
+        flow = get_components()["workflow"]
+        concurrency = min(
+            body.max_concurrency or settings.BATCH_MAX_CONCURRENCY,
+            settings.BATCH_MAX_CONCURRENCY,
+        )
+        results = flow.batch_pipeline(
+            body.questions,
+            retriever,
+            max_concurrency=concurrency,
+            corpus_id=corpus_id,
+            answer_mode=body.answer_mode,
+            session_id=_session_id(request),
+        )
+        return StreamingResponse(
+            (json.dumps(result, ensure_ascii=False) + "\n" for result in results),
+            media_type="application/x-ndjson",
+            headers={"X-Request-ID": request_id},
+        )
+
+    return app
+
+
+# Import string for uvicorn: "server.api:app"
+app = create_app()
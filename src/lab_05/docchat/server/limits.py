@@ -0,0 +1,55 @@
+import asyncio
+import time
+from typing import Iterable
+
+from starlette.responses import JSONResponse
+
+from utils.metrics import QUEUE_WAIT_SECONDS, REJECTED_REQUESTS
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    ASGI middleware capping the requests a worker handles at once.
+
+    A request waits up to `timeout` seconds for a slot and gets 503 with
+    Retry-After otherwise. The slot is held until the response body is fully
+    sent, so streamed answers count against the limit for their whole length.
+    Paths starting with one of exempt_prefixes bypass the limit.
+    """
+
+    def __init__(
+        self, app, limit: int, timeout: float, exempt_prefixes: Iterable[str] = ()
+    ):
+        self.app = app
+        self.limit = limit
+        self.timeout = timeout
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        self._semaphore = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        if self._semaphore is None:
+            # Created inside the worker's event loop
+            self._semaphore = asyncio.Semaphore(self.limit)
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            REJECTED_REQUESTS.inc(stage="http")
+            response = JSONResponse(
+                {"detail": "Server busy, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(max(1, round(self.timeout)))},
+            )
+            await response(scope, receive, send)
+            return
+        QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start, stage="http")
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._semaphore.release()
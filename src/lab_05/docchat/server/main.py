@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Run the DocChat HTTP API with uvicorn.
+
+Usage:
+    python -m server.main                      # SERVER_HOST / SERVER_PORT / SERVER_WORKERS
+    python -m server.main --workers 4 --port 8080
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+
+import uvicorn
+
+# Add the parent directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS)
+    args = parser.parse_args()
+
+    # Worker processes share nothing in memory: corpora are resolved through
+    # SERVER_DATA_DIR, the document cache and the persisted Chroma collections
+    uvicorn.run(
+        "server.api:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools" if importlib.util.find_spec("httptools") else "h11",
+        log_config=None,  # keep the loguru sinks from utils.logging
+    )
+
+
+if __name__ == "__main__":
+    main()
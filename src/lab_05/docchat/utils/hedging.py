@@ -0,0 +1,224 @@
+import contextvars
+import math
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Optional, Tuple
+
+
+class LatencyWindow:
+    """The last `size` latencies of a call, and their percentiles."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Nearest-rank q-th percentile (0-100), or None without samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(1, math.ceil(q / 100 * len(samples)))
+        return samples[rank - 1]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+
+class HedgeBudget:
+    """
+    Token bucket capping hedges at `ratio` of calls: every call adds ratio
+    tokens (up to `burst`), every hedge takes one.
+    """
+
+    def __init__(self, ratio: float, burst: float = 5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class Cancelled(BaseException):
+    """
+    Raised inside an attempt that lost its race. Like asyncio.CancelledError
+    it is not an Exception, so the SDKs' retry loops let it through.
+    """
+
+
+class Attempt:
+    """
+    One attempt of a hedged call, and the sockets it is blocked on. Cancelling
+    it shuts those sockets down, which wakes a blocked read (closing them
+    would not) and drops the request upstream.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._sockets = set()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled.set()
+            for sock in self._sockets:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    @contextmanager
+    def blocking(self, sock):
+        # Only sockets mid-I/O are tracked: once released a pooled connection
+        # may already serve another call
+        with self._lock:
+            if self.cancelled.is_set():
+                raise Cancelled()
+            if sock is not None:
+                self._sockets.add(sock)
+        try:
+            yield
+        except Exception:
+            if self.cancelled.is_set():
+                raise Cancelled() from None
+            raise
+        finally:
+            with self._lock:
+                self._sockets.discard(sock)
+        if self.cancelled.is_set():
+            raise Cancelled()
+
+
+_attempt: contextvars.ContextVar[Optional[Attempt]] = contextvars.ContextVar(
+    "hedge_attempt", default=None
+)
+
+
+@contextmanager
+def blocking(sock):
+    """
+    Wrap blocking I/O on `sock` so the current attempt (if any) can cancel it.
+    Transports call this around every read and write.
+    """
+    attempt = _attempt.get()
+    if attempt is None:
+        yield
+        return
+    with attempt.blocking(sock):
+        yield
+
+
+def pause(seconds: float):
+    """time.sleep that the current attempt can cancel, for simulated latency."""
+    attempt = _attempt.get()
+    if attempt is None:
+        time.sleep(seconds)
+    elif attempt.cancelled.wait(seconds):
+        raise Cancelled()
+
+
+def hedge(
+    attempt: Callable[[bool], object],
+    delay: float,
+    may_hedge: Callable[[], bool],
+    discard: Optional[Callable[[object], None]] = None,
+) -> Tuple[object, Optional[bool]]:
+    """
+    Run attempt(False) on the calling thread; if it has not finished after
+    `delay` seconds and may_hedge() allows it, run attempt(True) alongside and
+    keep the first success. Returns (result, hedge_won), hedge_won being None
+    when no hedge was sent.
+
+    A failed attempt only fails the call when the other one fails too. The
+    first success cancels the other attempt (see Attempt), which then raises
+    Cancelled at its next blocking I/O; a success that still comes second is
+    passed to discard() (e.g. to close a stream).
+    """
+    race = _Race(attempt, discard)
+    # The hedge gets its own thread, so nothing queues ahead of it
+    timer = threading.Timer(
+        delay, contextvars.copy_context().run, args=(race.hedge, may_hedge)
+    )
+    timer.daemon = True
+    timer.start()
+    try:
+        return race.run()
+    finally:
+        timer.cancel()
+
+
+class _Race:
+    """The primary attempt and its hedge, keyed by the `hedged` flag."""
+
+    def __init__(self, attempt: Callable[[bool], object], discard):
+        self.attempt = attempt
+        self.discard = discard
+        self.attempts = {False: Attempt(), True: Attempt()}
+        self.outcomes = {}
+        self.winner = None
+        self.hedged = False
+        self.hedge_done = threading.Event()
+        self._lock = threading.Lock()
+
+    def run(self) -> Tuple[object, Optional[bool]]:
+        self._run(False)
+        with self._lock:
+            hedged = self.hedged
+        if hedged and self.winner is not False:
+            self.hedge_done.wait()
+        if self.winner is None:
+            raise self.outcomes[False][1]
+        return self.outcomes[self.winner][0], self.winner if hedged else None
+
+    def hedge(self, may_hedge: Callable[[], bool]):
+        with self._lock:
+            if False in self.outcomes:
+                return
+        if not may_hedge():
+            return
+        with self._lock:
+            if False in self.outcomes:
+                return
+            self.hedged = True
+        try:
+            self._run(True)
+        finally:
+            self.hedge_done.set()
+
+    def _run(self, hedged: bool):
+        token = _attempt.set(self.attempts[hedged])
+        result, error = None, None
+        try:
+            result = self.attempt(hedged)
+        except (Exception, Cancelled) as exc:
+            error = exc
+        finally:
+            _attempt.reset(token)
+
+        with self._lock:
+            self.outcomes[hedged] = (result, error)
+            won = error is None and self.winner is None
+            if won:
+                self.winner = hedged
+        if won:
+            self.attempts[not hedged].cancel()
+        elif error is None and self.discard is not None:
+            self.discard(result)
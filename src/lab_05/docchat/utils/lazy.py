@@ -0,0 +1,51 @@
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+from utils.logging import logger
+
+T = TypeVar("T")
+
+
+def run_in_background(func: Callable[[], object], name: str) -> threading.Thread:
+    """Call func in a daemon thread; errors are logged, not raised."""
+
+    def run():
+        try:
+            func()
+        except Exception as e:
+            logger.warning("Background {} failed: {}", name, e)
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+class Lazy(Generic[T]):
+    """
+    Create an expensive object on first use, once, from any thread.
+
+    Keeps heavy imports and client setup out of process startup; prewarm()
+    builds the object in a background thread so the first request need not.
+    """
+
+    def __init__(self, factory: Callable[[], T], name: str):
+        self._factory = factory
+        self.name = name
+        self._value: Optional[T] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._value is not None
+
+    def get(self) -> T:
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    logger.info("Initializing {}...", self.name)
+                    self._value = self._factory()
+        return self._value
+
+    def prewarm(self) -> threading.Thread:
+        """Build the object in a background thread."""
+        return run_in_background(self.get, f"pre-warm of {self.name}")
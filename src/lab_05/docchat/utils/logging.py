@@ -1,8 +1,128 @@
+import contextvars
+import inspect
+import logging
+import random
+import sys
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
 from loguru import logger
 
-logger.add(
-    "app.log",
-    rotation="10 MB",
-    retention="30 days",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
+from config.settings import settings
+
+# Correlation ID and payload-sampling decision of the request being handled.
+# Context variables follow the request into LangGraph's worker threads.
+_request_id = contextvars.ContextVar("request_id", default="-")
+_sample_payloads = contextvars.ContextVar("sample_payloads", default=False)
+
+CONSOLE_FORMAT = (
+    "<green>{time:HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+    "{extra[request_id]} | <cyan>{name}</cyan> - <level>{message}</level>"
 )
+
+
+def _add_request_id(record):
+    record["extra"].setdefault("request_id", _request_id.get())
+
+
+class InterceptHandler(logging.Handler):
+    """Route stdlib `logging` records into the loguru sinks."""
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        # Report the caller of logging.*, not this handler
+        frame, depth = inspect.currentframe(), 0
+        while frame and (depth == 0 or frame.f_code.co_filename == logging.__file__):
+            frame = frame.f_back
+            depth += 1
+        logger.opt(depth=depth, exception=record.exc_info).log(
+            level, record.getMessage()
+        )
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def get_request_id() -> str:
+    return _request_id.get()
+
+
+@contextmanager
+def request_context(request_id: Optional[str] = None):
+    """
+    Tag every log line emitted inside the block with one correlation ID.
+
+    Also decides once per request whether large payloads (prompts, contexts,
+    raw responses) are logged, see payload().
+    """
+    id_token = _request_id.set(request_id or new_request_id())
+    sample_token = _sample_payloads.set(
+        random.random() < settings.LOG_PAYLOAD_SAMPLE_RATE
+    )
+    try:
+        yield _request_id.get()
+    finally:
+        _sample_payloads.reset(sample_token)
+        _request_id.reset(id_token)
+
+
+def request_scope(request_id: Optional[str] = None) -> contextvars.Context:
+    """
+    Same as request_context, as a Context to run() work in.
+
+    Generators that are resumed from different threads (e.g. Gradio streaming)
+    run each step with scope.run(next, generator) instead of holding a
+    context manager open across yields.
+    """
+    scope = contextvars.copy_context()
+    scope.run(_request_id.set, request_id or new_request_id())
+    scope.run(_sample_payloads.set, random.random() < settings.LOG_PAYLOAD_SAMPLE_RATE)
+    return scope
+
+
+def payload(text: str) -> str:
+    """
+    Cap a large payload for logging.
+
+    Only sampled requests log payload text, truncated to LOG_PAYLOAD_MAX_CHARS;
+    the rest log just the size. Pass it through logger.opt(lazy=True) so the
+    work is skipped when the level is disabled.
+    """
+    text = text or ""
+    if not _sample_payloads.get():
+        return f"<{len(text)} chars, not sampled>"
+    limit = settings.LOG_PAYLOAD_MAX_CHARS
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... <{len(text) - limit} more chars>"
+
+
+def configure_logging():
+    """Replace loguru's synchronous default sink with enqueued ones."""
+    logger.remove()
+    logger.configure(patcher=_add_request_id)
+    # enqueue=True hands records to a background thread, so callers never
+    # block on console or file I/O
+    logger.add(
+        sys.stderr, level=settings.LOG_LEVEL, format=CONSOLE_FORMAT, enqueue=True
+    )
+    logger.add(
+        settings.LOG_FILE,
+        level=settings.LOG_LEVEL,
+        rotation="10 MB",
+        retention="30 days",
+        serialize=True,  # one JSON record per line, request_id under "extra"
+        enqueue=True,
+    )
+    logging.basicConfig(handlers=[InterceptHandler()], level=settings.LOG_LEVEL)
+    # Per-request HTTP logging from the SDKs would drown everything else
+    for name in ("azure", "httpx", "openai"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
+configure_logging()
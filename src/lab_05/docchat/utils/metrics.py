@@ -0,0 +1,243 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], **extra) -> str:
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    inner = ",".join(f'{k}="{str(v)}"' for k, v in pairs)
+    return "{" + inner + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram, rendered the way Prometheus expects."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += 1
+            state[2] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[1] if state else 0
+
+    def total(self, **labels) -> float:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0.0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (key, (list(s[0]), s[1], s[2])) for key, s in self._values.items()
+            )
+        lines = []
+        for key, (bucket_counts, count, total) in items:
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                labels = _format_labels(self.labelnames, key, le=bound)
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            labels = _format_labels(self.labelnames, key, le="+Inf")
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_count{labels} {count}")
+            lines.append(f"{self.name}_sum{labels} {total}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide collection of metrics, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Clear every recorded value (used by tests and benchmarks)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+registry = MetricsRegistry()
+
+NODE_SECONDS = registry.histogram(
+    "docchat_node_duration_seconds", "Wall time of workflow graph nodes", ["node"]
+)
+LLM_SECONDS = registry.histogram(
+    "docchat_llm_duration_seconds", "Wall time of chat completion calls", ["agent"]
+)
+LLM_TOKENS = registry.counter(
+    "docchat_llm_tokens_total", "Tokens reported in completion usage", ["agent", "kind"]
+)
+RETRIES = registry.counter(
+    "docchat_retries_total", "Retried remote requests", ["stage"]
+)
+QUEUE_WAIT_SECONDS = registry.histogram(
+    "docchat_queue_wait_seconds", "Time spent waiting before work started", ["stage"]
+)
+RETRIEVED_DOCUMENTS = registry.histogram(
+    "docchat_retrieved_documents",
+    "Documents returned per retrieval",
+    ["stage"],
+    buckets=SIZE_BUCKETS,
+)
+CACHE_REQUESTS = registry.counter(
+    "docchat_cache_requests_total", "Cache lookups by outcome", ["cache", "result"]
+)
+REJECTED_REQUESTS = registry.counter(
+    "docchat_rejected_requests_total", "Requests turned away under load", ["stage"]
+)
+INGEST_JOBS = registry.counter(
+    "docchat_ingest_jobs_total", "Finished ingestion jobs by outcome", ["status"]
+)
+RELEVANCE_DECISIONS = registry.counter(
+    "docchat_relevance_decisions_total",
+    "Relevance labels by the tier that decided them (local gate or LLM)",
+    ["tier", "label"],
+)
+SELF_CHECKS = registry.counter(
+    "docchat_self_checks_total",
+    "Single-call answers by outcome (accepted, or escalated to the verifier)",
+    ["outcome"],
+)
+LLM_COALESCED = registry.counter(
+    "docchat_llm_coalesced_total",
+    "LLM calls answered by an identical call already in flight",
+    ["agent"],
+)
+LLM_HEDGES = registry.counter(
+    "docchat_llm_hedges_total",
+    "Duplicate requests for slow LLM calls, by result (won, lost, over_budget)",
+    ["agent", "result"],
+)
+GROUNDED_CLAIMS = registry.counter(
+    "docchat_grounded_claims_total",
+    "Answer claims checked locally, by result (supported or unconfirmed)",
+    ["result"],
+)
+
+
+def record_cache(cache: str, hit: bool, count: int = 1):
+    """Count cache hits or misses for the named cache."""
+    if count:
+        CACHE_REQUESTS.inc(count, cache=cache, result="hit" if hit else "miss")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve GET /metrics from a daemon thread and return the server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
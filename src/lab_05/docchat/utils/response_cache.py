@@ -0,0 +1,83 @@
+import json
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from typing import Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_by_use ON responses (last_used);
+"""
+
+
+class ResponseCache:
+    """
+    Persistent key -> JSON value store in SQLite, shared by every process
+    using the same file.
+
+    Entries older than ttl_seconds (0: never) are treated as missing and
+    removed; beyond max_entries the least recently used ones are evicted.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 0, max_entries: int = 10000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        with closing(conn):
+            yield conn
+
+    def _expired_before(self, now: float) -> float:
+        return now - self.ttl_seconds if self.ttl_seconds > 0 else float("-inf")
+
+    def get(self, key: str) -> Optional[object]:
+        """The stored value, or None when missing or expired."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < self._expired_before(now):
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, value: object):
+        """Store a JSON-serializable value, then drop expired and surplus entries."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, last_used)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            conn.execute(
+                "DELETE FROM responses WHERE created < ?", (self._expired_before(now),)
+            )
+            conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses"
+                " ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
@@ -0,0 +1,208 @@
+import itertools
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from utils.metrics import QUEUE_WAIT_SECONDS, REJECTED_REQUESTS
+
+
+class Busy(Exception):
+    """Raised when a request is turned away instead of queued."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """
+    A request's place in a FairScheduler. Used as a context manager: entering
+    waits for the slot, leaving releases it (or the place in the queue).
+    """
+
+    def __init__(
+        self,
+        scheduler: "FairScheduler",
+        session: str,
+        start_tag: float,
+        order: int,
+        shed: bool = True,
+        limit: Optional[int] = None,
+    ):
+        self.scheduler = scheduler
+        self.session = session
+        self.start_tag = start_tag
+        self.order = order
+        self.shed = shed
+        self.limit = limit
+        self.granted = False
+        self.done = False
+        self.created = time.perf_counter()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until the request may run; raises Busy after timeout seconds."""
+        self.scheduler._wait(self, timeout)
+
+    def release(self):
+        self.scheduler._release(self)
+
+    def __enter__(self):
+        self.wait()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class FairScheduler:
+    """
+    Admission control with per-session and global concurrency limits.
+
+    Waiting requests are served in start-time fair queuing order: each
+    session's next request is tagged with the virtual time at which its
+    previous ones finish (cost / weight each), so a session with many queued
+    requests takes turns with the others instead of going first, and a
+    session with twice the weight gets twice the turns. Weights come from
+    `weights` (session -> weight, 1 for the others) unless admit() is given
+    one. Sessions that go idle start again from the current virtual time.
+
+    admit() refuses a request that cannot start at once with Busy when
+    max_queued requests are already waiting, or session_max_queued for its
+    session; a request that waits longer than queue_timeout is refused as
+    well. With shed=False (work its caller already bounds, such as a batch's
+    questions) it is never refused and waits as long as it takes, and `limit`
+    replaces session_concurrency for it (e.g. a batch's own concurrency).
+    session=None gives the request a session of its own, so only the global
+    limits apply.
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        max_concurrency: int,
+        session_concurrency: int,
+        max_queued: int,
+        session_max_queued: int,
+        queue_timeout: Optional[float] = None,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        self.stage = stage
+        self.max_concurrency = max_concurrency
+        self.session_concurrency = session_concurrency
+        self.max_queued = max_queued
+        self.session_max_queued = session_max_queued
+        self.queue_timeout = queue_timeout
+        self.weights = dict(weights or {})
+        self._cond = threading.Condition()
+        self._waiting: List[Ticket] = []
+        self._running: Dict[str, int] = defaultdict(int)
+        self._queued: Dict[str, int] = defaultdict(int)
+        self._finish_tags: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._order = itertools.count()
+
+    def admit(
+        self,
+        session: Optional[str] = None,
+        weight: Optional[float] = None,
+        cost: float = 1.0,
+        shed: bool = True,
+        limit: Optional[int] = None,
+    ) -> Ticket:
+        """Queue a request (or refuse it with Busy) and return its ticket."""
+        session = session or f"anonymous-{uuid.uuid4().hex}"
+        if weight is None:
+            weight = self.weights.get(session, 1.0)
+        with self._cond:
+            if shed and not self._can_start(session, limit):
+                if len(self._waiting) >= self.max_queued:
+                    self._shed(f"{len(self._waiting)} requests already waiting")
+                queued = self._queued.get(session, 0)
+                if queued >= self.session_max_queued:
+                    self._shed(f"{queued} requests of this session already waiting")
+            start = max(self._virtual_time, self._finish_tags.get(session, 0.0))
+            self._finish_tags[session] = start + cost / weight
+            ticket = Ticket(self, session, start, next(self._order), shed, limit)
+            self._waiting.append(ticket)
+            self._queued[session] += 1
+            self._dispatch()
+        return ticket
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "running": sum(self._running.values()),
+                "waiting": len(self._waiting),
+                "sessions": len(self._finish_tags),
+            }
+
+    def _can_start(self, session: str, limit: Optional[int] = None) -> bool:
+        # Only requests that would have to wait count against the queue limits
+        return (
+            not self._waiting
+            and sum(self._running.values()) < self.max_concurrency
+            and self._running.get(session, 0) < (limit or self.session_concurrency)
+        )
+
+    def _shed(self, reason: str):
+        REJECTED_REQUESTS.inc(stage=self.stage)
+        raise Busy(
+            f"Server busy ({reason}), please retry later",
+            retry_after=max(1.0, self.queue_timeout or 1.0),
+        )
+
+    def _dispatch(self):
+        # Called with the lock held: start waiting requests while slots are free
+        while self._waiting and sum(self._running.values()) < self.max_concurrency:
+            eligible = [
+                t
+                for t in self._waiting
+                if self._running[t.session] < (t.limit or self.session_concurrency)
+            ]
+            if not eligible:
+                break
+            ticket = min(eligible, key=lambda t: (t.start_tag, t.order))
+            self._waiting.remove(ticket)
+            self._queued[ticket.session] -= 1
+            self._running[ticket.session] += 1
+            self._virtual_time = max(self._virtual_time, ticket.start_tag)
+            ticket.granted = True
+            QUEUE_WAIT_SECONDS.observe(
+                time.perf_counter() - ticket.created, stage=self.stage
+            )
+        self._cond.notify_all()
+
+    def _wait(self, ticket: Ticket, timeout: Optional[float]):
+        if timeout is None and ticket.shed:
+            timeout = self.queue_timeout
+        with self._cond:
+            if self._cond.wait_for(lambda: ticket.granted, timeout):
+                return
+            self._remove(ticket)
+            self._shed(f"no slot within {timeout:.0f}s")
+
+    def _release(self, ticket: Ticket):
+        with self._cond:
+            if ticket.done:
+                return
+            if ticket.granted:
+                ticket.done = True
+                self._running[ticket.session] -= 1
+                self._forget_if_idle(ticket.session)
+                self._dispatch()
+            else:
+                self._remove(ticket)
+
+    def _remove(self, ticket: Ticket):
+        # Called with the lock held, for tickets that never got their slot
+        ticket.done = True
+        self._waiting.remove(ticket)
+        self._queued[ticket.session] -= 1
+        self._forget_if_idle(ticket.session)
+
+    def _forget_if_idle(self, session: str):
+        if not self._running[session] and not self._queued[session]:
+            del self._running[session], self._queued[session]
+            self._finish_tags.pop(session, None)
@@ -0,0 +1,129 @@
+import threading
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Tuple
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Share one execution among identical concurrent calls.
+
+    do(key, fn) runs fn, unless a call with the same key is already in flight:
+    then it waits for that call and returns its result, or raises its error.
+    Nothing is cached; once a call finishes the next one with its key runs
+    again.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(
+        self, key: Hashable, fn: Callable, hold: bool = False
+    ) -> Tuple[object, bool]:
+        """
+        Returns (result, shared), shared being True for calls that joined
+        another. With hold=True the call stays joinable after fn returns, until
+        release(key): for results that are still being produced, like streams.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            self.release(key)
+            raise
+        finally:
+            flight.done.set()
+        if not hold:
+            self.release(key)
+        return flight.result, False
+
+    def release(self, key: Hashable):
+        """Let the next call with this key run on its own."""
+        with self._lock:
+            self._flights.pop(key, None)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+
+class Broadcast:
+    """
+    Replay one iterable to any number of readers, each from the start.
+
+    Whichever reader is furthest ahead pulls the next item from the source, so
+    no reader depends on another one keeping up. When the source is exhausted
+    or fails, on_done is called; when every reader stops early, the source is
+    closed (if it has close()) and on_done is called as well.
+    """
+
+    def __init__(self, source: Iterable, on_done: Callable[[], None] = None):
+        self._source = iter(source)
+        self._close = getattr(source, "close", None)
+        self._on_done = on_done
+        self._items: List[object] = []
+        self._error = None
+        self._finished = False
+        self._readers = 0
+        self._lock = threading.Lock()
+
+    def reader(self) -> Iterator:
+        with self._lock:
+            self._readers += 1
+        return self._read()
+
+    def _read(self) -> Iterator:
+        index = 0
+        try:
+            while True:
+                with self._lock:
+                    # Pulling under the lock: readers that need the same item
+                    # would be waiting for it anyway
+                    if index == len(self._items) and not self._finished:
+                        try:
+                            self._items.append(next(self._source))
+                        except StopIteration:
+                            self._finish()
+                        except Exception as e:
+                            self._error = e
+                            self._finish()
+                    if index < len(self._items):
+                        item = self._items[index]
+                    elif self._error is not None:
+                        raise self._error
+                    else:
+                        return
+                yield item
+                index += 1
+        finally:
+            with self._lock:
+                self._readers -= 1
+                if self._readers == 0 and not self._finished:
+                    # Everybody stopped early: nobody will read the rest
+                    self._error = RuntimeError("stream abandoned by all readers")
+                    self._finish()
+                    if self._close is not None:
+                        self._close()
+
+    def _finish(self):
+        self._finished = True
+        if self._on_done is not None:
+            self._on_done()
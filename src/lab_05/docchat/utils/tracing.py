@@ -0,0 +1,177 @@
+import inspect
+import threading
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.types import StreamWriter
+from opentelemetry import context as otel_context
+from opentelemetry import trace
+
+from config.settings import settings
+from utils.metrics import LLM_SECONDS, LLM_TOKENS, NODE_SECONDS, RETRIES
+
+TRACING_EXPORTERS = ("none", "console", "file")
+
+_provider_lock = threading.Lock()
+_provider_configured = False
+
+
+def configure_tracing(exporter: Optional[str] = None, path: Optional[str] = None):
+    """
+    Install the global tracer provider for settings.TRACING_EXPORTER.
+
+    "console" prints finished spans, "file" appends one JSON span per line to
+    settings.TRACING_FILE, "none" leaves OpenTelemetry's no-op tracer in place.
+    """
+    global _provider_configured
+    exporter = (exporter or settings.TRACING_EXPORTER).lower()
+    if exporter not in TRACING_EXPORTERS:
+        raise ValueError(
+            f"Unknown TRACING_EXPORTER '{exporter}'. "
+            f"Use one of: {', '.join(TRACING_EXPORTERS)}."
+        )
+    with _provider_lock:
+        if _provider_configured or exporter == "none":
+            return
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import (
+            BatchSpanProcessor,
+            ConsoleSpanExporter,
+        )
+
+        if exporter == "file":
+            out = open(path or settings.TRACING_FILE, "a", encoding="utf-8")
+            span_exporter = ConsoleSpanExporter(
+                out=out, formatter=lambda span: span.to_json(indent=None) + "\n"
+            )
+        else:
+            span_exporter = ConsoleSpanExporter()
+
+        provider = TracerProvider(resource=Resource({"service.name": "docchat"}))
+        provider.add_span_processor(BatchSpanProcessor(span_exporter))
+        trace.set_tracer_provider(provider)
+        _provider_configured = True
+
+
+def get_tracer():
+    configure_tracing()
+    return trace.get_tracer("docchat")
+
+
+def pipeline_span(name: str, **attributes):
+    """
+    Start (without activating) the root span of one workflow run.
+
+    Returns the span and the context to hand to graph nodes through
+    config["configurable"]["trace_context"], so node spans become its children
+    even when a streamed run is resumed from different threads.
+    """
+    span = get_tracer().start_span(name, attributes=attributes)
+    return span, trace.set_span_in_context(span)
+
+
+def trace_node(name: str, func: Callable) -> Callable:
+    """Wrap a graph node so each run gets a span and a duration sample."""
+    params = inspect.signature(func).parameters
+
+    def wrapper(state, config: RunnableConfig, writer: StreamWriter):
+        kwargs = {}
+        if "config" in params:
+            kwargs["config"] = config
+        if "writer" in params:
+            kwargs["writer"] = writer
+        parent = (config or {}).get("configurable", {}).get("trace_context")
+        token = otel_context.attach(parent) if parent is not None else None
+        start = time.perf_counter()
+        try:
+            with get_tracer().start_as_current_span(f"node.{name}") as span:
+                span.set_attribute("docchat.node", name)
+                span.set_attribute(
+                    "docchat.documents", len(state.get("documents") or [])
+                )
+                return func(state, **kwargs)
+        finally:
+            NODE_SECONDS.observe(time.perf_counter() - start, node=name)
+            if token is not None:
+                otel_context.detach(token)
+
+    wrapper.__name__ = getattr(func, "__name__", name)
+    return wrapper
+
+
+class LLMCall:
+    """Per-call record filled in by trace_llm_call and the azure response hook."""
+
+    def __init__(self, agent: str, span):
+        self.agent = agent
+        self.span = span
+        self.attempts = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+
+    @property
+    def hooks(self) -> dict:
+        """Keyword arguments for ChatCompletionsClient.complete."""
+        return {"raw_response_hook": self._on_response}
+
+    def _on_response(self, _response):
+        # Called once per HTTP attempt, including the ones the SDK retries
+        self.attempts += 1
+
+    def record_usage(self, usage):
+        """
+        Record prompt / completion tokens from a response's `usage`, and the
+        prompt tokens the provider served from its prefix cache
+        (usage.prompt_tokens_details.cached_tokens) when it reports them.
+        """
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if isinstance(prompt_tokens, int):
+            self.prompt_tokens = prompt_tokens
+        if isinstance(completion_tokens, int):
+            self.completion_tokens = completion_tokens
+        cached_tokens = _cached_tokens(usage)
+        if isinstance(cached_tokens, int):
+            self.cached_tokens = cached_tokens
+
+
+def _cached_tokens(usage):
+    # The azure.ai.inference usage model does not declare prompt_tokens_details
+    # yet, but keeps it in its underlying mapping
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is None and isinstance(usage, Mapping):
+        details = usage.get("prompt_tokens_details")
+    if isinstance(details, Mapping):
+        return details.get("cached_tokens")
+    return getattr(details, "cached_tokens", None)
+
+
+@contextmanager
+def trace_llm_call(agent: str, **attributes):
+    """Trace one chat completion: wall time, token usage and SDK retries."""
+    start = time.perf_counter()
+    with get_tracer().start_as_current_span(f"llm.{agent}") as span:
+        span.set_attribute("docchat.agent", agent)
+        for key, value in attributes.items():
+            span.set_attribute(f"docchat.{key}", value)
+        call = LLMCall(agent, span)
+        try:
+            yield call
+        finally:
+            elapsed = time.perf_counter() - start
+            retries = max(call.attempts - 1, 0)
+            span.set_attribute("docchat.retries", retries)
+            span.set_attribute("docchat.prompt_tokens", call.prompt_tokens)
+            span.set_attribute("docchat.completion_tokens", call.completion_tokens)
+            span.set_attribute("docchat.cached_tokens", call.cached_tokens)
+            LLM_SECONDS.observe(elapsed, agent=agent)
+            LLM_TOKENS.inc(call.prompt_tokens, agent=agent, kind="prompt")
+            LLM_TOKENS.inc(call.completion_tokens, agent=agent, kind="completion")
+            LLM_TOKENS.inc(call.cached_tokens, agent=agent, kind="cached")
+            if retries:
+                RETRIES.inc(retries, stage=agent)